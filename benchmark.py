@@ -0,0 +1,198 @@
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import sys
+from time import perf_counter
+
+from main import Simulator
+from opstream import FakeOpStream
+
+parser = argparse.ArgumentParser(description='Measure the speed of the simulator on fixed synthetic workloads and '
+                                             'compare it with a stored baseline')
+parser.add_argument('--baseline', default='./benchmark_baseline.json', type=str)
+parser.add_argument('--save', action='store_true', help='store the results as the new baseline')
+parser.add_argument('--tolerance', default=0.1, type=float,
+                    help='relative slowdown or memory growth that counts as a regression')
+parser.add_argument('--repeat', default=3, type=int, help='runs per case, the fastest one counts')
+parser.add_argument('--ops', default=5000, type=int, help='ops per core of every workload')
+parser.add_argument('--quick', action='store_true', help='only the smallest geometry')
+parser.add_argument('--engine', default='event', choices=['cycle', 'event'], type=str,
+                    help='engine to measure, event by default as it is the faster one on all but Dragon with heavy '
+                         'write sharing')
+
+PROTOCOLS = ['MESI', 'MOESI', 'DRAGON']
+# (num_cores, cache size, associativity)
+GEOMETRIES = [(2, 1024, 2), (4, 4096, 2), (8, 4096, 4)]
+
+
+def private_workload(rng, num_cores, ops):
+    """
+    every core loads and stores its own blocks, hardly any coherence traffic
+    """
+    op_lists = []
+    for core in range(num_cores):
+        blocks = [(core << 20 | rng.randrange(1 << 12)) << 5 for _ in range(48)]
+        op_lists.append([(2, rng.choice([1, 4, 30])) if rng.random() < 0.3 else
+                         (rng.randint(0, 1), rng.choice(blocks) + rng.randrange(32)) for _ in range(ops)])
+    return op_lists
+
+
+def read_shared_workload(rng, num_cores, ops):
+    """
+    all cores read a common pool of blocks, which end up shared in every cache
+    """
+    blocks = [rng.randrange(1 << 16) << 5 for _ in range(64)]
+    return [[(2, rng.choice([1, 4, 30])) if rng.random() < 0.3 else (0, rng.choice(blocks))
+             for _ in range(ops)] for _ in range(num_cores)]
+
+
+def write_shared_workload(rng, num_cores, ops):
+    """
+    all cores read and write a small common pool, blocks keep migrating between caches
+    """
+    blocks = [rng.randrange(1 << 16) << 5 for _ in range(16)]
+    return [[(2, rng.choice([1, 4])) if rng.random() < 0.2 else (rng.randint(0, 1), rng.choice(blocks))
+             for _ in range(ops)] for _ in range(num_cores)]
+
+
+def streaming_workload(rng, num_cores, ops):
+    """
+    every core walks sequentially through its own large array, almost every block is a miss
+    """
+    op_lists = []
+    for core in range(num_cores):
+        base = core << 24
+        op_lists.append([(2, 1) if i % 4 == 3 else (i % 2, base + i * 8) for i in range(ops)])
+    return op_lists
+
+
+WORKLOADS = {'private': private_workload, 'read_shared': read_shared_workload,
+             'write_shared': write_shared_workload, 'streaming': streaming_workload}
+
+
+def create_workload(name, num_cores, ops):
+    """
+    :return: list of op lists, one per core. The same arguments always give the same ops
+    """
+    return WORKLOADS[name](random.Random(name), num_cores, ops)
+
+
+def benchmark_cases(quick=False, ops=5000, engine='event'):
+    """
+    :return: list of cases, each a dict of the simulator configuration and workload
+    """
+    geometries = GEOMETRIES[:1] if quick else GEOMETRIES
+    return [{'protocol': protocol, 'workload': workload, 'num_cores': num_cores, 'size': size, 'assoc': assoc,
+             'ops': ops, 'engine': engine}
+            for (num_cores, size, assoc), protocol, workload in itertools.product(geometries, PROTOCOLS, WORKLOADS)]
+
+
+def case_name(case):
+    return '{protocol}-{workload}-{num_cores}c-{size}B-{assoc}w'.format(**case)
+
+
+def peak_rss_mb():
+    """
+    :return: peak resident set size of this process in MiB
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1 << 20) if sys.platform == 'darwin' else peak / (1 << 10)  # bytes on macOS, KiB elsewhere
+
+
+def run_case(case, repeat=1):
+    """
+    simulate one case <repeat> times, executed in a fresh worker process so its peak RSS is its own
+    :return: dict of measurements of the fastest run
+    """
+    op_lists = create_workload(case['workload'], case['num_cores'], case['ops'])
+    best = None
+    for _ in range(repeat):
+        sim = Simulator(protocol=case['protocol'], data=None, num_cores=case['num_cores'], size=case['size'],
+                        assoc=case['assoc'], engine=case['engine'])
+        for proc, op_list in zip(sim.procs, op_lists):
+            proc.op_stream = FakeOpStream(op_list)
+        start = perf_counter()
+        sim.run(quiet=True)
+        seconds = perf_counter() - start
+        if best is None or seconds < best:
+            best = seconds
+    ops = sum(len(op_list) for op_list in op_lists)
+    return {'cycles': sim.counter, 'ops': ops, 'seconds': best, 'cycles_per_second': sim.counter / best,
+            'ops_per_second': ops / best, 'peak_rss_mb': peak_rss_mb()}
+
+
+def run_benchmark(cases, repeat=3):
+    """
+    :return: dict of the measurements of every case keyed by case name
+    """
+    results = {}
+    with multiprocessing.Pool(1, maxtasksperchild=1) as pool:
+        for case in cases:
+            result = results[case_name(case)] = pool.apply(run_case, (case, repeat))
+            print('{:<36}{:>14.0f} cycles/s{:>10.0f} ops/s{:>8.1f} MiB'.format(
+                case_name(case), result['cycles_per_second'], result['ops_per_second'], result['peak_rss_mb']))
+    return results
+
+
+def compare_results(results, baseline, tolerance=0.1):
+    """
+    :param results: measurements of this run, as returned by run_benchmark
+    :param baseline: measurements of the baseline run
+    :param tolerance: relative slowdown or memory growth still accepted
+    :return: tuple(list of regression messages, list of notes on cases whose simulated cycles differ, e.g. after
+    a change of the timing model, or that are missing from the baseline)
+    """
+    regressions, notes = [], []
+    for name, result in results.items():
+        if name not in baseline:
+            notes.append('{}: not in the baseline'.format(name))
+            continue
+        base = baseline[name]
+        if result['cycles'] != base['cycles']:
+            notes.append('{}: simulates {} cycles instead of {}'.format(name, result['cycles'], base['cycles']))
+        # the workload fixes the number of ops, so ops per second compares runs even if their cycles differ
+        if result['ops_per_second'] < base['ops_per_second'] * (1 - tolerance):
+            regressions.append('{}: {:.1%} slower ({:.0f} -> {:.0f} ops/s, {:.0f} -> {:.0f} cycles/s)'.format(
+                name, 1 - result['ops_per_second'] / base['ops_per_second'], base['ops_per_second'],
+                result['ops_per_second'], base['cycles_per_second'], result['cycles_per_second']))
+        if result['peak_rss_mb'] > base['peak_rss_mb'] * (1 + tolerance):
+            regressions.append('{}: peak RSS grew {:.1%} ({:.1f} -> {:.1f} MiB)'.format(
+                name, result['peak_rss_mb'] / base['peak_rss_mb'] - 1, base['peak_rss_mb'], result['peak_rss_mb']))
+    return regressions, notes
+
+
+def save_baseline(path, results):
+    out_dir = os.path.dirname(path)
+    if out_dir and not os.path.exists(out_dir):
+        os.makedirs(out_dir)
+    with open(path, 'w') as file:
+        json.dump({'python': platform.python_version(), 'machine': platform.platform(), 'cases': results}, file,
+                  indent=2, sort_keys=True)
+
+
+def load_baseline(path):
+    with open(path) as file:
+        return json.load(file)['cases']
+
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    results = run_benchmark(benchmark_cases(args.quick, args.ops, args.engine), args.repeat)
+    regressions = []
+    if os.path.exists(args.baseline):
+        regressions, notes = compare_results(results, load_baseline(args.baseline), args.tolerance)
+        for message in notes:
+            print('note: ' + message)
+        for message in regressions:
+            print('REGRESSION: ' + message)
+        if not regressions:
+            print('no regressions against {}'.format(args.baseline))
+    if args.save:
+        save_baseline(args.baseline, results)
+        print('baseline saved to {}'.format(args.baseline))
+    sys.exit(1 if regressions and not args.save else 0)
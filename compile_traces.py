@@ -0,0 +1,30 @@
+import argparse
+import os
+
+from opstream import compile_trace, binary_trace_path, TRACE_EXTENSIONS
+
+parser = argparse.ArgumentParser(description='Compile text traces into the packed binary trace format')
+parser.add_argument('paths', nargs='+', help='trace files or directories containing <trace>_<core>.data files')
+parser.add_argument('--force', action='store_true', help='recompile traces whose binary form is up to date')
+
+
+def trace_files(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for file in sorted(os.listdir(path)):
+                if file.endswith(TRACE_EXTENSIONS):
+                    yield os.path.join(path, file)
+        else:
+            yield path
+
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    for text_path in trace_files(args.paths):
+        binary_path = binary_trace_path(text_path)
+        if not args.force and os.path.exists(binary_path) and \
+                os.path.getmtime(binary_path) >= os.path.getmtime(text_path):
+            print('{} is up to date'.format(binary_path))
+            continue
+        compile_trace(text_path, binary_path)
+        print('compiled {} -> {}'.format(text_path, binary_path))
@@ -1,12 +1,12 @@
 from math import log
 
-import numpy as np
-
+from components.tagstore import TagStore
 from constants.cache import *
 from constants.jobtype import *
 from constants.locking import *
 from constants.mesi import *
 from job import CacheJob
+from tracing import STATE_TRANSITION
 from util import resolve_memory_address
 
 
@@ -27,9 +27,11 @@ class CacheBase:
         self.offset_mask = 0
         for _ in range(self.n):
             self.offset_mask = (self.offset_mask << 1) | 0b1
-        self.data = np.zeros((size // assoc // block_size, assoc, 3), dtype=int)
+        self.data = TagStore(size // assoc // block_size, assoc)
         self.memory_controller = memory_controller
         self.bus = bus
+        self.bus_index = 0  # position in bus.connected_caches
+        self.tracer = None
 
         self.job = None
         self.payload_words = 0
@@ -55,6 +57,35 @@ class CacheBase:
                 self.on_hit_finished()
                 return
 
+    def cycles_to_next_event(self):
+        """
+        number of clock cycles until this cache changes state on its own, used by the event engine
+        :return: 0 if the current job needs the next interim, None if idle or waiting for another component, e.g.
+        for the bus to be released
+        """
+        if self.current_job is None:
+            return None
+        status = self.current_job.status_in_cache
+        if status in [RECEIVING_FROM_BUS, WAITING_FOR_BUS_UPD]:
+            return max(self.current_job.remaining_bus_read_cycles, 1)
+        if status == HITTING:
+            return 1
+        if status == WAITING_FOR_MEMORY:
+            return None
+        if status == BUS_OWNERSHIP_PENDING and self.bus.blocks(self):
+            return None  # rejected until the holder of the bus finishes its transfer or memory request
+        return 0
+
+    def skip_cycles(self, cycles):
+        """
+        advance the bus transfer countdown by <cycles> clock cycles in which it does not expire
+        :param cycles: number of cycles to skip, smaller than cycles_to_next_event()
+        :return: None
+        """
+        if self.current_job is not None and self.current_job.status_in_cache in [RECEIVING_FROM_BUS,
+                                                                                 WAITING_FOR_BUS_UPD]:
+            self.current_job.remaining_bus_read_cycles -= cycles
+
     def schedule_job(self, job):
         self.total_access_count += 1
         self.current_job = CacheJob.create_from_job(job, self.n)
@@ -63,34 +94,79 @@ class CacheBase:
         # run interim stuff if there is a current job
         raise NotImplementedError
 
+    def access_functionally(self, job):
+        """
+        Apply a load or store to the cache at once, without timing. The state transitions of the protocol are applied
+        directly to the tag stores of this cache and of the other caches holding the block, without bus arbitration,
+        and the memory controller only takes the fetches and write-backs that change what it holds. Tag store, LRU
+        order and coherence states of all caches end up as in timed mode. This is the MESI family; no cache may be
+        busy.
+        :param job: processor Load/Store job
+        :return: None
+        """
+        address = job.address >> self.n << self.n
+        tag, set_index, _ = self.resolve_memory_address(address)
+        slot = self.data.lookup_valid(set_index, tag)
+        if job.type == LOAD and slot < 0:
+            payload_words, mem_op = self.bus.read_functionally(self, address)
+            if mem_op:
+                self.memory_controller.access_functionally(self, address, False)
+            self.reserve_space_for_incoming_block(address, functional=True)
+            self.data.set_state(self.find_block(address), SHARED if payload_words else EXCLUSIVE)
+            if not payload_words:
+                self.memory_controller.access_functionally(self, address, True)
+        elif job.type == STORE and (slot < 0 or self.data.state(slot) not in [MODIFIED, EXCLUSIVE]):
+            payload_words = self.bus.read_x_functionally(self, address)
+            self.reserve_space_for_incoming_block(address, functional=True)
+            fetch = not payload_words and self.find_valid_block(address) < 0
+            self.data.set_state(self.find_block(address), MODIFIED)
+            if fetch:
+                self.memory_controller.access_functionally(self, address, True)
+        else:  # a hit, the block is not locked
+            if job.type == STORE:
+                self.data.set_state(slot, MODIFIED)
+            self.update_cache_set_access_order(set_index, tag)
+            return
+        self.update_cache_set_access_order(set_index, tag)
+        self.unlock_block(address)
+
+    def find_block(self, address):
+        """
+        :param address: 32-bit memory address
+        :return: slot in self.data of the block that contains the address, blocks in Invalid state included. -1 if
+        the block is not found in cache
+        """
+        tag, set_index, offset = self.resolve_memory_address(address)
+        return self.data.lookup(set_index, tag)
+
+    def find_valid_block(self, address):
+        """
+        :param address: 32-bit memory address
+        :return: slot in self.data of the block that contains the address and is not in Invalid state, -1 if not found
+        """
+        tag, set_index, offset = self.resolve_memory_address(address)
+        return self.data.lookup_valid(set_index, tag)
+
     def get_cache_block(self, address):
         """
         get the cache block that contains the address, note that blocks in Invalid state will also be returned. As
         long as tag and index has a match.
         :param address: 32-bit memory address
-        :return: None if block containing this address is not found in cache, otherwise the found block
+        :return: None if block containing this address is not found in cache, otherwise a view of the found block
         """
-        tag, set_index, offset = self.resolve_memory_address(address)
-        for block in self.data[set_index]:
-            if block[0] == tag:
-                return block
-
-        return None
+        slot = self.find_block(address)
+        return None if slot < 0 else self.data.block(slot)
 
     def lock_block(self, address, lock=READ_LOCKED):
-        tag, set_index, offset = self.resolve_memory_address(address)
-        for block in self.data[set_index]:
-            if block[0] == tag:
-                block[2] = lock
-                return
+        slot = self.find_block(address)
+        if slot >= 0:
+            self.data.set_lock(slot, lock)
 
         # raise LookupError("[lock_block] block not found in cache")
 
     def unlock_block(self, address):
         tag, set_index, offset = self.resolve_memory_address(address)
-        for block in self.data[set_index]:
-            if block[0] == tag:
-                block[2] = UNLOCKED
+        self.data.unlock(set_index, tag)
 
     def start_hitting(self):
         tag, set_index, _ = self.resolve_memory_address(self.current_job.address)
@@ -110,62 +186,77 @@ class CacheBase:
 
     def update_cache_set_access_order(self, cache_set_index, block_tag):
         """
-        Reorder a cache set by bringing the latest accessed block to the front, and shift the rest back.
+        Mark the latest accessed block as the most recently used one of its cache set. Blocks stay in their ways.
         :param cache_set_index: index of the cache set
         :param block_tag: tag number of the latest accessed block
         :return: None
         """
-        cache_set = self.data[cache_set_index]
-        target_index = -1
-        current_order = list(range(len(cache_set)))
-        for i in current_order:
-            if cache_set[i][1] != INVALID and cache_set[i][0] == block_tag:
-                target_index = i
-        if target_index < 0:
+        slot = self.data.lookup_last_valid(cache_set_index, block_tag)
+        if slot < 0:
             raise LookupError("block with tag {} does not exist in the cache set!".format(block_tag))
-        new_order = current_order.copy()
-        new_order.remove(target_index)
-        new_order.insert(0, target_index)
-        cache_set[:] = cache_set[new_order]
+        self.data.touch(slot)
 
-    def reserve_space_for_incoming_block(self, address):
+    def reserve_space_for_incoming_block(self, address, functional=False):
         """
         find an available block slot for <address> in the corresponding cache_set, if the cache_set is full, i.e. all
         blocks are valid, then the least recently accessed block will be evicted. Once a slot is secured replace that
         slot with <address> block and write protect it by setting its lock bit to WRITE_LOCKED.
         :param address:
+        :param functional: True to write the evicted block back at once, without timing
         :return: True if resulting in block eviction, otherwise False
         """
         tag, set_index, offset = self.resolve_memory_address(address)
-        target_block = None
         need_eviction = False
-        for block in self.data[set_index]:
-            if block[0] == tag:
-                target_block = block
-                break
-            if block[1] == INVALID:
-                target_block = block
-
-        if target_block is None:
-            target_block = self.data[set_index][-1]  # set to the least recently accessed block
-            if target_block[1] == MODIFIED:
+        slot = self.data.lookup(set_index, tag)
+        if slot < 0:
+            slot = self.data.find_invalid(set_index, last=True)
+
+        if slot < 0:
+            slot = self.data.victim(set_index)  # the least recently accessed block
+            if self.data.state(slot) == MODIFIED:
                 need_eviction = True
-                self.evict_block(self.data[set_index][-1])
-            target_block[1] = INVALID
+                self.evict_block(self.data.block(slot), functional)
+            self.data.set_state(slot, INVALID)
 
-        target_block[0] = tag
-        target_block[2] = WRITE_LOCKED
+        self.data.write(slot, tag, self.data.state(slot), WRITE_LOCKED)
         return need_eviction
 
 # <<<<<<< HEAD
 #     def evict_block(self, block, set_index=0):
 # =======
-    def evict_block(self, block):
-        self.memory_controller.evict_block(self, self.current_job.address)
+    def evict_block(self, block, functional=False):
+        slot = block.slot
+        address = self.get_address_from_pieces(self.data.tag(slot), slot // self.assoc)
+        if functional:
+            self.memory_controller.access_functionally(self, address, False)
+        else:
+            self.memory_controller.evict_block(self, address)
 
     def evict_block_passive(self, address):
         self.memory_controller.evict_block(self, address)
 
+    def block_address(self, slot, tag):
+        """
+        :return: address of the block in <slot> with <tag> divided by the block size, the key of the snoop filter
+        """
+        return tag << self.m | slot // self.assoc
+
+    def on_block_validity_changed(self, slot, tag, valid):
+        """
+        TagStore listener keeping the snoop filter of the bus up to date
+        """
+        if valid:
+            self.bus.snoop_filter.add(self.block_address(slot, tag), self.bus_index)
+        elif self.data.lookup_valid(slot // self.assoc, tag) < 0:  # no other valid copy is left in the set
+            self.bus.snoop_filter.remove(self.block_address(slot, tag), self.bus_index)
+
+    def trace_state_change(self, slot, tag, old_state, new_state):
+        """
+        TagStore state listener recording state transitions while a tracer is attached
+        """
+        self.tracer.record(STATE_TRANSITION, self.name, self.get_address_from_pieces(tag, slot // self.assoc),
+                           old_state << 4 | new_state)
+
     def get_address_from_pieces(self, tag, cache_set_index, block_offset=0):
         address = block_offset
         tag = tag << self.m + self.n
@@ -0,0 +1,154 @@
+from components.mesibus import Bus
+from components.snoopfilter import SnoopFilter
+from tracing import BUS_GRANT
+
+
+class Directory(Bus):
+    """
+    Home directory replacing the snooping bus for directory-based MESI. It keeps the sharer set of every block (the
+    presence bit vectors of a SnoopFilter) and the cache owning it in Exclusive or Modified state, and talks to the
+    caches with point-to-point messages instead of broadcasts.
+
+    Requests are serialized per block instead of on a single bus: a cache is granted its block unless another cache
+    currently holds a grant for the same block, so transactions on different blocks overlap. Every transaction
+    served by another cache costs 3 hops (requester -> home -> sharers -> requester) of <hop_latency> cycles. Requests
+    served by memory pay no extra latency, the directory is located at the memory controller.
+
+    The bus traffic and invalidation counters keep the meaning they have for the snooping bus, so both can be
+    compared on the same trace; the number of point-to-point messages is counted in <messages>.
+    """
+    def __init__(self, hop_latency=10):
+        super().__init__(SnoopFilter())
+        self.hop_latency = hop_latency
+        self.granted = {}  # cache -> address of the block it holds the grant for
+        self.owners = {}  # block address -> cache holding the block in Exclusive or Modified state
+        self.pending_latency = {}  # cache -> directory latency of its last granted request, taken by the cache
+        self.messages = 0
+
+    def process_applications(self):
+        served = set()
+        for cache, callback in self.applicants:
+            block_address = cache.current_job.address >> cache.n
+            # caches may apply twice within one interim, only their first application counts
+            if cache in served or block_address in self.granted.values():
+                callback(False)
+            else:
+                served.add(cache)
+                self.granted[cache] = block_address
+                if self.tracer is not None:
+                    self.tracer.record(BUS_GRANT, cache.name, cache.current_job.address)
+                callback(True)
+        self.applicants.clear()
+
+    def blocks(self, cache):
+        """
+        :return: True if another cache holds the grant for the block <cache> applies for
+        """
+        block_address = cache.current_job.address >> cache.n
+        return any(block == block_address and holder is not cache for holder, block in self.granted.items())
+
+    def release_ownership(self, caller):
+        if caller not in self.granted:
+            raise PermissionError("Requester {} does not hold a directory grant".format(caller.name))
+        del self.granted[caller]
+
+    def check_grant(self, caller, address):
+        if self.granted.get(caller) != address >> caller.n:
+            raise PermissionError("Requester {} does not hold the directory grant of block {}".format(
+                caller.name, hex(address)))
+
+    def sharers(self, caller, block_address):
+        """
+        :return: list of the caches other than <caller> holding a valid copy of the block, in bus order
+        """
+        return self.snoop_filter.holders(self.connected_caches, caller, block_address)
+
+    def owner(self, caller, block_address, sharers):
+        owner = self.owners.get(block_address)
+        if owner is None or owner == caller or owner not in sharers:
+            return None
+        return owner
+
+    def send_read_req(self, caller, address):
+        self.check_grant(caller, address)
+        block_address = address >> caller.n
+        sharers = self.sharers(caller, block_address)
+        # a single cache supplies the data: the owner if there is one, otherwise any sharer
+        supplier = self.owner(caller, block_address, sharers) or (sharers[0] if sharers else None)
+        if supplier is None:
+            self.messages += 2  # request to home, data from memory
+            self.owners[block_address] = caller
+            self.pending_latency[caller] = 0
+            return True, 0, False
+
+        response, payload_words, mem_op = supplier.bus_read(address)
+        if self.tracer is not None:
+            self.trace_snoop_response(supplier, address, response, payload_words)
+        if not response:
+            return False, 0, mem_op
+        if mem_op:
+            caller.evict_block_passive(address)
+        self.messages += 3  # request to home, forward to the supplier, data to the requester
+        self.owners.pop(block_address, None)
+        self.pending_latency[caller] = 3 * self.hop_latency
+        if payload_words:
+            self.total_bus_traffic += payload_words * 4
+        return True, payload_words, mem_op
+
+    def send_read_X_req(self, caller, address):
+        self.check_grant(caller, address)
+        block_address = address >> caller.n
+        sharers = self.sharers(caller, block_address)
+        if any(cache.data.lock(cache.find_valid_block(address)) for cache in sharers):
+            return False, 0, False
+
+        aggregated_payload = 0
+        for cache in sharers:
+            response, payload_words, _ = cache.bus_readx(address)
+            if self.tracer is not None:
+                self.trace_snoop_response(cache, address, response, payload_words)
+            if payload_words:
+                aggregated_payload = payload_words
+        if sharers:
+            self.messages += 1 + 2 * len(sharers)  # request to home, invalidation and acknowledgement per sharer
+            self.pending_latency[caller] = 3 * self.hop_latency
+        else:
+            self.messages += 2  # request to home, data or acknowledgement from home
+            self.pending_latency[caller] = 2 * self.hop_latency if caller.get_cache_block(address) is not None else 0
+        self.owners[block_address] = caller
+
+        self.total_bus_invalidation_or_updates += 1
+        if aggregated_payload:
+            self.total_bus_traffic += aggregated_payload * 4
+        return True, aggregated_payload, False
+
+    def read_functionally(self, caller, address):
+        """
+        serve a read of <caller> at once, without a grant, latency, messages or statistics, used by the functional
+        mode of the caches
+        :return: tuple(Int, Boolean) payload size, 0 if memory supplies the block, and True if the supplier's dirty
+        copy has to be written back to memory
+        """
+        block_address = address >> caller.n
+        sharers = self.sharers(caller, block_address)
+        supplier = self.owner(caller, block_address, sharers) or (sharers[0] if sharers else None)
+        if supplier is None:
+            self.owners[block_address] = caller
+            return 0, False
+        _, payload_words, mem_op = supplier.bus_read(address)
+        self.owners.pop(block_address, None)
+        return payload_words, mem_op
+
+    def read_x_functionally(self, caller, address):
+        """
+        serve a read for ownership of <caller> at once, see read_functionally
+        :return: payload size, 0 if no other cache had the block
+        """
+        block_address = address >> caller.n
+        aggregated_payload = 0
+        for cache in self.sharers(caller, block_address):
+            _, payload_words, _ = cache.bus_readx(address)
+            if payload_words:
+                aggregated_payload = payload_words
+        self.owners[block_address] = caller
+        return aggregated_payload
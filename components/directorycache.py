@@ -0,0 +1,43 @@
+from components.mesicache import MesiCache
+from constants.cache import *
+from constants.jobtype import *
+from constants.mesi import *
+
+
+class DirectoryMesiCache(MesiCache):
+    """
+    MESI cache attached to a components.directory.Directory instead of a snooping bus. The protocol states are the
+    same as for MesiCache; on top of the bus transfer time every transaction waits for the hop latency of the
+    directory messages it needs.
+    """
+    def proceed_with_bus_payload(self, payload_words):
+        latency = self.bus.pending_latency.pop(self, 0)
+        if self.current_job.type == LOAD:
+            if payload_words:
+                self.set_block_state(self.current_job.address, SHARED)
+                self.current_job.status_in_cache = RECEIVING_FROM_BUS
+                self.current_job.remaining_bus_read_cycles = payload_words * 2 + latency
+            else:
+                self.set_block_state(self.current_job.address, EXCLUSIVE)
+                self.cache_miss_count += 1
+                self.bus.release_ownership(self)
+                self.memory_controller.fetch_block(self, self.current_job.address)
+                self.current_job.status_in_cache = WAITING_FOR_MEMORY
+
+        if self.current_job.type == STORE:
+            if self.get_cache_block(self.current_job.address) is not None:  # block is present, invalidation only
+                self.set_block_state(self.current_job.address, MODIFIED)
+                if latency:  # wait for the acknowledgements
+                    self.current_job.status_in_cache = RECEIVING_FROM_BUS
+                    self.current_job.remaining_bus_read_cycles = latency
+                else:
+                    self.on_bus_read_finished()
+            elif payload_words:  # data will be supplied by one of other caches
+                self.set_block_state(self.current_job.address, MODIFIED)
+                self.current_job.status_in_cache = RECEIVING_FROM_BUS
+                self.current_job.remaining_bus_read_cycles = payload_words * 2 + latency
+            else:  # other caches do not have copy, therefore fetch from memory
+                self.bus.release_ownership(self)
+                self.set_block_state(self.current_job.address, MODIFIED)
+                self.memory_controller.fetch_block(self, self.current_job.address)
+                self.current_job.status_in_cache = WAITING_FOR_MEMORY
@@ -7,8 +7,6 @@ from constants.dragon import *
 from job import CacheJob
 from util import resolve_memory_address
 
-from util import resolve_memory_address, debug
-
 # tt = 0
 
 class DragonCache(CacheBase):
@@ -30,6 +28,38 @@ class DragonCache(CacheBase):
         if self.current_job.status_in_cache == OTHER_SIDE_BLOCKING:
             self.send_job_specific_bus_request()
 
+    def access_functionally(self, job):
+        """
+        Apply a load or store to the cache at once, without timing, see CacheBase. A store to a block other caches
+        share updates their copies, which stay valid.
+        :param job: processor Load/Store job
+        :return: None
+        """
+        address = job.address >> self.n << self.n
+        tag, set_index, _ = self.resolve_memory_address(address)
+        slot = self.data.lookup_valid(set_index, tag)
+        if job.type == LOAD and slot < 0:
+            payload_words, mem_op = self.bus.read_functionally(self, address)
+            if mem_op:
+                self.memory_controller.access_functionally(self, address, False)
+            self.reserve_space_for_incoming_block(address, functional=True)
+            self.set_block_state(address, SC if payload_words else EC)
+            if not payload_words:
+                self.memory_controller.access_functionally(self, address, True)
+        elif job.type == STORE and (slot < 0 or self.data.state(slot) not in [EC, M]):
+            payload_words = self.bus.update_functionally(self, address)
+            self.reserve_space_for_incoming_block(address, functional=True)
+            self.set_block_state(address, SM if payload_words else M)
+            if not payload_words:
+                self.memory_controller.access_functionally(self, address, True)
+        else:  # a hit, the block is not locked
+            if job.type == STORE:
+                self.data.set_state(slot, M)
+            self.update_cache_set_access_order(set_index, tag)
+            return
+        self.update_cache_set_access_order(set_index, tag)
+        self.unlock_block(address)
+
     def handle_fresh_job(self, job):
         local_hit = False
         if job.type == LOAD:
@@ -41,17 +71,17 @@ class DragonCache(CacheBase):
             self.bus.apply_for_bus_master(self, self.bus_control_granted)
 
     def handle_proc_read(self, job):
-        block = self.get_cache_block(job.address)
-        if block is not None:
-            if block[1] != INVALID:
+        slot = self.find_valid_block(job.address)
+        if slot >= 0:
+            if self.data.state(slot) != INVALID:
                 self.start_hitting()
                 return True
         return False
 
     def handle_proc_write(self, job):
-        block = self.get_cache_block(job.address)
-        if block is not None:
-            if block[1] in [EC, M]:
+        slot = self.find_valid_block(job.address)
+        if slot >= 0:
+            if self.data.state(slot) in [EC, M]:
                 self.start_hitting()
                 return True
         return False
@@ -88,7 +118,6 @@ class DragonCache(CacheBase):
                 self.set_block_state(self.current_job.address, SC)
                 self.current_job.status_in_cache = RECEIVING_FROM_BUS
                 self.current_job.remaining_bus_read_cycles = payload_words * 2
-                debug("{} start reading from Bus: {} cycles".format(self.name, self.current_job.remaining_bus_read_cycles))
 
             else:  # result comes without payload, other caches do not have copy, therefore fetch from memory
                 self.set_block_state(self.current_job.address, EC)
@@ -96,7 +125,6 @@ class DragonCache(CacheBase):
                 self.bus.release_ownership(self)
                 self.memory_controller.fetch_block(self, self.current_job.address)
                 self.current_job.status_in_cache = WAITING_FOR_MEMORY
-                debug("{} start fetching from Mem: 100 cycles".format(self.name))
 
         if self.current_job.type == STORE:
 
@@ -123,27 +151,24 @@ class DragonCache(CacheBase):
         self.current_job.status_in_cache = HITTING
 
         # statistics record
-        if self.get_cache_block(self.current_job.address)[1] not in [SC, SM]:
+        if self.data.state(self.find_valid_block(self.current_job.address)) not in [SC, SM]:
             self.total_private_accesses += 1
 
     def on_hit_finished(self):
         if self.current_job.type == STORE:
-            block = self.get_cache_block(self.current_job.address)
-            if block[1] == EC:
-                block[1] = M
-            elif block[1] == SC:
-                block[1] = SM
+            slot = self.find_valid_block(self.current_job.address)
+            if self.data.state(slot) == EC:
+                self.data.set_state(slot, M)
+            elif self.data.state(slot) == SC:
+                self.data.set_state(slot, SM)
         self.unlock_block(self.current_job.address)
         self.current_job = None
 
     def set_block_state(self, address, state):
-        tag, set_index, offset = self.resolve_memory_address(address)
-        for block in self.data[set_index]:
-            if block[0] == tag:
-                block[1] = state
-                return
-
-        raise LookupError("[set_block_state] block not found in cache")
+        slot = self.find_block(address)
+        if slot < 0:
+            raise LookupError("[set_block_state] block not found in cache")
+        self.data.set_state(slot, state)
 
     def on_bus_read_finished(self):
         if self.current_job.status_in_cache == WAITING_FOR_BUS_UPD:
@@ -164,23 +189,23 @@ class DragonCache(CacheBase):
         :return: tuple(Boolean, Int) Boolean value is False if the block is available but being locked, otherwise True
         Int value is the payload size if the block is available and ready to be transmitted, or 0 if block not found.
         """
-        block = self.get_cache_block(address)
+        slot = self.find_valid_block(address)
         mem_op = False
-        if block is not None:
-            if block[2] > READ_LOCKED:
+        if slot >= 0:
+            if self.data.lock(slot) > READ_LOCKED:
                 return False, 0, mem_op
-            if block[1] == SC:
+            if self.data.state(slot) == SC:
                 return True, self.block_size//4, mem_op
-            elif block[1] == EC:
-                block[1] = SC
+            elif self.data.state(slot) == EC:
+                self.data.set_state(slot, SC)
                 return True, self.block_size//4, mem_op
-            elif block[1] == M:
+            elif self.data.state(slot) == M:
                 # self.evict_block_passive(block)
                 if self.bus_mem_op:
                     mem_op = True
-                block[1] = SM
+                self.data.set_state(slot, SM)
                 return True, self.block_size//4, mem_op
-            elif block[1] == SM:
+            elif self.data.state(slot) == SM:
                 # self.evict_block_passive(block)
                 if self.bus_mem_op:
                     mem_op = True
@@ -189,12 +214,12 @@ class DragonCache(CacheBase):
         return True, 0, mem_op
 
     def bus_update(self, address):
-        block = self.get_cache_block(address)
-        if block is not None:
-            if block[2] > UNLOCKED:
+        slot = self.find_valid_block(address)
+        if slot >= 0:
+            if self.data.lock(slot) > UNLOCKED:
                 return False, 0
             else:
-                block[1] = SC
+                self.data.set_state(slot, SC)
                 return True, self.block_size // 4
 
         return True, 0
@@ -206,55 +231,48 @@ class DragonCache(CacheBase):
         :param address: 32-bit memory address
         :return: None if block containing this address is not found in cache, otherwise the found block
         """
-        tag, set_index, offset = self.resolve_memory_address(address)
-        for block in self.data[set_index]:
-            if block[0] == tag and block[1] != INVALID:
-                return block
-
-        return None
+        slot = self.find_valid_block(address)
+        return None if slot < 0 else self.data.block(slot)
 
-    def reserve_space_for_incoming_block(self, address):
+    def reserve_space_for_incoming_block(self, address, functional=False):
         """
         find an available block slot for <address> in the corresponding cache_set, if the cache_set is full, i.e. all
         blocks are valid, then the least recently accessed block will be evicted. Once a slot is secured replace that
         slot with <address> block and write protect it by setting its lock bit to WRITE_LOCKED.
         :param address:
+        :param functional: True to write the evicted block back at once, without timing
         :return: True if resulting in block eviction, otherwise False
         """
         tag, set_index, offset = self.resolve_memory_address(address)
-        target_block = None
         need_eviction = False
-        for block in self.data[set_index]:
-            if block[0] == tag:
-                target_block = block
-                break
-            if block[1] == INVALID:
-                target_block = block
-                break
-
-        if target_block is None:
-            target_block = self.data[set_index][-1]  # set to the least recently accessed block
-            if target_block[1] == M:
+        slot = self.data.lookup(set_index, tag)
+        invalid_slot = self.data.find_invalid(set_index)
+        # whichever of the two was accessed more recently
+        if slot < 0 or invalid_slot >= 0 and self.data.stamps[invalid_slot] > self.data.stamps[slot]:
+            slot = invalid_slot
+
+        if slot < 0:
+            slot = self.data.victim(set_index)  # the least recently accessed block
+            if self.data.state(slot) == M:
                 need_eviction = True
-                self.evict_block(self.data[set_index][-1])
-            elif target_block[1] == SM:
-                blocks = self.bus.check_share_line(self, self.get_address_from_pieces(target_block[0], set_index))
+                self.evict_block(self.data.block(slot), functional)
+            elif self.data.state(slot) == SM:
+                blocks = self.bus.check_share_line(self, self.get_address_from_pieces(self.data.tag(slot), set_index))
                 if len(blocks) == 1:
                     blocks[0][1] = EC
                 elif len(blocks) > 1:
                     for b in blocks:
                         b[1] = SC
                 need_eviction = True
-                self.evict_block(self.data[set_index][-1])
-            elif target_block[1] == SC:
-                blocks = self.bus.check_share_line(self, self.get_address_from_pieces(target_block[0], set_index))
+                self.evict_block(self.data.block(slot), functional)
+            elif self.data.state(slot) == SC:
+                blocks = self.bus.check_share_line(self, self.get_address_from_pieces(self.data.tag(slot), set_index))
                 if len(blocks) == 1:
                     blocks[0][1] = EC
                 elif len(blocks) > 1:
                     for b in blocks:
                         b[1] = SC
-            target_block[1] = INVALID
+            self.data.set_state(slot, INVALID)
 
-        target_block[0] = tag
-        target_block[2] = WRITE_LOCKED
+        self.data.write(slot, tag, self.data.state(slot), WRITE_LOCKED)
         return need_eviction
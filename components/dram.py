@@ -0,0 +1,196 @@
+import heapq
+
+from tracing import MEMORY_EVICT, MEMORY_FETCH
+
+
+class DramRequest:
+    __slots__ = ['requester', 'fetch', 'address', 'bank', 'row', 'arrival', 'cancelled']
+
+    def __init__(self, requester, fetch, address, bank, row, arrival):
+        self.requester = requester
+        self.fetch = fetch  # True for a fetch, False for an eviction
+        self.address = address
+        self.bank = bank  # index over the banks of all channels
+        self.row = row
+        self.arrival = arrival
+        self.cancelled = False
+
+
+class DramController:
+    """
+    Banked DRAM behind the same fetch_block/evict_block interface as MemoryController.
+
+    Consecutive rows of <row_size> bytes are interleaved over the channels and then over the banks of a channel. Every
+    bank keeps its last row open: an access to the open row costs t_cas, one to a closed bank t_rcd + t_cas and one
+    to another row t_rp + t_rcd + t_cas cycles. The block is then sent over the data bus of the channel, which moves
+    <bytes_per_cycle> bytes per cycle and serves one block at a time.
+
+    Requests wait in a queue per channel. Every cycle each channel starts at most one request on an idle bank, picking
+    the oldest request to an open row first and else the oldest request (FR-FCFS). A requester is notified once all
+    its outstanding fetches, or evictions, have completed.
+    """
+    def __init__(self, channels=1, banks=8, row_size=2048, block_size=32, bytes_per_cycle=8, t_cas=30, t_rcd=30,
+                 t_rp=30):
+        self.channels = channels
+        self.banks = banks
+        self.row_size = row_size
+        self.burst_cycles = -(-block_size // bytes_per_cycle)
+        self.t_cas = t_cas
+        self.t_rcd = t_rcd
+        self.t_rp = t_rp
+        self.cycle = 0  # ticks and skipped cycles so far
+        self.queues = [[] for _ in range(channels)]  # waiting requests of every channel, oldest first
+        self.open_rows = [None] * (channels * banks)
+        self.bank_ready = [0] * (channels * banks)  # cycle from which a bank can start the next request
+        self.bus_free = [0] * channels  # cycle from which the data bus of a channel is free
+        self.in_flight = []  # min-heap of (completion cycle, order, request)
+        self.started = 0
+        self.loading = {}  # requester -> list of its outstanding fetch requests
+        self.storing = {}
+        self.tracer = None
+
+        self.requests = 0
+        self.row_hits = 0
+        self.queueing_delay = 0
+
+    def map_address(self, address):
+        """
+        :return: tuple(channel, bank index over all channels, row)
+        """
+        row_index = address // self.row_size
+        channel = row_index % self.channels
+        bank = row_index // self.channels % self.banks
+        return channel, channel * self.banks + bank, row_index // (self.channels * self.banks)
+
+    def enqueue(self, requests, requester, address, fetch):
+        channel, bank, row = self.map_address(address)
+        request = DramRequest(requester, fetch, address, bank, row, self.cycle)
+        self.queues[channel].append(request)
+        requests.setdefault(requester, []).append(request)
+
+    def fetch_block(self, requester, address):
+        self.enqueue(self.loading, requester, address, True)
+
+    def evict_block(self, requester, address):
+        self.enqueue(self.storing, requester, address, False)
+
+    def complete(self, requester):
+        """
+        finish the outstanding evictions, or else fetches, of <requester> at once, used by untimed execution
+        """
+        for requests, finished in ((self.storing, requester.on_evict_to_memory_finished),
+                                   (self.loading, requester.on_fetch_from_memory_finished)):
+            if requester in requests:
+                for request in requests.pop(requester):
+                    request.cancelled = True
+                    queue = self.queues[request.bank // self.banks]
+                    if request in queue:
+                        queue.remove(request)
+                finished()
+                return
+
+    def access_functionally(self, requester, address, fetch):
+        """
+        fetch (<fetch> True) or write back the block of <address> at once, used by the functional mode of the caches.
+        Memory holds every block and untimed accesses leave the banks alone, so nothing changes
+        """
+        pass
+
+    def schedule(self, queue):
+        """
+        :return: request of <queue> to start in this cycle, None if all of their banks are busy
+        """
+        oldest = None
+        for request in queue:
+            if self.bank_ready[request.bank] > self.cycle:
+                continue
+            if self.open_rows[request.bank] == request.row:
+                return request
+            if oldest is None:
+                oldest = request
+        return oldest
+
+    def start(self, channel, request):
+        open_row = self.open_rows[request.bank]
+        if open_row == request.row:
+            latency = self.t_cas
+            self.row_hits += 1
+        elif open_row is None:
+            latency = self.t_rcd + self.t_cas
+        else:
+            latency = self.t_rp + self.t_rcd + self.t_cas
+        self.open_rows[request.bank] = request.row
+        self.bank_ready[request.bank] = self.cycle + latency
+        completion = max(self.cycle + latency, self.bus_free[channel]) + self.burst_cycles
+        self.bus_free[channel] = completion
+        self.requests += 1
+        self.queueing_delay += self.cycle - request.arrival - 1  # a request can start in the cycle after it arrived
+        self.started += 1
+        heapq.heappush(self.in_flight, (completion, self.started, request))
+        if self.tracer is not None:
+            self.tracer.record(MEMORY_FETCH if request.fetch else MEMORY_EVICT, request.requester.name,
+                               request.address, completion - self.cycle)
+
+    def finish(self, request):
+        requests = self.loading if request.fetch else self.storing
+        outstanding = requests[request.requester]
+        outstanding.remove(request)
+        if outstanding:
+            return
+        del requests[request.requester]
+        if request.fetch:
+            request.requester.on_fetch_from_memory_finished()
+        else:
+            request.requester.on_evict_to_memory_finished()
+
+    def queue_depth(self):
+        """
+        :return: number of outstanding requests, waiting or being served
+        """
+        return sum(len(requests) for requests in self.loading.values()) + \
+            sum(len(requests) for requests in self.storing.values())
+
+    def row_buffer_hit_rate(self):
+        return self.row_hits / self.requests if self.requests else 0.0
+
+    def average_queueing_delay(self):
+        """
+        :return: average number of cycles a request waited in its queue for a bank
+        """
+        return self.queueing_delay / self.requests if self.requests else 0.0
+
+    def reset_statistics(self):
+        self.requests = 0
+        self.row_hits = 0
+        self.queueing_delay = 0
+
+    def cycles_to_next_event(self):
+        """
+        :return: number of clock cycles until a request completes or can start, None if nothing is outstanding
+        """
+        while self.in_flight and self.in_flight[0][2].cancelled:
+            heapq.heappop(self.in_flight)
+        wake_up = self.in_flight[0][0] if self.in_flight else None
+        for queue in self.queues:
+            if queue:
+                ready = max(min(self.bank_ready[request.bank] for request in queue), self.cycle + 1)
+                wake_up = ready if wake_up is None else min(wake_up, ready)
+        if wake_up is None:
+            return None
+        return max(wake_up - self.cycle, 1)
+
+    def skip_cycles(self, cycles):
+        self.cycle += cycles
+
+    def tick(self):
+        self.cycle += 1
+        while self.in_flight and self.in_flight[0][0] <= self.cycle:
+            request = heapq.heappop(self.in_flight)[2]
+            if not request.cancelled:
+                self.finish(request)
+        for channel, queue in enumerate(self.queues):
+            if queue:
+                request = self.schedule(queue)
+                if request is not None:
+                    queue.remove(request)
+                    self.start(channel, request)
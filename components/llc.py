@@ -0,0 +1,308 @@
+import heapq
+from collections import OrderedDict
+from math import log
+
+from components.memorycontroller import MemoryController
+from constants.locking import UNLOCKED
+from constants.mesi import INVALID, MODIFIED
+from constants.moesi import OWNED
+
+DIRTY_STATES = (MODIFIED, OWNED)  # Dragon's M and SM have the same values
+
+
+class LLCRequest:
+    """
+    Fetch or write-back waiting in the LLC. A request that misses is also the requester of the memory fetch, and an
+    LLC victim written back to memory gets a request of its own, without <requester>.
+    """
+    __slots__ = ['llc', 'requester', 'name', 'fetch', 'block', 'looked_up']
+
+    def __init__(self, llc, requester, name, fetch, block):
+        self.llc = llc
+        self.requester = requester
+        self.name = name  # name of the L1 cache the request comes from, used by the tracer of the memory controller
+        self.fetch = fetch  # True for a fetch, False for a write-back
+        self.block = block  # address divided by the block size
+        self.looked_up = False
+
+    def on_fetch_from_memory_finished(self):
+        self.llc.fill(self)
+
+    def on_evict_to_memory_finished(self):
+        pass
+
+
+class SharedLLC:
+    """
+    Last-level cache shared by all cores, between the private L1 caches and a memory controller and behind the same
+    fetch_block/evict_block interface, so the caches and the bus do not know whether it is there.
+
+    Every fetch and write-back of an L1 first spends <latency> cycles looking up the tags. A fetch that hits completes
+    after the lookup; one that misses then goes to the memory controller and fills the LLC when memory returns the
+    block. Misses on a block already on its way from memory wait for that fill instead of fetching it again. An L1
+    write-back ends in the LLC, which allocates the block if needed; memory only sees the dirty blocks the LLC
+    evicts, least recently used first.
+
+    A non-inclusive LLC leaves the L1 copies of the blocks it evicts alone. An inclusive one invalidates them (back
+    invalidation) and writes the block back if any copy was dirty. It only evicts blocks that no L1 is busy with; while
+    every block of a set is busy, the set holds more blocks than it has ways until one of them can be evicted.
+    """
+    def __init__(self, memory_controller=None, size=262144, assoc=8, block_size=32, latency=20, inclusive=False):
+        """
+        :param memory_controller: MemoryController or DramController behind the LLC, a new MemoryController by default
+        :param size: capacity in bytes
+        :param latency: cycles of a tag lookup, the latency of a hit
+        """
+        if size < assoc * block_size:
+            raise ValueError("LLC of {} bytes cannot hold {} ways of {} byte blocks".format(size, assoc, block_size))
+        self.memory_controller = memory_controller if memory_controller is not None else MemoryController()
+        self.assoc = assoc
+        self.block_size = block_size
+        self.n = int(log(block_size, 2))
+        self.num_sets = size // assoc // block_size
+        self.sets = [OrderedDict() for _ in range(self.num_sets)]  # block -> dirty, least recently used first
+        self.latency = latency
+        self.inclusive = inclusive
+        self.caches = []  # L1 caches, back-invalidated by an inclusive LLC
+        self.cycle = 0  # ticks and skipped cycles so far
+        self.lookups = []  # min-heap of (cycle the tag lookup finishes, order, request)
+        self.issued = 0
+        self.missing = {}  # block -> fetch requests waiting for it to come from memory, the first one fetches it
+        self.loading = {}  # requester -> list of its outstanding fetch requests
+        self.storing = {}
+        self.overfull = {}  # set index -> name of the L1 cache whose request filled the set, sets over their ways
+
+        self.hits = 0
+        self.misses = 0
+        self.writebacks = 0  # write-backs of the L1 caches
+        self.memory_fetches = 0
+        self.memory_writebacks = 0
+        self.back_invalidations = 0
+
+    @property
+    def tracer(self):
+        return self.memory_controller.tracer
+
+    @tracer.setter
+    def tracer(self, tracer):
+        # memory fetch and evict events keep describing memory traffic, which is what is left below the LLC
+        self.memory_controller.tracer = tracer
+
+    def connect(self, caches):
+        self.caches = list(caches)
+
+    def enqueue(self, requests, requester, address, fetch):
+        request = LLCRequest(self, requester, requester.name, fetch, address >> self.n)
+        requests.setdefault(requester, []).append(request)
+        self.issued += 1
+        heapq.heappush(self.lookups, (self.cycle + self.latency, self.issued, request))
+
+    def fetch_block(self, requester, address):
+        self.enqueue(self.loading, requester, address, True)
+
+    def evict_block(self, requester, address):
+        self.writebacks += 1
+        self.enqueue(self.storing, requester, address, False)
+
+    def complete(self, requester):
+        """
+        finish the outstanding write-backs, or else fetches, of <requester> at once, used by untimed execution
+        """
+        requests = self.storing if requester in self.storing else self.loading
+        for request in list(requests.get(requester, ())):
+            if not request.looked_up:
+                self.look_up(request)  # its entry in the lookup heap is skipped from now on
+        for request in list(requests.get(requester, ())):
+            if request in requests.get(requester, ()):  # not already filled along with an earlier one
+                self.memory_controller.complete(self.missing[request.block][0])
+
+    def access_functionally(self, requester, address, fetch):
+        """
+        fetch (<fetch> True) or write back the block of <address> at once, without a lookup latency, used by the
+        functional mode of the caches. Allocation, eviction and back invalidation work as in timed mode, the blocks
+        evicted from the LLC are written back to memory functionally as well
+        """
+        block = address >> self.n
+        lines = self.sets[block % self.num_sets]
+        if not fetch:
+            self.writebacks += 1
+        if block in lines:
+            lines.move_to_end(block)
+            if fetch:
+                self.hits += 1
+            else:
+                lines[block] = True
+            return
+        if fetch:
+            self.misses += 1
+            self.memory_fetches += 1
+        self.allocate(block, not fetch, requester.name, functional=True)
+
+    def look_up(self, request):
+        request.looked_up = True
+        lines = self.sets[request.block % self.num_sets]
+        if request.block in lines:
+            lines.move_to_end(request.block)
+            if request.fetch:
+                self.hits += 1
+            else:
+                lines[request.block] = True
+            self.finish(request)
+        elif not request.fetch:
+            self.allocate(request.block, True, request.name)
+            self.finish(request)
+        else:
+            self.misses += 1
+            waiting = self.missing.get(request.block)
+            if waiting is not None:
+                waiting.append(request)
+                return
+            self.missing[request.block] = [request]
+            self.memory_fetches += 1
+            self.memory_controller.fetch_block(request, request.block << self.n)
+
+    def fill(self, request):
+        """
+        put the block fetched from memory for <request> into the LLC and finish the fetches waiting for it
+        """
+        lines = self.sets[request.block % self.num_sets]
+        if request.block in lines:  # written back by an L1 while it was fetched
+            lines.move_to_end(request.block)
+        else:
+            self.allocate(request.block, False, request.name)
+        for waiting in self.missing.pop(request.block):
+            self.finish(waiting)
+
+    def allocate(self, block, dirty, name, functional=False):
+        set_index = block % self.num_sets
+        self.evict(set_index, name, self.assoc - 1, functional)
+        self.sets[set_index][block] = dirty
+
+    def evict(self, set_index, name, ways, functional=False):
+        """
+        evict the least recently used blocks of a set until it holds at most <ways> blocks. A set whose blocks are
+        all busy in an L1 is noted in <overfull> and evicted down to its ways by a later tick
+        :param name: name of the L1 cache the eviction is traced for
+        :param functional: True to write dirty victims back to memory at once, without timing
+        """
+        lines = self.sets[set_index]
+        while len(lines) > ways:
+            victim = self.victim(lines)
+            if victim is None:
+                self.overfull[set_index] = name
+                return
+            victim_dirty = lines.pop(victim)
+            if self.inclusive:
+                victim_dirty = self.back_invalidate(victim) or victim_dirty
+            if victim_dirty:
+                self.memory_writebacks += 1
+                request = LLCRequest(self, None, name, False, victim)
+                if functional:
+                    self.memory_controller.access_functionally(request, victim << self.n, False)
+                else:
+                    self.memory_controller.evict_block(request, victim << self.n)
+        self.overfull.pop(set_index, None)
+
+    def victim(self, lines):
+        """
+        :return: least recently used block of the set <lines>; for an inclusive LLC the least recently used one that
+        no L1 is busy with, None if there is none
+        """
+        if self.inclusive:
+            for block in lines:
+                if not any(self.busy(cache, block) for cache in self.caches):
+                    return block
+            return None
+        return next(iter(lines))
+
+    def busy(self, cache, block):
+        """
+        :return: True if the copy of <block> in <cache> is locked or the target of its current job
+        """
+        if cache.current_job is not None and cache.current_job.address >> self.n == block:
+            return True
+        slot = cache.find_valid_block(block << self.n)
+        return slot >= 0 and cache.data.lock(slot) != UNLOCKED
+
+    def back_invalidate(self, block):
+        """
+        invalidate the L1 copies of <block>, none of which an L1 may be busy with
+        :return: True if one of them was dirty
+        """
+        dirty = False
+        for cache in self.caches:
+            slot = cache.find_valid_block(block << self.n)
+            if slot < 0:
+                continue
+            dirty = dirty or cache.data.state(slot) in DIRTY_STATES
+            cache.data.set_state(slot, INVALID)
+            self.back_invalidations += 1
+        return dirty
+
+    def finish(self, request):
+        requests = self.loading if request.fetch else self.storing
+        outstanding = requests[request.requester]
+        outstanding.remove(request)
+        if outstanding:
+            return
+        del requests[request.requester]
+        if request.fetch:
+            request.requester.on_fetch_from_memory_finished()
+        else:
+            request.requester.on_evict_to_memory_finished()
+
+    def queue_depth(self):
+        """
+        :return: number of outstanding memory requests, below the LLC
+        """
+        return self.memory_controller.queue_depth()
+
+    def hit_rate(self):
+        accesses = self.hits + self.misses
+        return self.hits / accesses if accesses else 0.0
+
+    def traffic_avoided(self):
+        """
+        :return: bytes the L1 fetches and write-backs would have moved to or from memory without the LLC, minus the
+        bytes moved with it
+        """
+        return (self.hits + self.misses + self.writebacks - self.memory_fetches - self.memory_writebacks) * \
+            self.block_size
+
+    def reset_statistics(self):
+        self.hits = 0
+        self.misses = 0
+        self.writebacks = 0
+        self.memory_fetches = 0
+        self.memory_writebacks = 0
+        self.back_invalidations = 0
+
+    def cycles_to_next_event(self):
+        """
+        :return: number of clock cycles until a tag lookup finishes or the memory controller changes state, None if
+        nothing is outstanding. An over-full set tries to evict a block every cycle
+        """
+        if self.overfull:
+            return 1
+        while self.lookups and self.lookups[0][2].looked_up:
+            heapq.heappop(self.lookups)
+        cycles = self.memory_controller.cycles_to_next_event()
+        if self.lookups:
+            lookup = max(self.lookups[0][0] - self.cycle, 1)
+            cycles = lookup if cycles is None else min(cycles, lookup)
+        return cycles
+
+    def skip_cycles(self, cycles):
+        self.cycle += cycles
+        self.memory_controller.skip_cycles(cycles)
+
+    def tick(self):
+        # memory first, so a miss found in this cycle reaches memory after its clock moved on and waits the full latency
+        self.memory_controller.tick()
+        self.cycle += 1
+        for set_index, name in list(self.overfull.items()):
+            self.evict(set_index, name, self.assoc)
+        while self.lookups and self.lookups[0][0] <= self.cycle:
+            request = heapq.heappop(self.lookups)[2]
+            if not request.looked_up:
+                self.look_up(request)
@@ -1,35 +1,128 @@
+import heapq
+from operator import methodcaller
+
+from tracing import MEMORY_EVICT, MEMORY_FETCH
+
+MEMORY_LATENCY = 100
+
+finish_fetch = methodcaller('on_fetch_from_memory_finished')
+finish_evict = methodcaller('on_evict_to_memory_finished')
+
+
 class MemoryController:
+    """
+    Fetches and evictions are kept in two min-heaps ordered by the cycle they complete in, so a tick only looks at
+    the requests that are due instead of counting every outstanding request down.
+
+    A requester has at most one fetch and one eviction in flight; a second request while one is outstanding extends
+    it by another MEMORY_LATENCY cycles. The extended request gets a new heap entry and the old one is dropped when it
+    comes up, the dicts loading and storing always map a requester to its live entry.
+    """
     def __init__(self):
-        self.loading = {}
+        self.cycle = 0  # ticks and skipped cycles so far
+        self.loading = {}  # requester -> (completion cycle, order, requester)
         self.storing = {}
+        self.fetch_heap = []
+        self.evict_heap = []
+        self.issued = 0  # requests due in the same cycle complete in the order they were issued
+        self.tracer = None
 
-    def fetch_block(self, requester, address):
-        if requester in self.loading:
-            self.loading[requester] += 100
+    def request(self, requests, heap, requester):
+        """
+        :return: cycles until the request of <requester> completes
+        """
+        entry = requests.get(requester)
+        if entry is not None:
+            entry = (entry[0] + MEMORY_LATENCY, entry[1], requester)
         else:
-            self.loading[requester] = 100
+            self.issued += 1
+            entry = (self.cycle + MEMORY_LATENCY, self.issued, requester)
+        requests[requester] = entry
+        heapq.heappush(heap, entry)
+        return entry[0] - self.cycle
+
+    def fetch_block(self, requester, address):
+        cycles = self.request(self.loading, self.fetch_heap, requester)
+        if self.tracer is not None:
+            self.tracer.record(MEMORY_FETCH, requester.name, address, cycles)
 
     def evict_block(self, requester, address):
+        cycles = self.request(self.storing, self.evict_heap, requester)
+        if self.tracer is not None:
+            self.tracer.record(MEMORY_EVICT, requester.name, address, cycles)
+
+    def complete(self, requester):
+        """
+        finish the outstanding eviction, or else fetch, of <requester> at once, used by untimed execution
+        """
         if requester in self.storing:
-            self.storing[requester] += 100
-        else:
-            self.storing[requester] = 100
+            del self.storing[requester]
+            requester.on_evict_to_memory_finished()
+        elif requester in self.loading:
+            del self.loading[requester]
+            requester.on_fetch_from_memory_finished()
+
+    def access_functionally(self, requester, address, fetch):
+        """
+        fetch (<fetch> True) or write back the block of <address> at once, used by the functional mode of the caches.
+        Memory holds every block, so nothing changes
+        """
+        pass
+
+    def queue_depth(self):
+        """
+        :return: number of outstanding fetches and evictions
+        """
+        return len(self.loading) + len(self.storing)
+
+    @staticmethod
+    def next_completion(requests, heap):
+        """
+        :return: live entry at the top of <heap>, None if it is empty. Stale entries on top are discarded
+        """
+        while heap:
+            entry = heap[0]
+            if requests.get(entry[2]) is entry:
+                return entry
+            heapq.heappop(heap)
+        return None
+
+    def next_completion_cycle(self):
+        """
+        :return: cycle of this controller's clock in which the next fetch or eviction completes, None if nothing is
+        outstanding
+        """
+        completions = [entry[0] for entry in (self.next_completion(self.loading, self.fetch_heap),
+                                              self.next_completion(self.storing, self.evict_heap)) if entry]
+        return min(completions) if completions else None
+
+    def cycles_to_next_event(self):
+        """
+        :return: number of clock cycles until the next fetch or eviction completes, None if nothing is outstanding
+        """
+        completion = self.next_completion_cycle()
+        if completion is None:
+            return None
+        return max(completion - self.cycle, 1)
+
+    def skip_cycles(self, cycles):
+        self.cycle += cycles
+
+    def complete_due(self, requests, heap, cycle, on_finished):
+        """
+        finish the requests of <heap> that complete in or before <cycle>
+        """
+        while True:
+            entry = self.next_completion(requests, heap)
+            if entry is None or entry[0] > cycle:
+                return
+            heapq.heappop(heap)
+            del requests[entry[2]]
+            on_finished(entry[2])
 
     def tick(self):
-        remove_list = []
-        for requester in self.loading:
-            self.loading[requester] -= 1
-            if self.loading[requester] < 1:
-                requester.on_fetch_from_memory_finished()
-                remove_list.append(requester)
-        for item in remove_list:
-            del self.loading[item]
-
-        remove_list = []
-        for requester in self.storing:
-            self.storing[requester] -= 1
-            if self.storing[requester] < 1:
-                requester.on_evict_to_memory_finished()
-                remove_list.append(requester)
-        for item in remove_list:
-            del self.storing[item]
+        # fetches finish before evictions. An eviction issued by a finished fetch is still counted in this cycle,
+        # a fetch issued by a finished eviction is not, as when the countdowns were decremented one dict after another
+        self.complete_due(self.loading, self.fetch_heap, self.cycle + 1, finish_fetch)
+        self.cycle += 1
+        self.complete_due(self.storing, self.evict_heap, self.cycle, finish_evict)
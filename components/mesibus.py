@@ -1,16 +1,39 @@
 import random
 
-from util import debug
+from tracing import BUS_GRANT, SNOOP_RESPONSE
 
 # xx_cnt = 0
 
 class Bus:
-    def __init__(self):
+    def __init__(self, snoop_filter=None):
+        """
+        :param snoop_filter: optional SnoopFilter, without one every request is broadcast to all other caches
+        """
         self.connected_caches = []
+        self.snoop_filter = snoop_filter
         self.applicants = []
         self.bus_master = None
         self.total_bus_invalidation_or_updates = 0
         self.total_bus_traffic = 0  # unit in bytes
+        self.tracer = None
+
+    def connect(self, cache):
+        cache.bus = self
+        cache.bus_index = len(self.connected_caches)
+        self.connected_caches.append(cache)
+        if self.snoop_filter is not None:
+            self.snoop_filter.track(cache)
+
+    def snoop_targets(self, caller, address):
+        """
+        :return: list of the caches other than <caller> that have to observe a request for <address>
+        """
+        if self.snoop_filter is None:
+            return [cache for cache in self.connected_caches if cache != caller]
+        return self.snoop_filter.holders(self.connected_caches, caller, address >> caller.n)
+
+    def trace_snoop_response(self, cache, address, response, payload_words):
+        self.tracer.record(SNOOP_RESPONSE, cache.name, address, payload_words if response else -1)
 
     def apply_for_bus_master(self, cache, callback):
         self.applicants.append((cache, callback))
@@ -24,10 +47,26 @@ class Bus:
         # if xx_cnt >= 417: print()
         self.bus_master = None
 
+    def blocks(self, cache):
+        """
+        :return: True if an application of <cache> is rejected in every interim until the bus master releases the
+        bus, which it does when its bus transfer or memory request finishes
+        """
+        return self.bus_master is not None and self.bus_master is not cache
+
     def interim(self):
         if self.applicants:
             self.process_applications()
 
+    def cycles_to_next_event(self):
+        """
+        :return: 0 if there are applications to arbitrate in the next interim, otherwise None
+        """
+        return 0 if self.applicants else None
+
+    def skip_cycles(self, cycles):
+        pass
+
     def process_applications(self):
         if self.bus_master is not None:
             for _, callback in self.applicants:
@@ -40,7 +79,8 @@ class Bus:
                 if i == selected_index:
                     selected_applicant, callback = self.applicants[i]
                     self.bus_master = selected_applicant
-                    debug("Bus granted to {}".format(selected_applicant.name))
+                    if self.tracer is not None:
+                        self.tracer.record(BUS_GRANT, selected_applicant.name, selected_applicant.current_job.address)
                     callback(True)
                 else:
                     _, callback = self.applicants[i]
@@ -55,13 +95,14 @@ class Bus:
         aggregated_payload = 0
         aggregated_response = True
         wait_mem = False
-        for cache in self.connected_caches:
-            if cache != caller:
-                response, payload_words, mem_op = cache.bus_read(address)
-                aggregated_response = aggregated_response and response
-                wait_mem = wait_mem or mem_op
-                if payload_words:
-                    aggregated_payload = payload_words
+        for cache in self.snoop_targets(caller, address):
+            response, payload_words, mem_op = cache.bus_read(address)
+            if self.tracer is not None:
+                self.trace_snoop_response(cache, address, response, payload_words)
+            aggregated_response = aggregated_response and response
+            wait_mem = wait_mem or mem_op
+            if payload_words:
+                aggregated_payload = payload_words
         if wait_mem:
             caller.evict_block_passive(address)
         if aggregated_response and aggregated_payload:
@@ -76,13 +117,14 @@ class Bus:
         aggregated_payload = 0
         aggregated_response = True
         wait_mem = False
-        for cache in self.connected_caches:
-            if cache != caller:
-                response, payload_words, mem_op = cache.bus_readx(address)
-                aggregated_response = aggregated_response and response
-                wait_mem = wait_mem or wait_mem
-                if payload_words:
-                    aggregated_payload = payload_words
+        for cache in self.snoop_targets(caller, address):
+            response, payload_words, mem_op = cache.bus_readx(address)
+            if self.tracer is not None:
+                self.trace_snoop_response(cache, address, response, payload_words)
+            aggregated_response = aggregated_response and response
+            wait_mem = wait_mem or wait_mem
+            if payload_words:
+                aggregated_payload = payload_words
 
         if wait_mem:
             caller.evict_block_passive(address)
@@ -102,12 +144,13 @@ class Bus:
 
         aggregated_payload = 0
         aggregated_response = True
-        for cache in self.connected_caches:
-            if cache != caller:
-                response, payload_words = cache.bus_update(address)
-                aggregated_response = aggregated_response and response
-                if payload_words:
-                    aggregated_payload = payload_words
+        for cache in self.snoop_targets(caller, address):
+            response, payload_words = cache.bus_update(address)
+            if self.tracer is not None:
+                self.trace_snoop_response(cache, address, response, payload_words)
+            aggregated_response = aggregated_response and response
+            if payload_words:
+                aggregated_payload = payload_words
 
         if aggregated_response:
             self.total_bus_invalidation_or_updates += 1
@@ -120,15 +163,54 @@ class Bus:
             raise PermissionError("Requester {} is not the current bus master {}".format(caller.name,
                                                                                          self.bus_master.name))
 
-        for cache in self.connected_caches:
-            if cache != caller:
-                cache.lock_block(address, lock)
+        for cache in self.snoop_targets(caller, address):
+            cache.lock_block(address, lock)
+
+    def read_functionally(self, caller, address):
+        """
+        snoop a read of <caller> in the other caches at once, used by the functional mode of the caches: no bus
+        master is granted, nothing is traced and the traffic counters are left alone. No other cache may be busy.
+        :return: tuple(Int, Boolean) payload size, 0 if no other cache has the block, and True if a dirty copy has to
+        be written back to memory
+        """
+        aggregated_payload = 0
+        wait_mem = False
+        for cache in self.snoop_targets(caller, address):
+            _, payload_words, mem_op = cache.bus_read(address)
+            wait_mem = wait_mem or mem_op
+            if payload_words:
+                aggregated_payload = payload_words
+        return aggregated_payload, wait_mem
+
+    def read_x_functionally(self, caller, address):
+        """
+        snoop a read for ownership of <caller> at once, see read_functionally
+        :return: payload size, 0 if no other cache had the block
+        """
+        aggregated_payload = 0
+        for cache in self.snoop_targets(caller, address):
+            _, payload_words, _ = cache.bus_readx(address)
+            if payload_words:
+                aggregated_payload = payload_words
+        return aggregated_payload
+
+    # for Dragon
+    def update_functionally(self, caller, address):
+        """
+        broadcast an update of <caller> at once, see read_functionally
+        :return: payload size, 0 if no other cache has the block
+        """
+        aggregated_payload = 0
+        for cache in self.snoop_targets(caller, address):
+            _, payload_words = cache.bus_update(address)
+            if payload_words:
+                aggregated_payload = payload_words
+        return aggregated_payload
 
     def check_share_line(self, caller, address):
         blocks = []
-        for cache in self.connected_caches:
-            if cache != caller:
-                block = cache.get_cache_block(address)
-                if block is not None:
-                    blocks.append(block)
+        for cache in self.snoop_targets(caller, address):
+            block = cache.get_cache_block(address)
+            if block is not None:
+                blocks.append(block)
         return blocks
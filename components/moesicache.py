@@ -1,14 +1,12 @@
 from math import log
 
-import numpy as np
-
 from components.cachebase import CacheBase
 from constants.cache import *
 from constants.jobtype import *
 from constants.locking import *
 from constants.moesi import *
 from job import CacheJob
-from util import resolve_memory_address, debug
+from util import resolve_memory_address
 
 
 class MoesiCache(CacheBase):
@@ -40,16 +38,16 @@ class MoesiCache(CacheBase):
             self.bus.apply_for_bus_master(self, self.bus_control_granted)
 
     def handle_proc_read(self, job):
-        block = self.get_cache_block(job.address)
-        if block is not None:
+        slot = self.find_valid_block(job.address)
+        if slot >= 0:
             self.start_hitting()
             return True
         return False
 
     def handle_proc_write(self, job):
-        block = self.get_cache_block(job.address)
-        if block is not None:
-            if block[1] in [MODIFIED, EXCLUSIVE]:
+        slot = self.find_valid_block(job.address)
+        if slot >= 0:
+            if self.data.state(slot) in [MODIFIED, EXCLUSIVE]:
                 self.start_hitting()
                 return True
         return False
@@ -67,12 +65,8 @@ class MoesiCache(CacheBase):
         :param address: 32-bit memory address
         :return: None if block containing this address is not found in cache, otherwise the found block
         """
-        tag, set_index, offset = self.resolve_memory_address(address)
-        for block in self.data[set_index]:
-            if block[0] == tag and block[1] != INVALID:
-                return block
-
-        return None
+        slot = self.find_valid_block(address)
+        return None if slot < 0 else self.data.block(slot)
 
     def send_job_specific_bus_request(self):
         if self.current_job.type == LOAD:
@@ -98,15 +92,12 @@ class MoesiCache(CacheBase):
                 self.set_block_state(self.current_job.address, SHARED)
                 self.current_job.status_in_cache = RECEIVING_FROM_BUS
                 self.current_job.remaining_bus_read_cycles = payload_words * 2
-                debug("{} start reading from Bus: {} cycles".format(self.name,
-                                                                    self.current_job.remaining_bus_read_cycles))
             else:
                 self.set_block_state(self.current_job.address, EXCLUSIVE)
                 self.cache_miss_count += 1
                 self.bus.release_ownership(self)
                 self.memory_controller.fetch_block(self, self.current_job.address)
                 self.current_job.status_in_cache = WAITING_FOR_MEMORY
-                debug("{} start fetching from Mem: 100 cycles".format(self.name))
 
         if self.current_job.type == STORE:
             if self.get_cache_block(self.current_job.address) is not None:  # block is present, invalidation only
@@ -122,12 +113,6 @@ class MoesiCache(CacheBase):
                 self.memory_controller.fetch_block(self, self.current_job.address)
                 self.current_job.status_in_cache = WAITING_FOR_MEMORY
 
-    def unlock_block(self, address):
-        tag, set_index, offset = self.resolve_memory_address(address)
-        for block in self.data[set_index]:
-            if block[0] == tag:
-                block[2] = UNLOCKED
-
     def start_hitting(self):
         tag, set_index, _ = self.resolve_memory_address(self.current_job.address)
         self.update_cache_set_access_order(set_index, tag)
@@ -138,7 +123,7 @@ class MoesiCache(CacheBase):
         self.current_job.status_in_cache = HITTING
 
         # statistics record
-        if self.get_cache_block(self.current_job.address)[1] != SHARED:
+        if self.data.state(self.find_valid_block(self.current_job.address)) != SHARED:
             self.total_private_accesses += 1
 
     def on_hit_finished(self):
@@ -148,22 +133,16 @@ class MoesiCache(CacheBase):
         self.current_job = None
 
     def set_block_state(self, address, state):
-        tag, set_index, offset = self.resolve_memory_address(address)
-        for block in self.data[set_index]:
-            if block[0] == tag:
-                block[1] = state
-                return
-
-        raise LookupError("[set_block_state] block not found in cache")
+        slot = self.find_block(address)
+        if slot < 0:
+            raise LookupError("[set_block_state] block not found in cache")
+        self.data.set_state(slot, state)
 
     def lock_block(self, address, lock=READ_LOCKED):
-        tag, set_index, offset = self.resolve_memory_address(address)
-        for block in self.data[set_index]:
-            if block[0] == tag:
-                block[2] = lock
-                return
-
-        raise LookupError("[lock_block] block not found in cache")
+        slot = self.find_block(address)
+        if slot < 0:
+            raise LookupError("[lock_block] block not found in cache")
+        self.data.set_lock(slot, lock)
 
     def on_bus_read_finished(self):
         self.bus.release_ownership(self)  # throws exception if self is not current bus owner!
@@ -183,36 +162,36 @@ class MoesiCache(CacheBase):
         :return: tuple(Boolean, Int) Boolean value is False if the block is available but being locked, otherwise True
         Int value is the payload size if the block is available and ready to be transmitted, or 0 if block not found.
         """
-        block = self.get_cache_block(address)
+        slot = self.find_valid_block(address)
         mem_op = False
-        if block is not None:
-            if block[2] > READ_LOCKED:
+        if slot >= 0:
+            if self.data.lock(slot) > READ_LOCKED:
                 return False, 0, mem_op
-            if block[1] in [SHARED, OWNED]:
+            if self.data.state(slot) in [SHARED, OWNED]:
                 return True, self.block_size//4, mem_op
-            if block[1] == EXCLUSIVE:
-                block[1] = SHARED
+            if self.data.state(slot) == EXCLUSIVE:
+                self.data.set_state(slot, SHARED)
                 return True, self.block_size//4, mem_op
-            if block[1] == MODIFIED:
-                block[1] = OWNED
+            if self.data.state(slot) == MODIFIED:
+                self.data.set_state(slot, OWNED)
                 return True, self.block_size//4, mem_op
 
         return True, 0, mem_op
 
     def bus_readx(self, address):
-        block = self.get_cache_block(address)
+        slot = self.find_valid_block(address)
         mem_op = False
-        if block is not None:
-            if block[2] > UNLOCKED:
+        if slot >= 0:
+            if self.data.lock(slot) > UNLOCKED:
                 return False, 0, mem_op
-            if block[1] == SHARED:
-                block[1] = INVALID
+            if self.data.state(slot) == SHARED:
+                self.data.set_state(slot, INVALID)
                 return True, self.block_size // 4, mem_op
-            if block[1] == EXCLUSIVE:
-                block[1] = INVALID
+            if self.data.state(slot) == EXCLUSIVE:
+                self.data.set_state(slot, INVALID)
                 return True, self.block_size // 4, mem_op
-            if block[1] in [MODIFIED, OWNED]:
-                block[1] = INVALID
+            if self.data.state(slot) in [MODIFIED, OWNED]:
+                self.data.set_state(slot, INVALID)
                 mem_op = True
                 return True, self.block_size // 4, mem_op
 
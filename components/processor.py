@@ -1,5 +1,5 @@
 from job import Job
-from util import debug
+from tracing import JOB_SCHEDULED
 
 
 class Processor:
@@ -15,6 +15,11 @@ class Processor:
         self.total_load_instructions = 0
         self.total_store_instructions = 0
         self.done_job_limit = kwargs.get('limit', 0)
+        self.held_op = None  # rest of a merged compute op that was split at the job limit, or an op put back
+        # job counts at which a run of merged compute ops is split like at the job limit, without stopping
+        self.op_boundaries = ()
+        self.stop_before_memory_op = False  # stop instead of executing the next load or store
+        self.tracer = None
 
     def interim(self):
         """
@@ -25,43 +30,112 @@ class Processor:
             return
         else:
             self.done_job_counter += 1
-            job = self.fetch_next_job()
+            # check the limit before fetching, so the op stream is left at the first op that was not executed
+            if self.done_job_limit and self.done_job_counter >= self.done_job_limit:
+                self.done = True
+                return
+            max_ops = self.done_job_limit - self.done_job_counter if self.done_job_limit else 0
+            for boundary in self.op_boundaries:
+                if boundary > self.done_job_counter:
+                    remaining = boundary - self.done_job_counter
+                    max_ops = min(max_ops, remaining) if max_ops else remaining
+                    break
+            job = self.fetch_next_job(max_ops)
             if not job:
                 self.done = True
                 return
-            if self.done_job_limit and self.done_job_counter >= self.done_job_limit:
+            if self.stop_before_memory_op and job.type <= 1:
+                self.held_op = (job.type, job.address)
                 self.done = True
                 return
+            self.done_job_counter += job.ops - 1
+            if self.tracer is not None:
+                self.tracer.record(JOB_SCHEDULED, self.cache.name,
+                                   job.address if job.type <= 1 else job.countdown_cycles, job.type)
             if job.type > 1:  # CPU job
-                debug("{} schedule CPU job: {} cycles".format(self.cache.name, job.countdown_cycles))
-                self.total_compute_cycles += job.countdown_cycles
+                self.total_compute_cycles += job.compute_cycles
                 self.schedule_job(job)
             else:  # mem job
-                debug("{} schedule Cache job: {}".format(self.cache.name, 'STORE' if job.type else 'LOAD'))
                 if job.type:
                     self.total_store_instructions += 1
                 else:
                     self.total_load_instructions += 1
                 self.cache.schedule_job(job)
 
-    def fetch_next_job(self):
+    def fast_forward(self, max_ops=1):
+        """
+        execute the next op functionally: a load or store is applied to the cache at once, a compute op is skipped
+        :param max_ops: most ops a run of merged compute ops may be skipped with
+        :return: the executed job, None if the end of the op stream has been reached
+        """
+        job = self.fetch_next_job(max_ops)
+        if not job:
+            self.done = True
+            return None
+        if job.type <= 1:
+            self.cache.access_functionally(job)
+        return job
+
+    def fetch_next_job(self, max_ops=0):
         """
         fetch next job from the job stream
+        :param max_ops: most trace ops the job may stand for, 0 for no limit. A longer run of merged compute ops is
+        split and its rest returned by the next fetch
         :return: the next job, None if reaching the end of stream
         """
-        op = self.op_stream.read_op()
+        if self.held_op is not None:
+            op, self.held_op = self.held_op, None
+        else:
+            op = self.op_stream.read_op()
+        if op and max_ops and type(op[1]) is tuple and len(op[1]) > max_ops:
+            op, self.held_op = (op[0], op[1][:max_ops]), (op[0], op[1][max_ops:])
         if op:
             job = Job.create_from_op(op)
             return job
         else:
             return None
 
+    def elapsed_compute_cycles(self):
+        """
+        :return: compute cycles executed so far, total_compute_cycles is credited in full when a compute job is
+        scheduled, so the part of the current job that has not run yet is left out
+        """
+        if self.current_job is None:
+            return self.total_compute_cycles
+        job = self.current_job
+        return self.total_compute_cycles - min(max(job.countdown_cycles, 0), job.compute_cycles)
+
     def schedule_job(self, job):
         self.current_job = job
 
     def is_busy(self):
         return self.current_job is not None
 
+    def cycles_to_next_event(self):
+        """
+        number of clock cycles until this processor changes state on its own, used by the event engine
+        :return: 0 if it will fetch a job in the next interim, None if it is done or waiting for its cache
+        """
+        if self.done:
+            return None
+        if self.is_busy():
+            return max(self.current_job.countdown_cycles, 1)
+        if self.cache.is_busy():
+            return None
+        return 0
+
+    def skip_cycles(self, cycles):
+        """
+        advance the processor by <cycles> clock cycles in which none of its countdowns expires
+        :param cycles: number of cycles to skip, smaller than cycles_to_next_event()
+        :return: None
+        """
+        if self.done:
+            return
+        if self.is_busy():
+            self.current_job.countdown_cycles -= cycles
+        self.counter += cycles
+
     def tick(self):
         if self.done:
             return
@@ -0,0 +1,48 @@
+from components.tagstore import INVALID
+
+
+class SnoopFilter:
+    """
+    Sharer directory of the bus: for every block address it keeps a presence bit vector with bit <i> set while the
+    cache at position <i> of Bus.connected_caches holds a valid copy of the block. The caches report fills,
+    invalidations and evictions through the listener of their TagStore, so the bus only needs to snoop the caches
+    whose bit is set.
+    """
+    def __init__(self):
+        self.sharers = {}  # block address -> presence bit vector
+        self.snoops = 0
+        self.filtered_snoops = 0
+
+    def track(self, cache):
+        """
+        start tracking a cache that has just been connected to the bus, including the blocks it already holds
+        """
+        for slot in range(len(cache.data.words)):
+            if cache.data.state(slot) != INVALID:
+                self.add(cache.block_address(slot, cache.data.tag(slot)), cache.bus_index)
+        cache.data.listener = cache.on_block_validity_changed
+
+    def add(self, block_address, index):
+        self.sharers[block_address] = self.sharers.get(block_address, 0) | 1 << index
+
+    def remove(self, block_address, index):
+        sharers = self.sharers.get(block_address, 0) & ~(1 << index)
+        if sharers:
+            self.sharers[block_address] = sharers
+        else:
+            self.sharers.pop(block_address, None)
+
+    def holders(self, caches, caller, block_address):
+        """
+        :param caches: caches connected to the bus, in the order of their bus index
+        :return: list of caches other than <caller> holding a valid copy of the block, in bus order
+        """
+        sharers = self.sharers.get(block_address, 0) & ~(1 << caller.bus_index)
+        targets = []
+        while sharers:
+            lowest = sharers & -sharers
+            targets.append(caches[lowest.bit_length() - 1])
+            sharers ^= lowest
+        self.snoops += len(targets)
+        self.filtered_snoops += len(caches) - 1 - len(targets)
+        return targets
@@ -0,0 +1,308 @@
+import numpy as np
+
+# every way is packed into one int: tag << TAG_SHIFT | lock << LOCK_SHIFT | state
+STATE_BITS = 3
+LOCK_BITS = 2
+STATE_MASK = (1 << STATE_BITS) - 1
+LOCK_SHIFT = STATE_BITS
+LOCK_MASK = ((1 << LOCK_BITS) - 1) << LOCK_SHIFT
+TAG_SHIFT = STATE_BITS + LOCK_BITS
+INVALID = 0  # the Invalid state has the same value in every protocol
+
+TAG = 0
+STATE = 1
+LOCK = 2
+
+
+def pack(tag, state, lock):
+    return tag << TAG_SHIFT | lock << LOCK_SHIFT | state
+
+
+def unpack(word):
+    return [word >> TAG_SHIFT, word & STATE_MASK, (word & LOCK_MASK) >> LOCK_SHIFT]
+
+
+class TagStore:
+    """
+    Tags, coherence states and lock bits of all blocks of a cache. A block is addressed by its slot,
+    set_index * assoc + way. Every set whose tags are distinct keeps a tag -> slot dict, so looking a block up is
+    O(1); sets that still hold duplicate tags (e.g. the all-zero Invalid blocks of a cold cache) are scanned.
+
+    Blocks never move between ways. Recency is tracked by stamping a block with an ever increasing clock whenever
+    it is accessed, so the block with the smallest stamp of its set is the least recently used one. Wherever a set
+    used to be scanned front to back, "first" now means most recently used.
+
+    An optional listener(slot, tag, valid) is called whenever a block becomes valid or stops being valid, including
+    when a valid block is overwritten by another tag; the snoop filter of the bus relies on it. An optional
+    state_listener(slot, tag, old_state, new_state) is called on every change of a block's state, a block
+    overwritten by another tag counts as the old block going Invalid and the new one coming from Invalid; event
+    tracing relies on it.
+
+    Indexing the store by set index returns a SetView, which behaves like the (assoc x 3) [tag, state, lock] rows
+    of the numpy array caches used to keep.
+    """
+    def __init__(self, num_sets, assoc):
+        self.num_sets = num_sets
+        self.assoc = assoc
+        self.words = [0] * (num_sets * assoc)
+        self.slots = [self.index_tags(set_index) for set_index in range(num_sets)]
+        # initially way 0 counts as the most recently used block of its set and the last way as the least
+        self.stamps = [-(slot % assoc) for slot in range(num_sets * assoc)]
+        self.clock = 1
+        self.listener = None
+        self.state_listener = None
+
+    def index_tags(self, set_index):
+        """
+        :return: tag -> slot dict of the set, None if two of its blocks share a tag
+        """
+        base = set_index * self.assoc
+        slots = {}
+        for slot in range(base, base + self.assoc):
+            tag = self.words[slot] >> TAG_SHIFT
+            if tag in slots:
+                return None
+            slots[tag] = slot
+        return slots
+
+    def lookup(self, set_index, tag):
+        """
+        :return: slot of the first block of the set with <tag> in any state, -1 if there is none
+        """
+        slots = self.slots[set_index]
+        if slots is not None:
+            return slots.get(tag, -1)
+        for slot in self.by_recency(set_index):
+            if self.words[slot] >> TAG_SHIFT == tag:
+                return slot
+        return -1
+
+    def lookup_valid(self, set_index, tag):
+        """
+        :return: slot of the first block of the set with <tag> that is not Invalid, -1 if there is none
+        """
+        slots = self.slots[set_index]
+        if slots is not None:
+            slot = slots.get(tag, -1)
+            if slot >= 0 and self.words[slot] & STATE_MASK == INVALID:
+                return -1
+            return slot
+        for slot in self.by_recency(set_index):
+            word = self.words[slot]
+            if word >> TAG_SHIFT == tag and word & STATE_MASK != INVALID:
+                return slot
+        return -1
+
+    def lookup_last_valid(self, set_index, tag):
+        """
+        :return: slot of the last block of the set with <tag> that is not Invalid, -1 if there is none
+        """
+        if self.slots[set_index] is not None:
+            return self.lookup_valid(set_index, tag)
+        for slot in reversed(self.by_recency(set_index)):
+            word = self.words[slot]
+            if word >> TAG_SHIFT == tag and word & STATE_MASK != INVALID:
+                return slot
+        return -1
+
+    def find_invalid(self, set_index, last=False):
+        """
+        :param last: return the least recently used Invalid block of the set instead of the most recently used one
+        :return: slot of an Invalid block of the set, -1 if all blocks are valid
+        """
+        base = set_index * self.assoc
+        invalid = [slot for slot in range(base, base + self.assoc) if self.words[slot] & STATE_MASK == INVALID]
+        if not invalid:
+            return -1
+        return min(invalid, key=self.stamps.__getitem__) if last else max(invalid, key=self.stamps.__getitem__)
+
+    def victim(self, set_index):
+        """
+        :return: slot of the least recently used block of the set
+        """
+        base = set_index * self.assoc
+        return min(range(base, base + self.assoc), key=self.stamps.__getitem__)
+
+    def touch(self, slot):
+        """
+        mark a block as the most recently used one of its set
+        """
+        self.stamps[slot] = self.clock
+        self.clock += 1
+
+    def by_recency(self, set_index):
+        """
+        :return: slots of the set, from the most to the least recently used block
+        """
+        base = set_index * self.assoc
+        return sorted(range(base, base + self.assoc), key=self.stamps.__getitem__, reverse=True)
+
+    def recency_order(self, set_index):
+        """
+        :return: ways of the set, from the most to the least recently used block
+        """
+        base = set_index * self.assoc
+        return [slot - base for slot in self.by_recency(set_index)]
+
+    def rows_by_recency(self, set_index):
+        """
+        :return: (assoc x 3) array of the [tag, state, lock] rows of the set, from the most to the least recently used
+        block, which is the order the rows used to be physically kept in
+        """
+        return np.asarray(self[set_index])[self.recency_order(set_index)]
+
+    def unlock(self, set_index, tag):
+        """
+        clear the lock bits of all blocks of the set with <tag>, whatever their state
+        """
+        slots = self.slots[set_index]
+        if slots is not None:
+            slot = slots.get(tag, -1)
+            if slot >= 0:
+                self.words[slot] &= ~LOCK_MASK
+            return
+        base = set_index * self.assoc
+        for slot in range(base, base + self.assoc):
+            if self.words[slot] >> TAG_SHIFT == tag:
+                self.words[slot] &= ~LOCK_MASK
+
+    def tag(self, slot):
+        return self.words[slot] >> TAG_SHIFT
+
+    def state(self, slot):
+        return self.words[slot] & STATE_MASK
+
+    def lock(self, slot):
+        return (self.words[slot] & LOCK_MASK) >> LOCK_SHIFT
+
+    def set_state(self, slot, state):
+        word = self.words[slot]
+        self.words[slot] = word & ~STATE_MASK | state
+        if self.listener is not None and (word & STATE_MASK == INVALID) != (state == INVALID):
+            self.listener(slot, word >> TAG_SHIFT, state != INVALID)
+        if self.state_listener is not None and word & STATE_MASK != state:
+            self.state_listener(slot, word >> TAG_SHIFT, word & STATE_MASK, state)
+
+    def set_lock(self, slot, lock):
+        self.words[slot] = self.words[slot] & ~LOCK_MASK | lock << LOCK_SHIFT
+
+    def write(self, slot, tag, state, lock):
+        """
+        overwrite a whole block, keeping the tag index of its set up to date
+        """
+        old_word = self.words[slot]
+        old_tag = old_word >> TAG_SHIFT
+        self.words[slot] = pack(tag, state, lock)
+        if old_tag != tag:
+            set_index = slot // self.assoc
+            slots = self.slots[set_index]
+            if slots is None:
+                self.slots[set_index] = self.index_tags(set_index)
+            elif tag in slots:
+                self.slots[set_index] = None
+            else:
+                del slots[old_tag]
+                slots[tag] = slot
+        if self.listener is not None:
+            was_valid = old_word & STATE_MASK != INVALID
+            is_valid = state != INVALID
+            if was_valid and (not is_valid or old_tag != tag):
+                self.listener(slot, old_tag, False)
+            if is_valid and (not was_valid or old_tag != tag):
+                self.listener(slot, tag, True)
+        if self.state_listener is not None:
+            old_state = old_word & STATE_MASK
+            if old_tag != tag:
+                if old_state != INVALID:
+                    self.state_listener(slot, old_tag, old_state, INVALID)
+                old_state = INVALID
+            if old_state != state:
+                self.state_listener(slot, tag, old_state, state)
+
+    def block(self, slot):
+        return BlockView(self, slot)
+
+    def __len__(self):
+        return self.num_sets
+
+    def __getitem__(self, set_index):
+        return SetView(self, set_index)
+
+    def __setitem__(self, set_index, rows):
+        rows = np.broadcast_to(np.asarray(rows), (self.assoc, 3))
+        self[set_index].assign(rows)
+        base = set_index * self.assoc
+        self.stamps[base:base + self.assoc] = [-way for way in range(self.assoc)]
+
+    def __array__(self, dtype=None, copy=None):
+        return np.array([unpack(word) for word in self.words], dtype=dtype).reshape(self.num_sets, self.assoc, 3)
+
+
+class SetView:
+    """
+    the blocks of one cache set, indexed by way
+    """
+    def __init__(self, store, set_index):
+        self.store = store
+        self.base = set_index * store.assoc
+
+    def slot(self, way):
+        if way < 0:
+            way += self.store.assoc
+        if not 0 <= way < self.store.assoc:
+            raise IndexError("way {} out of range".format(way))
+        return self.base + way
+
+    def assign(self, rows):
+        for way, (tag, state, lock) in enumerate(rows):
+            self.store.write(self.base + way, int(tag), int(state), int(lock))
+
+    def __len__(self):
+        return self.store.assoc
+
+    def __iter__(self):
+        return (BlockView(self.store, self.base + way) for way in range(self.store.assoc))
+
+    def __getitem__(self, key):
+        if isinstance(key, (int, np.integer)):
+            return BlockView(self.store, self.slot(int(key)))
+        return np.asarray(self)[key]
+
+    def __setitem__(self, way, row):
+        tag, state, lock = (int(x) for x in np.ravel(row))
+        self.store.write(self.slot(way), tag, state, lock)
+
+    def __array__(self, dtype=None, copy=None):
+        words = self.store.words[self.base:self.base + self.store.assoc]
+        return np.array([unpack(word) for word in words], dtype=dtype).reshape(self.store.assoc, 3)
+
+
+class BlockView:
+    """
+    live [tag, state, lock] view of one block
+    """
+    __slots__ = ('store', 'slot')
+
+    def __init__(self, store, slot):
+        self.store = store
+        self.slot = slot
+
+    def __len__(self):
+        return 3
+
+    def __iter__(self):
+        return iter(unpack(self.store.words[self.slot]))
+
+    def __getitem__(self, field):
+        return unpack(self.store.words[self.slot])[field]
+
+    def __setitem__(self, field, value):
+        fields = unpack(self.store.words[self.slot])
+        fields[field] = int(value)
+        self.store.write(self.slot, *fields)
+
+    def __array__(self, dtype=None, copy=None):
+        return np.array(list(self), dtype=dtype)
+
+    def __repr__(self):
+        return 'BlockView({})'.format(list(self))
@@ -6,12 +6,20 @@ class Job:
         self.address = address
         self.type = job_type
         self.countdown_cycles = remaining_cycles
+        self.compute_cycles = remaining_cycles
+        self.ops = 1  # number of trace ops the job stands for
 
     @staticmethod
     def create_from_op(op):
         opcode, value = op
 
         if opcode == 2:
+            if type(value) is tuple:  # compute ops merged by opstream.CoalescingOpStream
+                # each op takes at least one cycle, also those of 0 cycles
+                cpu_job = Job(job_type=opcode, remaining_cycles=sum(max(cycles, 1) for cycles in value))
+                cpu_job.compute_cycles = sum(value)
+                cpu_job.ops = len(value)
+                return cpu_job
             cpu_job = Job(job_type=opcode, remaining_cycles=value)
             return cpu_job
         if opcode == 0 or opcode == 1:
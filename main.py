@@ -1,68 +1,147 @@
+import contextlib
 import os
+import pickle
+from dataclasses import dataclass, field, fields
 
+from components.directory import Directory
+from components.directorycache import DirectoryMesiCache
+from components.dram import DramController
+from components.llc import SharedLLC
 from components.dragoncache import DragonCache
 from components.memorycontroller import MemoryController
 from components.mesibus import Bus
 from components.mesicache import MesiCache
 from components.moesicache import MoesiCache
-from opstream import OpStream
+from components.snoopfilter import SnoopFilter
+from opstream import ChunkedOpStream, CoalescingOpStream, FakeOpStream, MmapOpStream, binary_trace_path, TRACE_EXTENSIONS
 from components.processor import Processor
-import util
-from opts import args
+from workloads.generators import create_workload
 
 
-def create_proc(i, protocol, limit, **kwargs):
+def create_proc(i, protocol, limit, bus_mem_op=False, **kwargs):
     proc = Processor(i, limit=limit, **kwargs)
+    protocol = protocol.upper()
     if protocol == 'MESI':
         proc.cache = MesiCache(name='P' + str(i), **kwargs)
     elif protocol == 'MOESI':
         proc.cache = MoesiCache(name='P' + str(i), **kwargs)
     elif protocol == 'DRAGON':
-        proc.cache = DragonCache(name='P' + str(i), bus_mem_op=args.bus_mem_op,  **kwargs)
+        proc.cache = DragonCache(name='P' + str(i), bus_mem_op=bus_mem_op, **kwargs)
+    elif protocol == 'MESI_DIR':
+        proc.cache = DirectoryMesiCache(name='P' + str(i), **kwargs)
     return proc
 
 
 def connect_bus(procs, bus):
     for proc in procs:
-        proc.cache.bus = bus
-        bus.connected_caches.append(proc.cache)
+        bus.connect(proc.cache)
     return bus
 
 
+def find_trace_file(dir_path, core):
+    """
+    :return: path of the text trace <trace>_<core>.data of the given core, which may be compressed as .gz, .bz2 or
+    .xz, None if there is none
+    """
+    suffixes = tuple('_{}{}'.format(core, extension) for extension in TRACE_EXTENSIONS)
+    for file in sorted(os.listdir(dir_path)):
+        if file.endswith(suffixes):
+            return os.path.join(dir_path, file)
+    return None
+
+
+def open_trace(path):
+    """
+    open the trace of one core, preferring its compiled binary form if that is at least as new as the text trace
+    """
+    binary_path = binary_trace_path(path)
+    if os.path.exists(binary_path) and os.path.getmtime(binary_path) >= os.path.getmtime(path):
+        return MmapOpStream(binary_path)
+    return ChunkedOpStream(path)
+
+
 def create_opstream(data_name, num_cores):
     dir_path = data_name
     result = []
     for i in range(num_cores):
-        for file in os.listdir(dir_path):
-            if str(i) in file:
-                opstream = OpStream(dir_path+file)
-                result.append(opstream)
+        path = find_trace_file(dir_path, i)
+        if path is not None:
+            result.append(open_trace(path))
     return result
 
 
 class Simulator:
-    def __init__(self, protocol='mesi', data='blackscholes_four', num_cores=4, memory_controller=MemoryController(),
-                 limit=0, **kwargs):
+    def __init__(self, protocol='mesi', data='blackscholes_four', num_cores=4, memory_controller=None,
+                 limit=0, engine='cycle', snoop_filter=False, hop_latency=10, workload=None, coalesce=True,
+                 trace_cache=None, **kwargs):
+        """
+        All state of a run belongs to the instance, so any number of simulators can run in one process, one after
+        the other, interleaved or in threads.
+        :param data: directory of the traces of the cores
+        :param memory_controller: MemoryController, DramController or SharedLLC of this simulator alone, a new
+        MemoryController by default
+        :param workload: dict of the arguments of workloads.generators.create_workload except num_cores, e.g.
+        {'name': 'migratory', 'ops': 1000000}, generates the ops of the cores instead of reading traces from <data>
+        :param coalesce: merge runs of compute ops of the traces or workload into single jobs, see
+        opstream.CoalescingOpStream. The results are the same either way
+        :param trace_cache: tracecache.TraceCache to read the traces of <data> from
+        """
+        if memory_controller is None:
+            memory_controller = MemoryController()
         self.memory_controller = memory_controller
+        # 'cycle' ticks every clock cycle, 'event' jumps over cycles in which nothing changes state
+        self.engine = engine
         # setup processors with caches
         self.procs = [create_proc(i, protocol, memory_controller=memory_controller, limit=limit, **kwargs) for i in range(num_cores)]
         # setup op stream for each processor
-        if data:
-            for proc, opstream in zip(self.procs, create_opstream(data, num_cores)):
-                proc.op_stream = opstream
-        # setup bus
-        self.bus = connect_bus(self.procs, Bus())
+        if workload:
+            op_streams = [FakeOpStream(ops, length=workload.get('ops'))
+                          for ops in create_workload(num_cores=num_cores, **workload)]
+        elif data and trace_cache is not None:
+            op_streams = trace_cache.open_streams(data, num_cores)
+        elif data:
+            op_streams = create_opstream(data, num_cores)
+        else:
+            op_streams = []
+        for proc, op_stream in zip(self.procs, op_streams):
+            proc.op_stream = CoalescingOpStream(op_stream) if coalesce else op_stream
+        if isinstance(memory_controller, SharedLLC):
+            memory_controller.connect(proc.cache for proc in self.procs)
+        # setup bus, with a snoop filter the bus only snoops the caches holding a valid copy of the requested block.
+        # Directory-based MESI replaces the bus with a home directory whose messages take hop_latency cycles per hop
+        if protocol.upper() == 'MESI_DIR':
+            self.bus = connect_bus(self.procs, Directory(hop_latency))
+        else:
+            self.bus = connect_bus(self.procs, Bus(SnoopFilter() if snoop_filter else None))
+        # components that may wake up on their own, polled by the event engine
+        self.event_sources = self.procs + [p.cache for p in self.procs] + [self.bus, self.memory_controller]
         # cycle counter
         self.counter = 0
-        util.counter = 0
+        self.profiler = None  # profiler.Profiler timing the phases of tick, attached while profiling
 
-    def run(self):
+    def run(self, checkpoint_every=0, checkpoint_path='./output/checkpoint.pkl', progress=None, quiet=False,
+            metrics=None):
+        """
+        :param checkpoint_every: save a checkpoint to <checkpoint_path> every that many cycles, 0 disables checkpoints
+        :param progress: progress.ProgressReporter polled every tick, None for no progress reports
+        :param quiet: do not print the summary of the processors at the end
+        :param metrics: metrics.IntervalSampler to record the time series of the run with, closed at the end
+        """
+        next_checkpoint = (self.counter // checkpoint_every + 1) * checkpoint_every if checkpoint_every else None
         while self.tick():
-            for proc in self.procs:
-                if proc.done_job_counter % 10000 == 0 and proc.done_job_counter // 10000 > 0:
-                    print("{}: {} jobs done.".format(proc.cache.name, proc.done_job_counter))
-            continue
+            if progress is not None:
+                progress.poll()
+            if metrics is not None and self.counter >= metrics.next_sample:
+                metrics.sample()
+            if next_checkpoint is not None and self.counter >= next_checkpoint:
+                self.save_checkpoint(checkpoint_path)
+                next_checkpoint = (self.counter // checkpoint_every + 1) * checkpoint_every
 
+        if metrics is not None:
+            metrics.close()
+        if quiet:
+            return
+        print('Game Over')
         print("All Finished! Current counter: {}".format(self.counter))
         for proc in self.procs:
             print('processsor {0} counter: {1}'.format(proc.index, proc.counter))
@@ -71,14 +150,24 @@ class Simulator:
         """
         :return: True if all processors have finished running.
         """
+        # a profiler.Profiler attached while profiling records the time of every phase
+        profiler = self.profiler
+        if profiler is not None:
+            profiler.start_tick()
         # run every component's interim operations, processors first, then caches, then bus
         for p in self.procs:
             p.interim()
+        if profiler is not None:
+            profiler.lap('Processor.interim')
 
         for p in self.procs:
             p.cache.interim()
+        if profiler is not None:
+            profiler.lap('Cache.interim')
 
         self.bus.interim()
+        if profiler is not None:
+            profiler.lap('Bus.interim')
 
         # check if all cores finished running
         done_count = 0
@@ -86,38 +175,153 @@ class Simulator:
             if processor.done:
                 done_count += 1
         if done_count == len(self.procs):
-            # exit the program
-            print('Game Over')
             return False
 
+        if profiler is not None:
+            profiler.start_tick()
         # tick the clock cycle once for every component, processors first, then caches, then memory
         for p in self.procs:
             p.tick()
+        if profiler is not None:
+            profiler.lap('Processor.tick')
 
         for p in self.procs:
             p.cache.tick()
+        if profiler is not None:
+            profiler.lap('Cache.tick')
 
         self.memory_controller.tick()
+        if profiler is not None:
+            profiler.lap('MemoryController.tick')
 
         self.counter += 1
-        util.counter += 1
+
+        if self.engine == 'event':
+            self.skip_idle_cycles()
+            if profiler is not None:
+                profiler.lap('skip_idle_cycles')
         return True
 
+    def fast_forward(self, ops):
+        """
+        Execute the first <ops> ops of every core functionally, without timing, to warm up the caches. Cores take
+        turns op by op; loads and stores are applied to the tag stores and coherence states at once and compute ops
+        are skipped. The clock does not advance and the statistics gathered while warming up are discarded, so a
+        following run() only measures the remaining ops.
+        :param ops: number of ops per core, counted like the processors' limit
+        :return: None
+        """
+        active = list(self.procs)
+        for _ in range(ops):
+            active = [proc for proc in active if proc.fast_forward()]
+            if not active:
+                break
+        self.reset_statistics()
 
-def collect_statistics(sim:Simulator):
-    import pandas as pd
-    out_dir = './output'
-    if not os.path.exists(out_dir):
-        os.mkdir(out_dir)
+    def reset_statistics(self):
+        for proc in self.procs:
+            proc.cache.total_access_count = 0
+            proc.cache.cache_miss_count = 0
+            proc.cache.total_private_accesses = 0
+        self.bus.total_bus_traffic = 0
+        self.bus.total_bus_invalidation_or_updates = 0
+        if isinstance(self.bus, Directory):
+            self.bus.messages = 0
+        if self.bus.snoop_filter is not None:
+            self.bus.snoop_filter.snoops = 0
+            self.bus.snoop_filter.filtered_snoops = 0
+        memory = self.memory_controller
+        if isinstance(memory, SharedLLC):
+            memory.reset_statistics()
+            memory = memory.memory_controller
+        if isinstance(memory, DramController):
+            memory.reset_statistics()
+
+    # checkpoints of a profiled run restore without the profiler
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state['profiler'] = None
+        return state
+
+    def save_checkpoint(self, path):
+        """
+        Save the complete simulator state between two cycles: counters, processors and their jobs, the tag stores
+        and jobs of the caches, bus or directory, memory controller, and the position of every op stream (trace
+        path and byte offset, the open files themselves are not stored). The file is replaced atomically, so an
+        interrupted save leaves the previous checkpoint intact.
+        """
+        out_dir = os.path.dirname(path)
+        if out_dir and not os.path.exists(out_dir):
+            os.makedirs(out_dir)
+        with open(path + '.tmp', 'wb') as file:
+            pickle.dump(self, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(path + '.tmp', path)
+
+    @staticmethod
+    def load_checkpoint(path):
+        """
+        :return: Simulator restored from a checkpoint written by save_checkpoint, running it continues bit-exactly
+        where the checkpointed run was, with the traces reopened at their saved positions
+        """
+        with open(path, 'rb') as file:
+            return pickle.load(file)
+
+    def skip_idle_cycles(self):
+        """
+        Jump the clock straight to the cycle before the next wake-up. Every component reports how many cycles remain
+        until it changes state on its own (a compute job, bus transfer or memory request finishing); when no component
+        needs the next interim, all cycles up to the earliest wake-up are dead and are skipped in one step.
+        :return: number of skipped cycles
+        """
+        wake_up = None
+        for component in self.event_sources:
+            cycles = component.cycles_to_next_event()
+            if cycles is None:
+                continue
+            if cycles <= 1:
+                return 0
+            if wake_up is None or cycles < wake_up:
+                wake_up = cycles
+        if wake_up is None or all(p.done for p in self.procs):
+            return 0
+
+        skipped = wake_up - 1
+        for component in self.event_sources:
+            component.skip_cycles(skipped)
+        self.counter += skipped
+        return skipped
+
+
+def compute_statistics(sim:Simulator):
+    """
+    :return: tuple(dict of overall statistics, dict of per-core statistics keyed by cache name)
+    """
     stats = {}
     stats['Overall Execution Cycle'] = sim.counter
     stats['Bus Data Traffic'] = sim.bus.total_bus_traffic
     stats['Bus Invalidation/Updates'] = sim.bus.total_bus_invalidation_or_updates
     stats['Private Data Access Percentage'] = 100*sum([x.cache.total_private_accesses for x in sim.procs])/sum([x.cache.total_access_count for x in sim.procs])
-    stats_df = pd.DataFrame.from_dict({'stats':stats})
-    stats_df = stats_df.astype(int)
-    stats_df.to_csv('./output/overall.csv')
-    print(stats_df)
+    if isinstance(sim.bus, Directory):
+        stats['Directory Messages'] = sim.bus.messages
+    elif sim.bus.snoop_filter is not None:
+        stats['Snoops'] = sim.bus.snoop_filter.snoops
+        stats['Filtered Snoops'] = sim.bus.snoop_filter.filtered_snoops
+    memory = sim.memory_controller
+    if isinstance(memory, SharedLLC):
+        accesses = sum(proc.cache.total_access_count for proc in sim.procs)
+        misses = sum(proc.cache.cache_miss_count for proc in sim.procs)
+        stats['L1 Hit Percentage'] = 100 * (accesses - misses) / accesses if accesses else 0.0
+        stats['LLC Hit Percentage'] = 100 * memory.hit_rate()
+        stats['Memory Fetches'] = memory.memory_fetches
+        stats['Memory Writebacks'] = memory.memory_writebacks
+        stats['Memory Traffic Avoided'] = memory.traffic_avoided()
+        if memory.inclusive:
+            stats['LLC Back Invalidations'] = memory.back_invalidations
+        memory = memory.memory_controller
+    if isinstance(memory, DramController):
+        stats['Memory Requests'] = memory.requests
+        stats['Row Buffer Hit Percentage'] = 100 * memory.row_buffer_hit_rate()
+        stats['Average Memory Queueing Delay'] = memory.average_queueing_delay()
 
     stats_per_core = {}
     for proc in sim.procs:
@@ -127,14 +331,166 @@ def collect_statistics(sim:Simulator):
             'Idle Cycles': int(proc.counter - proc.total_compute_cycles),
             'Cache Miss Rate': round(proc.cache.cache_miss_count / proc.cache.total_access_count, 2)
         }
-    stats_per_core_df = pd.DataFrame.from_dict(stats_per_core)
-    stats_per_core_df.to_csv('./output/percore.csv')
-    print(stats_per_core_df)
+    return stats, stats_per_core
+
+
+def write_table(path, columns):
+    """
+    write a table with pandas and print it, pandas is only imported here as it takes long to load
+    :param columns: dict of column name -> dict of row label -> value
+    """
+    import pandas as pd
+    table = pd.DataFrame.from_dict(columns)
+    table.to_csv(path)
+    print(table)
+
+
+def collect_statistics(sim:Simulator, sampled=None):
+    """
+    :param sampled: result of sampling.run_sampled, its extrapolated statistics are written instead of the ones of
+    <sim>, with the half widths of their confidence intervals in a 'ci' column
+    """
+    out_dir = './output'
+    if not os.path.exists(out_dir):
+        os.mkdir(out_dir)
+    if sampled is None:
+        stats, stats_per_core = compute_statistics(sim)
+        overall = {'stats': {key: int(value) for key, value in stats.items()}}
+        per_core = stats_per_core
+    else:
+        stats, stats_per_core, intervals, intervals_per_core = sampled
+        overall = {'stats': round_values(stats), 'ci': round_values(intervals)}
+        per_core = {name: round_values(core_stats) for name, core_stats in stats_per_core.items()}
+        per_core.update({name + ' ci': round_values(core_intervals)
+                         for name, core_intervals in intervals_per_core.items()})
+    write_table('./output/overall.csv', overall)
+    write_table('./output/percore.csv', per_core)
+
+
+def round_values(values):
+    return {key: round(value, 2) for key, value in values.items()}
+
+
+@dataclass
+class SimulationConfig:
+    """
+    Configuration of one simulation, the programmatic counterpart of the command line options of main.py
+    """
+    protocol: str = 'MESI'
+    input_file: str = 'blackscholes'  # directory of the traces of the cores
+    workload: str = None  # name of a generated workload used instead of <input_file>, see workloads.generators
+    workload_ops: int = 1000000
+    workload_seed: int = 0
+    workload_params: dict = field(default_factory=dict)
+    num_cores: int = 4
+    cache_size: int = 4096
+    associativity: int = 2
+    block_size: int = 32
+    bus_mem_op: bool = False
+    engine: str = 'cycle'
+    snoop_filter: bool = False
+    hop_latency: int = 10
+    memory: str = 'flat'  # 'flat' or 'dram'
+    dram_channels: int = 1
+    dram_banks: int = 8
+    dram_bandwidth: int = 8
+    llc_size: int = 0  # bytes of the shared last-level cache, 0 for none
+    llc_assoc: int = 8
+    llc_latency: int = 20
+    llc_inclusive: bool = False
+    fast_forward: int = 0
+    limit: int = 0
+
+    @classmethod
+    def from_args(cls, args):
+        """
+        :param args: parsed command line options, see opts.parse_args
+        """
+        config = cls(**{option.name: getattr(args, option.name) for option in fields(cls) if hasattr(args, option.name)})
+        config.workload_params = dict(config.workload_params)
+        return config
+
+    def create_simulator(self):
+        """
+        :return: a new Simulator of this configuration, warmed up by fast-forwarding if configured
+        """
+        workload = None
+        if self.workload:
+            workload = dict(self.workload_params, name=self.workload, ops=self.workload_ops, seed=self.workload_seed)
+        memory_controller = MemoryController()
+        if self.memory == 'dram':
+            memory_controller = DramController(channels=self.dram_channels, banks=self.dram_banks,
+                                               block_size=self.block_size, bytes_per_cycle=self.dram_bandwidth)
+        if self.llc_size:
+            memory_controller = SharedLLC(memory_controller, size=self.llc_size, assoc=self.llc_assoc,
+                                          block_size=self.block_size, latency=self.llc_latency,
+                                          inclusive=self.llc_inclusive)
+        sim = Simulator(protocol=self.protocol, data=self.input_file, workload=workload, num_cores=self.num_cores,
+                        memory_controller=memory_controller, limit=self.limit,
+                        block_size=self.block_size, assoc=self.associativity,
+                        size=self.cache_size, engine=self.engine, bus_mem_op=self.bus_mem_op,
+                        snoop_filter=self.snoop_filter, hop_latency=self.hop_latency)
+        sim.fast_forward(self.fast_forward)
+        return sim
+
+
+@dataclass
+class Results:
+    cycles: int
+    stats: dict  # overall statistics, see compute_statistics
+    stats_per_core: dict  # per-core statistics keyed by cache name
+
+
+def simulate(config):
+    """
+    Run one simulation without printing or writing anything, e.g. from a notebook or worker process
+    :param config: SimulationConfig
+    :return: Results
+    """
+    sim = config.create_simulator()
+    sim.run(quiet=True)
+    stats, stats_per_core = compute_statistics(sim)
+    return Results(sim.counter, stats, stats_per_core)
 
 
 if __name__ == '__main__':
-    sim = Simulator(protocol=args.protocol, data=args.input_file,
-                    block_size=args.block_size, assoc=args.associativity,
-                    size=args.cache_size)
-    sim.run()
-    collect_statistics(sim)
+    from opts import parse_args
+    args = parse_args()
+    if args.restore:
+        sim = Simulator.load_checkpoint(args.restore)
+        tracer = sim.bus.tracer  # the restored tracer of a traced run appends to its event file
+    else:
+        sim = SimulationConfig.from_args(args).create_simulator()
+        tracer = None
+    if args.trace_events:
+        from tracing import Tracer
+        if tracer is not None:
+            tracer.close()
+        tracer = Tracer(path=args.trace_events, components=args.trace_components, addresses=args.trace_addresses,
+                        block_size=sim.procs[0].cache.block_size).attach(sim)
+    if args.profile or args.profile_output:
+        from profiler import Profiler
+        profiler = Profiler(sim, stats_path=args.profile_output)
+    else:
+        profiler = contextlib.nullcontext()
+    with profiler:
+        if args.sample_window:
+            from sampling import run_sampled
+            sampled = run_sampled(sim, window=args.sample_window, gap=args.sample_gap, warmup=args.sample_warmup)
+        else:
+            sampled = None
+            progress = None
+            if not args.quiet and (args.progress_interval or args.progress_ops):
+                from progress import ProgressReporter
+                progress = ProgressReporter(sim, interval=args.progress_interval, ops=args.progress_ops)
+            metrics = None
+            if args.metrics_interval:
+                from metrics import IntervalSampler
+                metrics = IntervalSampler(sim, interval=args.metrics_interval, path=args.metrics_output)
+            sim.run(checkpoint_every=args.checkpoint_every, checkpoint_path=args.checkpoint, progress=progress,
+                    quiet=args.quiet, metrics=metrics)
+    if tracer is not None:
+        tracer.close()
+    collect_statistics(sim, sampled)
+    if args.profile or args.profile_output:
+        print(profiler.report())
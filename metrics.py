@@ -0,0 +1,80 @@
+import os
+
+import numpy as np
+
+
+class IntervalSampler:
+    """
+    Time series of the simulation: every <interval> cycles the changes since the previous sample of the bus traffic,
+    bus invalidations/updates and per-core accesses, misses and idle cycles are recorded, together with the number of
+    memory requests outstanding at that moment. Rows collect in a preallocated array that is appended to a CSV file
+    whenever it is full, so memory stays bounded however long the run is and a killed run keeps what was flushed.
+
+    Simulator.run takes a sample whenever its clock reaches next_sample. With the event engine the clock may jump
+    past it, the row then covers the longer interval up to its 'cycle'.
+    """
+    def __init__(self, sim, interval=100000, path='./output/intervals.csv', buffer_rows=1024):
+        """
+        :param interval: cycles between two samples
+        :param path: CSV file the samples are written to
+        :param buffer_rows: number of samples kept in memory before they are written
+        """
+        self.sim = sim
+        self.interval = interval
+        self.path = path
+        self.columns = ['cycle', 'bus_traffic', 'bus_invalidations_or_updates', 'memory_queue_depth']
+        for proc in sim.procs:
+            self.columns += [proc.cache.name + '_' + column for column in ['accesses', 'misses', 'idle_cycles']]
+        self.rows = np.zeros((buffer_rows, len(self.columns)), dtype=np.int64)
+        self.num_rows = 0
+        self.samples = 0
+        self.last = self.counters()
+        self.last_cycle = sim.counter
+        self.next_sample = (sim.counter // interval + 1) * interval
+
+        out_dir = os.path.dirname(path)
+        if out_dir and not os.path.exists(out_dir):
+            os.makedirs(out_dir)
+        self.file = open(path, 'w')
+        self.file.write(','.join(self.columns) + '\n')
+
+    def counters(self):
+        """
+        :return: list of the current values of the cumulative counters, in the order of the columns after the cycle
+        and queue depth
+        """
+        values = [self.sim.bus.total_bus_traffic, self.sim.bus.total_bus_invalidation_or_updates]
+        for proc in self.sim.procs:
+            values += [proc.cache.total_access_count, proc.cache.cache_miss_count,
+                       int(proc.counter - proc.elapsed_compute_cycles())]
+        return values
+
+    def sample(self):
+        counters = self.counters()
+        deltas = [value - last for value, last in zip(counters, self.last)]
+        self.rows[self.num_rows] = [self.sim.counter] + deltas[:2] + \
+            [self.sim.memory_controller.queue_depth()] + deltas[2:]
+        self.num_rows += 1
+        self.samples += 1
+        self.last = counters
+        self.last_cycle = self.sim.counter
+        self.next_sample = (self.sim.counter // self.interval + 1) * self.interval
+        if self.num_rows == len(self.rows):
+            self.flush()
+
+    def flush(self):
+        np.savetxt(self.file, self.rows[:self.num_rows], fmt='%d', delimiter=',')
+        self.file.flush()
+        self.num_rows = 0
+
+    def close(self):
+        """
+        sample the last, partial interval and write all remaining samples
+        """
+        if self.file is None:
+            return
+        if self.sim.counter > self.last_cycle:
+            self.sample()
+        self.flush()
+        self.file.close()
+        self.file = None
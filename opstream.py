@@ -1,30 +1,479 @@
+import bz2
+import gzip
+import io
+import itertools
+import lzma
+import operator
+import os
+import queue
+import threading
+
+import numpy as np
+
+# fixed-width record of a compiled trace: one opcode byte followed by the 64-bit address or cycle count
+TRACE_DTYPE = np.dtype([('opcode', np.uint8), ('value', np.uint64)])
+
+# stdlib codecs of compressed traces, e.g. bodytrack_0.data.xz
+COMPRESSED_TRACE_OPENERS = {'.gz': gzip.open, '.bz2': bz2.open, '.xz': lzma.open}
+TRACE_EXTENSIONS = tuple('.data' + extension for extension in [''] + list(COMPRESSED_TRACE_OPENERS))
+
+
 class FakeOpStream:
-    def __init__(self, op_list):
+    def __init__(self, op_list, length=None):
+        """
+        :param length: number of ops, taken from <op_list> if it has a length, used to report progress
+        """
         self.op_iterator = iter(op_list)
+        self.length = length if length is not None or not hasattr(op_list, '__len__') else len(op_list)
+        self.ops_read = 0
 
     def read_op(self):
         try:
             opcode, value = next(self.op_iterator)
+            self.ops_read += 1
             return opcode, value
         except StopIteration:
             return None
 
+    def fraction_read(self):
+        """
+        :return: fraction of the ops read so far, None if the number of ops is unknown
+        """
+        if not self.length:
+            return None
+        return min(self.ops_read / self.length, 1.0)
+
     def close(self):
         pass
 
 
+class CoalescingOpStream:
+    """
+    Stream stage between an op stream and its processor that merges a run of consecutive compute ops into a single
+    op (2, tuple of their cycle counts), so the run costs one Job and one scheduling round instead of one per op.
+    Single compute ops and memory ops pass through unchanged. The op following a run is held back until the next read.
+    """
+    def __init__(self, op_stream, max_run=1024):
+        """
+        :param max_run: most compute ops merged into one op
+        """
+        self.op_stream = op_stream
+        self.max_run = max_run
+        self.pending = None
+
+    def read_op(self):
+        op = self.pending if self.pending is not None else self.op_stream.read_op()
+        self.pending = None
+        if not op or op[0] != 2:
+            return op
+        cycles = [op[1]]
+        while len(cycles) < self.max_run:
+            op = self.op_stream.read_op()
+            if not op or op[0] != 2:
+                self.pending = op
+                break
+            cycles.append(op[1])
+        if len(cycles) == 1:
+            return 2, cycles[0]
+        return 2, tuple(cycles)
+
+    def fraction_read(self):
+        return self.op_stream.fraction_read()
+
+    def close(self):
+        self.op_stream.close()
+
+
 class OpStream:
-    def __init__(self, file):
-        self.file = open(file)
+    def __init__(self, file, offset=0):
+        """
+        :param offset: byte offset in the (decompressed) trace of the first op to read
+        """
+        self.path = file
+        self.offset = offset
+        self.file = io.TextIOWrapper(open_trace_file(file, offset), newline='')
 
     def read_op(self):
         line = self.file.readline()
         if not line:
             self.close()
             return None
+        self.offset += len(line)
         opcode = int(line.split()[0])
         value = int(line.split()[1], 0)
         return opcode, value
 
+    def fraction_read(self):
+        return fraction_of_trace(self.path, self.offset)
+
+    def close(self):
+        self.file.close()
+
+    # checkpoints store the path and byte offset of the next op instead of the open file
+    def __getstate__(self):
+        return {'path': self.path, 'offset': self.offset}
+
+    def __setstate__(self, state):
+        self.__init__(state['path'], state['offset'])
+
+
+class BufferedOpStream:
+    """
+    Base of op streams that decode ops in bulk. Subclasses refill self.chunk, an iterator of (opcode, value) tuples,
+    in load_chunk; read_op drains it. self.chunk_start records where in the trace the current chunk begins, so
+    together with the number of ops already drained from it the stream knows its exact position for checkpoints.
+    """
+    def __init__(self):
+        self.chunk = iter(())
+        self.chunk_start = 0
+        self.chunk_length = 0
+
+    def read_op(self):
+        op = next(self.chunk, None)
+        while op is None and self.load_chunk():
+            op = next(self.chunk, None)
+        return op
+
+    def load_chunk(self):
+        """
+        decode the next chunk of ops into self.chunk
+        :return: False if the end of the trace has been reached
+        """
+        raise NotImplementedError
+
+    def set_chunk(self, start, opcodes, values):
+        ops = list(zip(opcodes.tolist(), values.tolist()))
+        self.chunk = iter(ops)
+        self.chunk_start = start
+        self.chunk_length = len(ops)
+
+    def ops_read_from_chunk(self):
+        return self.chunk_length - operator.length_hint(self.chunk)
+
+    def fraction_read(self):
+        """
+        :return: fraction of the trace read so far, None if it cannot be told
+        """
+        return None
+
+    def skip_ops(self, count):
+        """
+        drop the next <count> ops, loading further chunks as needed
+        """
+        while count:
+            count -= sum(1 for _ in itertools.islice(self.chunk, count))
+            if count and not self.load_chunk():
+                break
+
+    def close(self):
+        self.chunk = iter(())
+        self.chunk_length = 0
+
+
+class MmapOpStream(BufferedOpStream):
+    """
+    Op stream over a compiled binary trace. The file is memory-mapped and decoded a chunk at a time, so there is no
+    per-line parsing and memory use does not depend on the trace length.
+    """
+    chunk_size = 65536
+
+    def __init__(self, file, position=0):
+        """
+        :param position: index of the first op to read
+        """
+        super().__init__()
+        self.path = file
+        self.ops = np.load(file, mmap_mode='r')
+        self.position = position
+        self.chunk_start = position
+
+    def load_chunk(self):
+        if self.position >= len(self.ops):
+            return False
+        records = self.ops[self.position:self.position + self.chunk_size]
+        self.set_chunk(self.position, records['opcode'], records['value'])
+        self.position += len(records)
+        return True
+
+    def fraction_read(self):
+        if not len(self.ops):
+            return None
+        return (self.chunk_start + self.ops_read_from_chunk()) / len(self.ops)
+
+    def close(self):
+        super().close()
+        self.ops = self.ops[:0]
+
+    def __getstate__(self):
+        return {'path': self.path, 'position': self.chunk_start + self.ops_read_from_chunk()}
+
+    def __setstate__(self, state):
+        self.__init__(state['path'], state['position'])
+
+
+class ChunkedOpStream(BufferedOpStream):
+    """
+    Drop-in replacement of OpStream for text traces. The file is read in large blocks and every block of complete
+    lines is decoded at once with numpy, so memory use is bounded by the block size however long the trace is.
+    """
+    block_size = 1 << 20
+
+    def __init__(self, file, offset=0):
+        """
+        :param offset: byte offset in the (decompressed) trace of the first line to read
+        """
+        super().__init__()
+        self.path = file
+        self.file = open_trace_file(file, offset)
+        self.remainder = b''
+        self.offset = offset  # byte offset of the first line not yet decoded
+        self.chunk_start = offset
+
+    def load_chunk(self):
+        start = self.offset
+        block = self.read_lines()
+        if block is None:
+            return False
+        self.offset += len(block)
+        opcodes, values = decode_ops(block)
+        self.set_chunk(start, opcodes, values)
+        return True
+
+    def fraction_read(self):
+        if not self.chunk_length:
+            return fraction_of_trace(self.path, self.chunk_start)
+        drained = self.ops_read_from_chunk() / self.chunk_length
+        return fraction_of_trace(self.path, self.chunk_start + drained * (self.offset - self.chunk_start))
+
+    def read_lines(self):
+        """
+        :return: the next run of complete lines from the file, None at the end of the file
+        """
+        while True:
+            data = self.file.read(self.block_size)
+            if not data:
+                block, self.remainder = self.remainder, b''
+                return block if block.strip() else None
+            data = self.remainder + data
+            end = data.rfind(b'\n') + 1
+            if end:
+                self.remainder = data[end:]
+                return data[:end]
+            self.remainder = data
+
     def close(self):
+        super().close()
         self.file.close()
+
+    def __getstate__(self):
+        return {'path': self.path, 'offset': self.chunk_start, 'skip': self.ops_read_from_chunk()}
+
+    def __setstate__(self, state):
+        # chunks of the restored stream may split differently, the skipped ops can span several of them
+        self.__init__(state['path'], state['offset'])
+        self.skip_ops(state['skip'])
+
+
+_DIGIT_VALUES = np.full(256, 255, dtype=np.uint64)
+for _value, _digit in enumerate('0123456789abcdef'):
+    _DIGIT_VALUES[ord(_digit)] = _DIGIT_VALUES[ord(_digit.upper())] = _value
+# digit weights, row 0 for decimal and row 1 for hex numbers, indexed by the position counted from the last digit.
+# Decimals of up to 19 and hex numbers of up to 16 digits always fit into 64 bits, longer ones are decoded slowly
+_MAX_DIGITS = np.array([19, 16])
+_DIGIT_WEIGHTS = np.zeros((2, 19), dtype=np.uint64)
+_DIGIT_WEIGHTS[0, :19] = [10 ** i for i in range(19)]
+_DIGIT_WEIGHTS[1, :16] = [16 ** i for i in range(16)]
+
+
+def decode_ops(text):
+    """
+    decode a block of complete "opcode value" trace lines at once. Values are parsed like int(value, 0), i.e. hex
+    with a 0x prefix or decimal.
+    :param text: bytes of whole lines
+    :return: tuple(numpy uint8 array of opcodes, numpy uint64 array of values)
+    :raise ValueError: if a line is not an opcode and a value, or the value does not fit into 64 bits
+    """
+    chars = np.frombuffer(text, dtype=np.uint8)
+    if not len(chars):
+        return np.zeros(0, dtype=np.uint8), np.zeros(0, dtype=np.uint64)
+    is_space = chars <= ord(' ')
+    in_token = ~is_space
+    space_before = np.empty_like(is_space)
+    space_before[0] = True
+    space_before[1:] = is_space[:-1]
+    space_after = np.empty_like(is_space)
+    space_after[-1] = True
+    space_after[:-1] = is_space[1:]
+    starts = np.flatnonzero(in_token & space_before)
+    ends = np.flatnonzero(in_token & space_after) + 1
+    if len(starts) % 2:
+        raise ValueError("trace block has a line without a value")
+
+    # every token is an int, values may carry a 0x prefix
+    is_hex = (ends - starts > 2) & (chars[starts] == ord('0')) & \
+        (chars[np.minimum(starts + 1, len(chars) - 1)] | 0x20 == ord('x'))
+    is_hex[0::2] = False
+    # int(value, 0) only accepts leading zeros in decimal values that are all zeros, the slow path decides
+    leading_zero = ~is_hex & (ends - starts > 1) & (chars[starts] == ord('0'))
+    leading_zero[0::2] = False
+    digit_starts = starts + 2 * is_hex
+    lengths = ends - digit_starts
+    offsets = np.cumsum(lengths) - lengths
+    token = np.repeat(np.arange(len(starts)), lengths)
+    positions = np.arange(len(token)) - offsets[token] + digit_starts[token]
+    base = is_hex.astype(np.intp)
+    digits = _DIGIT_VALUES[chars[positions]]
+    exponents = ends[token] - 1 - positions
+    if not len(token) or leading_zero.any() or (lengths > _MAX_DIGITS[base]).any() or \
+            (np.maximum.reduceat(digits, offsets) > np.where(is_hex, 15, 9)).any():
+        return _decode_ops_slowly(text)
+
+    numbers = np.add.reduceat(digits * _DIGIT_WEIGHTS[base[token], exponents], offsets)
+    return numbers[0::2].astype(np.uint8), numbers[1::2]
+
+
+def _decode_ops_slowly(text):
+    """
+    decode line by line with int(), for blocks with values too long for the vectorized parser, bad digits or leading
+    zeros
+    """
+    opcodes = []
+    values = []
+    for line in text.splitlines():
+        fields = line.split()
+        if not fields:
+            continue
+        try:
+            opcode, value = int(fields[0]), int(fields[1], 0)
+        except (IndexError, ValueError):
+            raise ValueError("trace line {!r} is not an opcode and a value".format(line.decode(errors='replace')))
+        if not 0 <= value < 1 << 64:
+            raise ValueError("trace line {!r} has a value wider than 64 bits".format(line.decode(errors='replace')))
+        opcodes.append(opcode)
+        values.append(value)
+    return np.array(opcodes, dtype=np.uint8), np.array(values, dtype=np.uint64)
+
+
+class PrefetchReader(io.RawIOBase):
+    """
+    Read-only binary file that decompresses its source in a background thread. The stdlib codecs release the GIL
+    while decompressing, so decompression overlaps with the simulation. At most <depth> blocks are buffered.
+    """
+    block_size = 1 << 20
+
+    def __init__(self, source, depth=4):
+        super().__init__()
+        self.source = source
+        self.blocks = queue.Queue(maxsize=depth)
+        self.pending = memoryview(b'')
+        self.finished = False
+        self.stopping = threading.Event()
+        self.thread = threading.Thread(target=self.prefetch, daemon=True)
+        self.thread.start()
+
+    def prefetch(self):
+        try:
+            while not self.stopping.is_set():
+                block = self.source.read(self.block_size)
+                self.blocks.put(block)
+                if not block:
+                    return
+        except Exception as error:  # handed over to the reading thread
+            self.blocks.put(error)
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self.pending and not self.finished:
+            block = self.blocks.get()
+            if isinstance(block, Exception):
+                self.finished = True
+                raise block
+            self.finished = not block
+            self.pending = memoryview(block)
+        size = min(len(buffer), len(self.pending))
+        buffer[:size] = self.pending[:size]
+        self.pending = self.pending[size:]
+        return size
+
+    def close(self):
+        if not self.closed:
+            self.stopping.set()
+            while self.thread.is_alive():
+                try:
+                    self.blocks.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            self.source.close()
+        super().close()
+
+
+def open_trace_file(path, offset=0):
+    """
+    open a text trace for binary reading, compressed traces (.gz, .bz2, .xz) are decompressed in the background
+    :param path: path of the trace file
+    :param offset: byte offset in the decompressed trace to start reading at
+    :return: binary file object
+    """
+    opener = COMPRESSED_TRACE_OPENERS.get(os.path.splitext(path)[1])
+    if opener is None:
+        file = open(path, 'rb')
+        file.seek(offset)
+        return file
+    file = io.BufferedReader(PrefetchReader(opener(path, 'rb')))
+    while offset > 0:  # compressed streams cannot seek, decompress up to the offset instead
+        skipped = len(file.read(min(offset, 1 << 20)))
+        if not skipped:
+            break
+        offset -= skipped
+    return file
+
+
+def fraction_of_trace(path, offset):
+    """
+    :param offset: byte offset in the text trace at <path>
+    :return: fraction of the trace before <offset>, None for compressed traces, whose decompressed size is unknown
+    """
+    if os.path.splitext(path)[1] in COMPRESSED_TRACE_OPENERS:
+        return None
+    size = os.path.getsize(path)
+    return min(offset / size, 1.0) if size else None
+
+
+def binary_trace_path(text_path):
+    """
+    :param text_path: path of a text trace, e.g. ./data/bodytrack_four/bodytrack_0.data or bodytrack_0.data.gz
+    :return: path of the compiled binary trace next to it, e.g. ./data/bodytrack_four/bodytrack_0.npy
+    """
+    root, extension = os.path.splitext(text_path)
+    if extension in COMPRESSED_TRACE_OPENERS:
+        root = os.path.splitext(root)[0]
+    return root + '.npy'
+
+
+def compile_trace(text_path, binary_path=None):
+    """
+    compile a text trace into the packed binary format read by MmapOpStream
+    :param text_path: path of the text trace
+    :param binary_path: destination, defaults to binary_trace_path(text_path)
+    :return: path of the written binary trace
+    """
+    binary_path = binary_path or binary_trace_path(text_path)
+    with open_trace_file(text_path) as file:
+        num_ops = sum(1 for line in file if line.strip())
+
+    ops = np.lib.format.open_memmap(binary_path, mode='w+', dtype=TRACE_DTYPE, shape=(num_ops,))
+    position = 0
+    opstream = ChunkedOpStream(text_path)
+    block = opstream.read_lines()
+    while block is not None:
+        opcodes, values = decode_ops(block)
+        ops['opcode'][position:position + len(opcodes)] = opcodes
+        ops['value'][position:position + len(values)] = values
+        position += len(opcodes)
+        block = opstream.read_lines()
+    opstream.close()
+    ops.flush()
+    del ops
+    return binary_path
@@ -1,11 +1,86 @@
 import argparse
 
+from workloads.generators import PATTERNS
+
+
+def workload_param(text):
+    """
+    parse key=value, the value as int or float if it is one
+    """
+    key, _, value = text.partition('=')
+    for convert in (lambda number: int(number, 0), float):
+        try:
+            return key, convert(value)
+        except ValueError:
+            pass
+    return key, value
+
+
 parser = argparse.ArgumentParser()
-parser.add_argument('--protocol', default='MESI', type=str)
+parser.add_argument('--protocol', default='MESI', type=str, help='MESI, MOESI, DRAGON or MESI_DIR')
 parser.add_argument('--input_file', default='blackscholes', type=str)
+parser.add_argument('--workload', default=None, choices=sorted(PATTERNS),
+                    help='simulate a generated synthetic workload instead of --input_file')
+parser.add_argument('--workload_ops', default=1000000, type=int, help='ops per core of the generated workload')
+parser.add_argument('--workload_seed', default=0, type=int)
+parser.add_argument('--workload_params', nargs='+', default=[], type=workload_param,
+                    help='parameters of the workload pattern as key=value, e.g. blocks=8')
 parser.add_argument('--cache_size', default=4096, type=int)
 parser.add_argument('--associativity', default=2, type=int)
 parser.add_argument('--block_size', default=32, type=int)
 parser.add_argument('--bus_mem_op', action='store_true')
+parser.add_argument('--engine', default='cycle', choices=['cycle', 'event'], type=str)
+parser.add_argument('--snoop_filter', action='store_true')
+parser.add_argument('--hop_latency', default=10, type=int, help='cycles per directory message hop, MESI_DIR only')
+parser.add_argument('--memory', default='flat', choices=['flat', 'dram'], type=str,
+                    help='flat: every memory access takes 100 cycles, dram: banked DRAM with row buffers and queues')
+parser.add_argument('--dram_channels', default=1, type=int)
+parser.add_argument('--dram_banks', default=8, type=int, help='banks per channel')
+parser.add_argument('--dram_bandwidth', default=8, type=int, help='bytes per cycle per channel')
+parser.add_argument('--llc_size', default=0, type=int,
+                    help='bytes of a last-level cache shared by all cores between the bus and memory, 0 for none')
+parser.add_argument('--llc_assoc', default=8, type=int)
+parser.add_argument('--llc_latency', default=20, type=int, help='cycles of an LLC hit')
+parser.add_argument('--llc_inclusive', action='store_true',
+                    help='evicting a block from the LLC invalidates its copies in the L1 caches')
+parser.add_argument('--fast_forward', default=0, type=int,
+                    help='warm up the caches with the first that many ops per core, untimed')
+parser.add_argument('--sample_window', default=0, type=int,
+                    help='sampled simulation: ops per core simulated in detail per sample, 0 simulates everything')
+parser.add_argument('--sample_gap', default=100000, type=int,
+                    help='sampled simulation: ops fast-forwarded between two samples by a core of average speed')
+parser.add_argument('--sample_warmup', default=None, type=int,
+                    help='sampled simulation: ops per core simulated in detail before every sample and not measured, '
+                         'half a sample by default')
+parser.add_argument('--profile', action='store_true', help='print the wall time spent per simulator component')
+parser.add_argument('--profile_output', default=None, type=str,
+                    help='also write a cProfile dump of the run to this path, implies --profile')
+parser.add_argument('--trace_events', default=None, type=str,
+                    help='record bus grants, snoop responses, state transitions etc. to this binary file, print it '
+                         'with python tracing.py <file>')
+parser.add_argument('--trace_components', nargs='+', default=None, help='only trace these caches, e.g. P0 P2')
+parser.add_argument('--trace_addresses', nargs='+', default=None, type=lambda value: int(value, 0),
+                    help='only trace the blocks containing these addresses')
+parser.add_argument('--progress_interval', default=10.0, type=float,
+                    help='seconds between two progress reports, 0 for none')
+parser.add_argument('--progress_ops', default=0, type=int,
+                    help='also report progress whenever the cores executed that many more ops together')
+parser.add_argument('--quiet', action='store_true', help='no progress reports or run summary, e.g. for batch runs')
+parser.add_argument('--metrics_interval', default=0, type=int,
+                    help='record bus traffic, misses, idle cycles and memory queue depth every that many cycles')
+parser.add_argument('--metrics_output', default='./output/intervals.csv', type=str)
+parser.add_argument('--checkpoint_every', default=0, type=int, help='save a checkpoint every that many cycles')
+parser.add_argument('--checkpoint', default='./output/checkpoint.pkl', type=str)
+parser.add_argument('--restore', default=None, type=str,
+                    help='resume from a checkpoint, the other simulator options are taken from the checkpoint')
+
+
 
-args = parser.parse_args()
\ No newline at end of file
+def parse_args(argv=None):
+    """
+    :param argv: command line arguments, sys.argv[1:] by default
+    """
+    args = parser.parse_args(argv)
+    if args.workload and args.checkpoint_every:
+        parser.error('generated workloads cannot be checkpointed, use a trace file')
+    return args
\ No newline at end of file
@@ -0,0 +1,132 @@
+import cProfile
+from time import perf_counter
+
+
+class Profiler:
+    """
+    Wall time breakdown of a simulation. While active, the profiler is attached to the simulator, whose tick reads
+    the clock between its phases, and every op stream is wrapped in a TimedOpStream, so the overhead is a few clock
+    reads per simulated cycle and nothing changes outside of a profiled run. Trace reads happen within
+    Processor.interim and are only counted as OpStream.read_op. Time spent outside of tick, e.g. fast-forwarding,
+    is reported as 'other'. A checkpoint saved while profiling restores without the profiler.
+
+    Use as a context manager around the run, e.g.
+        with Profiler(sim) as profiler:
+            sim.run()
+        print(profiler.report())
+    """
+    PHASES = ['Processor.interim', 'Cache.interim', 'Bus.interim', 'Processor.tick', 'Cache.tick',
+              'MemoryController.tick', 'skip_idle_cycles', 'OpStream.read_op']
+
+    def __init__(self, sim, stats_path=None):
+        """
+        :param sim: Simulator to profile
+        :param stats_path: if given, the run is also profiled with cProfile and its pstats dump written to this path
+        """
+        self.sim = sim
+        self.stats_path = stats_path
+        self.times = dict.fromkeys(self.PHASES, 0.0)
+        self.ops = 0
+        self.cycles = 0
+        self.wall_time = 0.0
+        self.cprofile = None
+        self.start_time = 0.0
+        self.start_counter = 0
+        self.last = 0.0  # clock and read_op time at the end of the last timed phase
+        self.last_read = 0.0
+
+    def __enter__(self):
+        sim = self.sim
+        for proc in sim.procs:
+            if proc.op_stream is not None:
+                proc.op_stream = TimedOpStream(proc.op_stream, self)
+        sim.profiler = self
+        if self.stats_path:
+            self.cprofile = cProfile.Profile()
+            self.cprofile.enable()
+        self.start_counter = sim.counter
+        self.start_time = perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.wall_time += perf_counter() - self.start_time
+        self.cycles += self.sim.counter - self.start_counter
+        if self.cprofile is not None:
+            self.cprofile.disable()
+            self.cprofile.dump_stats(self.stats_path)
+            self.cprofile = None
+        self.sim.profiler = None
+        for proc in self.sim.procs:
+            if isinstance(proc.op_stream, TimedOpStream):
+                proc.op_stream = proc.op_stream.op_stream
+        return False
+
+    def start_tick(self):
+        """
+        called by Simulator.tick before its first phase
+        """
+        self.last = perf_counter()
+        self.last_read = self.times['OpStream.read_op']
+
+    def lap(self, phase):
+        """
+        called by Simulator.tick after each of its phases, adds the time since the previous phase to <phase>, less
+        the time spent reading ops in between
+        """
+        t = perf_counter()
+        read_time = self.times['OpStream.read_op']
+        self.times[phase] += t - self.last - (read_time - self.last_read)
+        self.last = t
+        self.last_read = read_time
+
+    def report(self):
+        """
+        :return: printable table of the wall time per phase, and the simulation speed
+        """
+        wall_time = self.wall_time or float('nan')
+        lines = ['{:<24}{:>12}{:>8}'.format('phase', 'seconds', '%')]
+        rows = [(phase, self.times[phase]) for phase in sorted(self.PHASES, key=self.times.get, reverse=True)]
+        rows.append(('other', self.wall_time - sum(self.times.values())))
+        for phase, seconds in rows:
+            lines.append('{:<24}{:>12.3f}{:>8.1f}'.format(phase, seconds, 100 * seconds / wall_time))
+        lines.append('{:<24}{:>12.3f}'.format('total', self.wall_time))
+        lines.append('simulated cycles per second: {:.0f}'.format(self.cycles / wall_time))
+        lines.append('ops per second: {:.0f}'.format(self.ops / wall_time))
+        if self.stats_path:
+            lines.append('cProfile statistics written to {}'.format(self.stats_path))
+        return '\n'.join(lines)
+
+
+class TimedOpStream:
+    """
+    Op stream stage that adds the time spent in read_op and the number of ops read to a Profiler. It is pickled as
+    the stream it wraps, so checkpoints of a profiled run hold no reference to the profiler.
+    """
+    def __init__(self, op_stream, profiler):
+        self.op_stream = op_stream
+        self.profiler = profiler
+
+    def read_op(self):
+        start = perf_counter()
+        op = self.op_stream.read_op()
+        profiler = self.profiler
+        profiler.times['OpStream.read_op'] += perf_counter() - start
+        if op is not None:
+            profiler.ops += len(op[1]) if type(op[1]) is tuple else 1  # merged compute ops count one by one
+        return op
+
+    def fraction_read(self):
+        return self.op_stream.fraction_read()
+
+    def close(self):
+        self.op_stream.close()
+
+    def __reduce__(self):
+        return unwrapped, (self.op_stream,)
+
+
+def unwrapped(op_stream):
+    """
+    :return: <op_stream>, a pickled TimedOpStream is restored as this call with the stream it wrapped
+    """
+    return op_stream
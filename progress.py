@@ -0,0 +1,88 @@
+import sys
+from datetime import timedelta
+from time import perf_counter
+
+
+class ProgressReporter:
+    """
+    Periodic progress line of a running simulation: per-core progress through its trace, ops and cycles simulated
+    per second since the previous report and the estimated time left. Simulator.run polls the reporter every tick;
+    the clock is only read every <poll_ticks> polls, so reporting costs next to nothing between two reports.
+    """
+    def __init__(self, sim, interval=10.0, ops=0, poll_ticks=1024, file=None):
+        """
+        :param interval: seconds between two reports, 0 for none
+        :param ops: also report whenever the cores executed that many more ops together, 0 for no op threshold
+        :param poll_ticks: number of polls between two looks at the clock and op counts
+        :param file: where to write the reports, stdout by default
+        """
+        self.sim = sim
+        self.interval = interval
+        self.ops = ops
+        self.poll_ticks = poll_ticks
+        self.file = file
+        self.polls = 0
+        self.start_time = self.last_time = perf_counter()
+        self.start_fraction = self.fraction()
+        self.last_ops = self.next_ops = self.ops_done()
+        self.next_ops += ops
+        self.last_counter = sim.counter
+        self.reports = 0
+
+    def ops_done(self):
+        return sum(proc.done_job_counter + 1 for proc in self.sim.procs)
+
+    def fractions(self):
+        """
+        :return: list of the fraction of its trace every core has executed, None where the trace length is unknown
+        """
+        fractions = []
+        for proc in self.sim.procs:
+            if proc.done:
+                fractions.append(1.0)
+            elif proc.op_stream is None or not hasattr(proc.op_stream, 'fraction_read'):
+                fractions.append(None)
+            else:
+                fractions.append(proc.op_stream.fraction_read())
+        return fractions
+
+    def fraction(self):
+        """
+        :return: progress of the whole run, that of the slowest core, None if unknown
+        """
+        known = [fraction for fraction in self.fractions() if fraction is not None]
+        return min(known) if known else None
+
+    def poll(self):
+        self.polls += 1
+        if self.polls < self.poll_ticks:
+            return
+        self.polls = 0
+        now = perf_counter()
+        if (self.interval and now - self.last_time >= self.interval) or (self.ops and self.ops_done() >= self.next_ops):
+            self.report(now)
+
+    def eta(self, now):
+        """
+        :return: estimated seconds until the run ends, None if unknown
+        """
+        fraction = self.fraction()
+        if fraction is None or self.start_fraction is None or fraction <= self.start_fraction:
+            return None
+        return (now - self.start_time) * (1 - fraction) / (fraction - self.start_fraction)
+
+    def report(self, now=None):
+        now = perf_counter() if now is None else now
+        ops = self.ops_done()
+        seconds = max(now - self.last_time, 1e-9)
+        cores = ' '.join('{} {}'.format(proc.cache.name, '?' if fraction is None else '{:.1%}'.format(fraction))
+                         for proc, fraction in zip(self.sim.procs, self.fractions()))
+        eta = self.eta(now)
+        print('cycle {}  {}  {:.0f} ops/s  {:.0f} cycles/s  ETA {}'.format(
+            self.sim.counter, cores, (ops - self.last_ops) / seconds, (self.sim.counter - self.last_counter) / seconds,
+            '?' if eta is None else timedelta(seconds=round(eta))), file=self.file or sys.stdout, flush=True)
+        self.last_time = now
+        self.last_ops = ops
+        self.next_ops = ops + self.ops
+        self.last_counter = self.sim.counter
+        self.reports += 1
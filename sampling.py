@@ -0,0 +1,246 @@
+import heapq
+import math
+from statistics import NormalDist
+
+from components.directory import Directory
+
+
+def bus_statistics(sim):
+    """
+    :return: dict of the additive bus counters reported by compute_statistics
+    """
+    stats = {'Bus Data Traffic': sim.bus.total_bus_traffic,
+             'Bus Invalidation/Updates': sim.bus.total_bus_invalidation_or_updates}
+    if isinstance(sim.bus, Directory):
+        stats['Directory Messages'] = sim.bus.messages
+    elif sim.bus.snoop_filter is not None:
+        stats['Snoops'] = sim.bus.snoop_filter.snoops
+        stats['Filtered Snoops'] = sim.bus.snoop_filter.filtered_snoops
+    return stats
+
+
+def ratio_estimate(values, weights, confidence=0.95):
+    """
+    ratio estimator over the sampled windows, e.g. cycles per op: sum(values) / sum(weights)
+    :param values: measured value of every window
+    :param weights: size of every window, e.g. its number of ops
+    :param confidence: confidence level of the interval
+    :return: tuple(ratio, half width of its confidence interval), the half width is nan with fewer than 2 windows
+    """
+    total_weight = sum(weights)
+    if not total_weight:
+        return 0.0, 0.0
+    ratio = sum(values) / total_weight
+    windows = len(values)
+    if windows < 2:
+        return ratio, float('nan')
+    residuals = sum((value - ratio * weight) ** 2 for value, weight in zip(values, weights))
+    standard_error = math.sqrt(residuals / (windows * (windows - 1))) / (total_weight / windows)
+    return ratio, NormalDist().inv_cdf(0.5 + confidence / 2) * standard_error
+
+
+def core_cycles_estimate(windows, core, confidence=0.95):
+    """
+    estimate of the cycles <core> takes for its whole trace: the exact cycles of the ops simulated in detail plus the
+    cycles spanned by the fast-forwarded gaps. The interval reflects how much the speed of the core, which decides
+    how far it gets in a gap, varies from window to window
+    :return: tuple(total, half width of its confidence interval), see ratio_estimate
+    """
+    gap_cycles = sum(w['gap_cycles'][core] for w in windows)
+    speed, half_width = ratio_estimate([w['core_ops'][core] for w in windows],
+                                       [w['core_cycles'][core] for w in windows], confidence)
+    relative_half_width = half_width / speed if speed else 0.0
+    return sum(w['detailed_core_cycles'][core] for w in windows) + gap_cycles, relative_half_width * gap_cycles
+
+
+def fast_forward_gap(procs, gaps):
+    """
+    execute up to <gaps>[i] ops of every unfinished processor i functionally. The processors take turns op by op, a
+    run of merged compute ops is skipped at once and takes as many turns as it has ops, so the loads and stores of
+    all processors are applied in the same order whether compute ops are merged. A processor stops at its job limit
+    as in detailed mode. Job counters, instruction counts and compute cycles are still added to the processors, so
+    they stay exact over the whole trace.
+    :return: list of the number of ops executed per processor
+    """
+    ops = [0] * len(procs)
+    for i, proc in enumerate(procs):
+        if proc.done_job_limit:
+            gaps[i] = min(gaps[i], proc.done_job_limit - proc.done_job_counter - 1)
+    turns = [(0, i) for i, proc in enumerate(procs) if not proc.done and gaps[i] > 0]  # (turn of the next op, index)
+    while turns:
+        turn, i = turns[0]
+        proc = procs[i]
+        job = proc.fast_forward(gaps[i] - ops[i])
+        if job is None:
+            heapq.heappop(turns)
+            continue
+        ops[i] += job.ops
+        proc.done_job_counter += job.ops
+        if job.type > 1:
+            proc.total_compute_cycles += job.compute_cycles
+        elif job.type:
+            proc.total_store_instructions += 1
+        else:
+            proc.total_load_instructions += 1
+        if ops[i] < gaps[i]:
+            heapq.heapreplace(turns, (turn + job.ops, i))
+        else:
+            heapq.heappop(turns)
+    return ops
+
+
+def run_window(sim, window, warmup=0):
+    """
+    simulate the next ops of every unfinished processor in detail with the normal Simulator.tick loop, until the
+    first core has executed <warmup> + <window> ops. The other cores then stop before their next load or store, so
+    no core executes more than <warmup> + <window> ops. The ops before the first core has executed <warmup> ops
+    refill the bus and memory queues, which are empty after a fast-forwarded gap, and are not measured. From then
+    on every core is measured from its next load or store until it stops, over the same cycles as the others and
+    under their contention. The job limits of the processors are respected and restored afterwards.
+    :param warmup: number of ops simulated in detail before the measured ones by the first core
+    :return: dict of the window's measurements, 'ops' counts all ops executed in detail and the bus and cache
+    statistics and 'detailed_core_cycles' cover all of them, 'core_ops' and 'core_cycles' only the measured ops of
+    every core
+    """
+    sim.reset_statistics()
+    running = [proc for proc in sim.procs if not proc.done]
+    num_procs = len(sim.procs)
+    base = [proc.done_job_counter for proc in sim.procs]
+    limits = [proc.done_job_limit for proc in sim.procs]
+    initial = [proc.counter for proc in sim.procs]
+    for proc in running:
+        i = proc.index
+        window_end = base[i] + 1 + warmup + window
+        proc.done_job_limit = min(limits[i], window_end) if limits[i] else window_end
+        # merged compute ops are split where separate ops are checked against the warm-up
+        proc.op_boundaries = (base[i] + 1 + warmup,)
+    warm = [None] * num_procs  # clock of every core when the first core finished its warm-up
+    start, end = [None] * num_procs, [None] * num_procs
+    warming, stopping = True, False
+    finished = []
+    while len(finished) < len(running):
+        # a core fetches its next op in the interim of the tick, before the tick advances its clock
+        before = [(proc.counter, proc.total_load_instructions + proc.total_store_instructions) for proc in sim.procs]
+        sim.tick()
+        if warming and any(proc.done_job_counter - base[proc.index] - 1 >= warmup for proc in running):
+            warming = False
+            warm = [cycle for cycle, _ in before]
+        for proc in running:
+            i = proc.index
+            if proc in finished:
+                continue
+            # the interim that fetches a job counts the ops before it and all but the first of its own as done, the
+            # interim that stops a processor counts one job more than it executes
+            ops = proc.done_job_counter - base[i] - 1
+            memory_ops = proc.total_load_instructions + proc.total_store_instructions
+            if warm[i] is not None and start[i] is None and memory_ops > before[i][1]:
+                start[i] = (ops, before[i][0])  # the load or store fetched in this tick is measured
+            if proc.done:
+                finished.append(proc)
+                end[i] = (ops, before[i][0])
+                if ops == warmup + window and not stopping:
+                    # the ops up to the next load or store run alike whether compute ops are merged
+                    stopping = True
+                    for other in running:
+                        other.stop_before_memory_op = True
+
+    measured = {'ops': [0] * num_procs, 'core_ops': [0] * num_procs, 'core_cycles': [0] * num_procs,
+                'detailed_core_cycles': [0] * num_procs, 'stats': bus_statistics(sim),
+                'private': sum(proc.cache.total_private_accesses for proc in sim.procs),
+                'accesses': [proc.cache.total_access_count for proc in sim.procs],
+                'misses': [proc.cache.cache_miss_count for proc in sim.procs]}
+    for proc in running:
+        i = proc.index
+        measured['ops'][i] = end[i][0]
+        measured['detailed_core_cycles'][i] = proc.counter - initial[i]
+        if warm[i] is not None:
+            # a core that waited for the bus all the time is measured without a load or store
+            first_ops, first_cycle = start[i] if start[i] is not None else end[i]
+            measured['core_ops'][i] = end[i][0] - first_ops
+            measured['core_cycles'][i] = end[i][1] - (first_cycle if start[i] is not None else warm[i])
+        proc.op_boundaries = ()
+        proc.stop_before_memory_op = False
+        proc.done_job_limit = limits[i]
+        proc.done_job_counter -= 1  # the interim that stopped the processor did not execute a job
+        # stopped before a load or store or at the end of its window, not at the end of its trace or its job limit
+        if not (limits[i] and proc.done_job_counter + 1 >= limits[i]) and (
+                proc.held_op is not None or end[i][0] == warmup + window):
+            proc.done = False
+    return measured
+
+
+def run_sampled(sim, window=10000, gap=100000, confidence=0.95, warmup=None):
+    """
+    Periodic sampled simulation: simulate <warmup> ops per core cycle by cycle to refill the queues and a window
+    after them that ends when the first core has executed <warmup> + <window> ops, then fast-forward the following
+    ops functionally (caches and coherence states are still updated), and repeat until every trace ends. Every core
+    is measured over the same cycles of the window, see run_window. A gap spans the same number of cycles for every
+    core, estimated from its cycles per op in the last window it was measured in, so a core that is slower in detail
+    also skips fewer ops and the cores stay as far apart in their traces as in a detailed run. The cycles of every
+    core are those simulated in detail plus those its gaps span, and the execution cycles are those of the slowest
+    core. The overall statistics are extrapolated with ratio estimators per op executed by all cores. Compute cycles
+    and instruction counts are counted exactly, and the job limits of the processors are respected.
+    :param sim: freshly created Simulator, sampling replaces its run()
+    :param window: most number of ops per core simulated in detail and measured per sample
+    :param gap: number of ops fast-forwarded between two samples by a core of average speed
+    :param confidence: confidence level of the reported intervals
+    :param warmup: number of ops per core simulated in detail before every window, None for half a window
+    :return: tuple(dict of overall statistics, dict of per-core statistics keyed by cache name, dict of the half
+    widths of the confidence intervals of the overall statistics, same for the per-core statistics), keyed like the
+    result of compute_statistics
+    """
+    if warmup is None:
+        warmup = window // 2
+    num_procs = len(sim.procs)
+    total_ops = [0] * num_procs
+    windows = []
+    speeds = [None] * num_procs  # ops per cycle of every core in the last window it was measured in
+    while not all(proc.done for proc in sim.procs):
+        measured = run_window(sim, window, warmup)
+        for i in range(num_procs):
+            if measured['core_cycles'][i]:
+                speeds[i] = measured['core_ops'][i] / measured['core_cycles'][i]
+            elif speeds[i] is None and measured['detailed_core_cycles'][i]:  # over the whole window until measured
+                speeds[i] = measured['ops'][i] / measured['detailed_core_cycles'][i]
+        # a gap spans the same cycles on every core, those a core of average speed takes for <gap> ops
+        known = [speed for speed, proc in zip(speeds, sim.procs) if speed is not None and not proc.done]
+        cycles = gap * len(known) / sum(known) if known and sum(known) else 0
+        gaps = [round(cycles * speed) if speed is not None else 0 for speed in speeds]
+        measured['gap'] = fast_forward_gap(sim.procs, gaps)
+        # a core whose trace ends in the gap only spans part of it
+        measured['gap_cycles'] = [cycles * ops / planned if planned else 0 if proc.done else cycles
+                                  for ops, planned, proc in zip(measured['gap'], gaps, sim.procs)]
+        total_ops = [total + ops + more for total, ops, more in zip(total_ops, measured['ops'], measured['gap'])]
+        windows.append(measured)
+
+    window_ops = [sum(w['ops']) for w in windows]
+    stats, intervals = {}, {}
+    core_cycles = [core_cycles_estimate(windows, i, confidence) for i in range(num_procs)]
+    slowest = max(range(num_procs), key=lambda i: core_cycles[i][0])
+    stats['Overall Execution Cycle'], intervals['Overall Execution Cycle'] = core_cycles[slowest]
+    for key in bus_statistics(sim):
+        ratio, half_width = ratio_estimate([w['stats'][key] for w in windows], window_ops, confidence)
+        stats[key] = ratio * sum(total_ops)
+        intervals[key] = half_width * sum(total_ops)
+    ratio, half_width = ratio_estimate([w['private'] for w in windows], [sum(w['accesses']) for w in windows],
+                                       confidence)
+    stats['Private Data Access Percentage'] = 100 * ratio
+    intervals['Private Data Access Percentage'] = 100 * half_width
+
+    stats_per_core, intervals_per_core = {}, {}
+    for i, proc in enumerate(sim.procs):
+        miss_rate, miss_rate_half_width = ratio_estimate([w['misses'][i] for w in windows],
+                                                         [w['accesses'][i] for w in windows], confidence)
+        stats_per_core[proc.cache.name] = {
+            'Compute Cycles': int(proc.total_compute_cycles),
+            'Load/Store Instructions': int(proc.total_store_instructions + proc.total_load_instructions),
+            'Idle Cycles': core_cycles[i][0] - proc.total_compute_cycles,
+            'Cache Miss Rate': miss_rate
+        }
+        intervals_per_core[proc.cache.name] = {
+            'Compute Cycles': 0,
+            'Load/Store Instructions': 0,
+            'Idle Cycles': core_cycles[i][1],
+            'Cache Miss Rate': miss_rate_half_width
+        }
+    return stats, stats_per_core, intervals, intervals_per_core
@@ -0,0 +1,175 @@
+import argparse
+import csv
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from main import Simulator, compute_statistics
+from tracecache import TraceCache
+
+CONFIG_COLUMNS = ['protocol', 'cache_size', 'associativity', 'block_size', 'bus_mem_op', 'trace']
+OVERALL_COLUMNS = ['Overall Execution Cycle', 'Bus Data Traffic', 'Bus Invalidation/Updates',
+                   'Private Data Access Percentage']
+# statistics compute_statistics only reports for some protocols
+PROTOCOL_COLUMNS = {'MESI_DIR': ['Directory Messages']}
+PER_CORE_COLUMNS = ['Compute Cycles', 'Load/Store Instructions', 'Idle Cycles', 'Cache Miss Rate']
+
+parser = argparse.ArgumentParser(description='Run every combination of protocol, cache geometry and trace in parallel')
+parser.add_argument('--protocols', nargs='+', default=['MESI', 'MOESI', 'DRAGON'])
+parser.add_argument('--cache_sizes', nargs='+', default=[4096], type=int)
+parser.add_argument('--associativities', nargs='+', default=[2], type=int)
+parser.add_argument('--block_sizes', nargs='+', default=[32], type=int)
+parser.add_argument('--bus_mem_op', nargs='+', default=[0], type=int, choices=[0, 1],
+                    help='DRAGON only, other protocols always run with 0')
+parser.add_argument('--traces', nargs='+', default=['blackscholes'])
+parser.add_argument('--num_cores', default=4, type=int)
+parser.add_argument('--engine', default='event', choices=['cycle', 'event'], type=str,
+                    help='both give the same results, event skips idle cycles and is faster on most workloads')
+parser.add_argument('--workers', default=None, type=int, help='defaults to the number of CPUs')
+parser.add_argument('--output', default='./output/sweep.csv', type=str,
+                    help='consolidated results, per-core results go next to it with a _percore suffix')
+
+
+def configuration_grid(args):
+    """
+    :return: list of configurations, each a dict keyed by CONFIG_COLUMNS
+    """
+    configurations = []
+    for protocol, size, assoc, block_size, bus_mem_op, trace in itertools.product(
+            args.protocols, args.cache_sizes, args.associativities, args.block_sizes, args.bus_mem_op, args.traces):
+        if bus_mem_op and protocol.upper() != 'DRAGON':
+            continue
+        configurations.append({'protocol': protocol.upper(), 'cache_size': size, 'associativity': assoc,
+                               'block_size': block_size, 'bus_mem_op': bus_mem_op, 'trace': trace})
+    return configurations
+
+
+def configuration_key(configuration):
+    return tuple(str(configuration[column]) for column in CONFIG_COLUMNS)
+
+
+def run_configuration(configuration, num_cores=4, engine='event', trace_cache=None):
+    """
+    simulate one configuration, executed in a worker process
+    :param trace_cache: TraceCache holding the decoded trace of the configuration
+    :return: tuple(configuration, dict of overall statistics, dict of per-core statistics)
+    """
+    sim = Simulator(protocol=configuration['protocol'], data=configuration['trace'], num_cores=num_cores,
+                    size=configuration['cache_size'], assoc=configuration['associativity'],
+                    block_size=configuration['block_size'], bus_mem_op=bool(configuration['bus_mem_op']),
+                    engine=engine, trace_cache=trace_cache)
+    sim.run(quiet=True)
+    stats, stats_per_core = compute_statistics(sim)
+    return configuration, stats, stats_per_core
+
+
+def finished_keys(path):
+    """
+    :return: set of configuration keys already recorded in the results table at <path>
+    """
+    if not os.path.exists(path):
+        return set()
+    with open(path, newline='') as file:
+        return {configuration_key(row) for row in csv.DictReader(file)}
+
+
+def discard_unfinished_rows(path, keys):
+    """
+    drop rows of configurations that are not in <keys>, left behind by a sweep interrupted mid-write
+    """
+    if not os.path.exists(path):
+        return
+    with open(path, newline='') as file:
+        reader = csv.DictReader(file)
+        columns = reader.fieldnames
+        rows = [row for row in reader if configuration_key(row) in keys]
+    with open(path, 'w', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def overall_columns(configurations):
+    """
+    :return: columns of the overall results table of <configurations>, the statistics of all their protocols
+    """
+    columns = list(OVERALL_COLUMNS)
+    for protocol in sorted({c['protocol'] for c in configurations}):
+        columns += [column for column in PROTOCOL_COLUMNS.get(protocol, []) if column not in columns]
+    return columns
+
+
+def open_table(path, columns):
+    """
+    open the results table at <path> to append rows to. A table that lacks some of <columns>, e.g. one of a sweep
+    resumed with more protocols, is rewritten with them, its rows keep empty values there
+    :return: tuple(file, csv.DictWriter of the columns of the table)
+    """
+    new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+    if not new_file:
+        with open(path, newline='') as file:
+            reader = csv.DictReader(file)
+            old_columns = reader.fieldnames
+            missing = [column for column in columns if column not in old_columns]
+            rows = list(reader) if missing else []
+        if missing:
+            # the new columns first, in their usual order, then those only the old table has
+            columns = columns + [column for column in old_columns if column not in columns]
+            with open(path, 'w', newline='') as file:
+                writer = csv.DictWriter(file, fieldnames=columns)
+                writer.writeheader()
+                writer.writerows(rows)
+        else:
+            columns = old_columns
+    file = open(path, 'a', newline='')
+    writer = csv.DictWriter(file, fieldnames=columns)
+    if new_file:
+        writer.writeheader()
+    return file, writer
+
+
+def run_sweep(configurations, output, num_cores=4, engine='event', workers=None):
+    """
+    Run all configurations that are not yet in the results table at <output>. Every finished configuration is
+    appended to the table straight away, so an interrupted sweep resumes where it stopped when started again.
+    Each trace is decoded once into a TraceCache shared by all workers.
+    :return: number of configurations simulated
+    """
+    out_dir = os.path.dirname(output)
+    if out_dir and not os.path.exists(out_dir):
+        os.makedirs(out_dir)
+    done = finished_keys(output)
+    pending = [c for c in configurations if configuration_key(c) not in done]
+    print("{} configurations, {} already done, {} to run".format(len(configurations), len(configurations) -
+                                                                  len(pending), len(pending)))
+
+    per_core_output = os.path.splitext(output)[0] + '_percore.csv'
+    discard_unfinished_rows(per_core_output, done)
+    overall_file, overall_writer = open_table(output, CONFIG_COLUMNS + overall_columns(configurations))
+    per_core_file, per_core_writer = open_table(per_core_output, CONFIG_COLUMNS + ['core'] + PER_CORE_COLUMNS)
+    trace_cache = TraceCache()
+    try:
+        for trace in sorted({c['trace'] for c in pending}):
+            trace_cache.add(trace, num_cores)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(run_configuration, c, num_cores, engine, trace_cache) for c in pending]
+            for future in as_completed(futures):
+                configuration, stats, stats_per_core = future.result()
+                # per-core rows first: a configuration only counts as finished once its overall row is written
+                for core, core_stats in stats_per_core.items():
+                    per_core_writer.writerow(dict(configuration, core=core, **core_stats))
+                per_core_file.flush()
+                overall_writer.writerow(dict(configuration, **stats))
+                overall_file.flush()
+                print("done: {}".format(', '.join(configuration_key(configuration))))
+    finally:
+        trace_cache.close()
+        overall_file.close()
+        per_core_file.close()
+    return len(pending)
+
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    run_sweep(configuration_grid(args), args.output, num_cores=args.num_cores, engine=args.engine,
+              workers=args.workers)
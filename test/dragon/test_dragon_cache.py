@@ -51,7 +51,8 @@ def test_get_cache_block(cache_0:DragonCache):
 def test_simple_cache_set_order_update(cache_assoc_4:DragonCache, cache_set_array, expected):
     cache_assoc_4.data[1] = np.matrix(cache_set_array)
     cache_assoc_4.update_cache_set_access_order(1, 44)
-    assert np.array_equal(cache_assoc_4.data[1], expected)
+    assert np.array_equal(cache_assoc_4.data[1], cache_set_array)  # blocks stay in their ways
+    assert np.array_equal(cache_assoc_4.data.rows_by_recency(1), expected)
 
 
 @pytest.mark.parametrize(
@@ -141,7 +142,7 @@ def test_cache_fetch_from_bus_only(cache_set_array, number_of_mem_access, dest_b
     simulator.procs[1].op_stream = FakeOpStream(op_list1)
     simulator.procs[1].cache.data[1] = np.matrix(cache_set_array)
     simulator.run()
-    assert np.array_equal(simulator.procs[0].cache.data[1][:, 1], dest_block_states)
+    assert np.array_equal(simulator.procs[0].cache.data.rows_by_recency(1)[:, 1], dest_block_states)
     assert simulator.counter == (len(op_list) - number_of_mem_access) * (
                 2 * simulator.procs[0].cache.block_size // 4 + 1) + number_of_mem_access * 101
 
@@ -327,3 +328,12 @@ def test_counting_total_private_accesses():
     assert cache0.total_private_accesses == 4
     assert cache1.total_private_accesses == 1
     assert cache1.total_access_count == 2
+
+
+def test_reserve_space_prefers_the_more_recent_of_tag_and_invalid_block(cache_assoc_4: DragonCache):
+    cache_assoc_4.data[1] = np.matrix([[11, INVALID, 0], [22, EC, 0], [33, INVALID, 0], [44, EC, 0]])
+    cache_assoc_4.data.touch(cache_assoc_4.data[1].slot(2))  # way 2 was accessed after way 0
+    address = cache_assoc_4.get_address_from_pieces(11, 1, 0)
+    assert not cache_assoc_4.reserve_space_for_incoming_block(address)
+    assert np.array_equal(cache_assoc_4.data[1], [[11, INVALID, 0], [22, EC, 0], [11, INVALID, WRITE_LOCKED],
+                                                  [44, EC, 0]])
@@ -0,0 +1,92 @@
+import os
+import random
+
+from main import Simulator
+from opstream import COMPRESSED_TRACE_OPENERS, CoalescingOpStream, FakeOpStream, compile_trace
+
+
+class SimpleRequester:
+    """
+    requester recording when its memory requests finish
+    """
+    def __init__(self, name, mc):
+        self.mc = mc
+        self.name = name
+        self.fetched_block = None
+        self.evicted_block = None
+
+    def on_fetch_from_memory_finished(self):
+        self.fetched_block = 1
+
+    def on_evict_to_memory_finished(self):
+        self.evicted_block = 1
+
+    def reset(self):
+        self.fetched_block = None
+        self.evicted_block = None
+
+
+def read_all(opstream):
+    """
+    :return: list of all ops left in <opstream>
+    """
+    ops = []
+    op = opstream.read_op()
+    while op is not None:
+        ops.append(op)
+        op = opstream.read_op()
+    return ops
+
+
+def random_op_lists(seed, num_cores, length):
+    """
+    :return: one list of ops per core, 30% compute ops and loads and stores to a pool of shared blocks and a pool
+    of private blocks of every core
+    """
+    rng = random.Random(seed)
+    shared = [rng.randrange(1 << 16) << 5 for _ in range(16)]
+    op_lists = []
+    for _ in range(num_cores):
+        private = [rng.randrange(1 << 16) << 5 for _ in range(16)]
+        ops = []
+        for _ in range(length):
+            if rng.random() < 0.3:
+                ops.append((2, rng.choice([0, 1, 5, 120])))
+            else:
+                pool = shared if rng.random() < 0.5 else private
+                ops.append((rng.randint(0, 1), rng.choice(pool) + rng.randrange(32)))
+        op_lists.append(ops)
+    return op_lists
+
+
+def write_traces(dir_path, num_cores, length, extension=''):
+    """
+    write random text traces trace_<core>.data<extension> to <dir_path>, compiled to binary traces for '.npy'
+    """
+    rng = random.Random(len(str(dir_path)))
+    shared = [rng.randrange(1 << 14) << 5 for _ in range(32)]
+    for core in range(num_cores):
+        lines = []
+        for _ in range(length):
+            if rng.random() < 0.3:
+                lines.append('2 {}\n'.format(hex(rng.choice([1, 4, 30]))))
+            else:
+                lines.append('{} {}\n'.format(rng.randint(0, 1), hex(rng.choice(shared) + rng.randrange(32))))
+        path = os.path.join(str(dir_path), 'trace_{}.data{}'.format(core, extension))
+        with COMPRESSED_TRACE_OPENERS.get(extension, open)(path, 'wt') as file:
+            file.write(''.join(lines))
+        if extension == '.npy':
+            os.rename(path, path[:-len('.npy')])
+            compile_trace(path[:-len('.npy')])
+
+
+def create_simulator(op_lists, protocol='MESI', engine='cycle', coalesce=False, **kwargs):
+    """
+    :return: Simulator with one core per op list, the other keyword arguments are passed on and the caches have 512
+    bytes by default
+    """
+    kwargs.setdefault('size', 512)
+    simulator = Simulator(protocol=protocol, data=None, num_cores=len(op_lists), engine=engine, **kwargs)
+    for proc, op_list in zip(simulator.procs, op_lists):
+        proc.op_stream = CoalescingOpStream(FakeOpStream(op_list)) if coalesce else FakeOpStream(op_list)
+    return simulator
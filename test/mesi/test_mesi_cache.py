@@ -57,7 +57,8 @@ def test_get_cache_block(cache_0: MesiCache):
 def test_simple_cache_set_order_update(cache_assoc_4: MesiCache, cache_set_array, expected):
     cache_assoc_4.data[1] = np.matrix(cache_set_array)
     cache_assoc_4.update_cache_set_access_order(1, 44)
-    assert np.array_equal(cache_assoc_4.data[1], expected)
+    assert np.array_equal(cache_assoc_4.data[1], cache_set_array)  # blocks stay in their ways
+    assert np.array_equal(cache_assoc_4.data.rows_by_recency(1), expected)
 
 
 @pytest.mark.parametrize(
@@ -142,7 +143,7 @@ def test_cache_direct_hit_only():
     assert simulator.procs[0].cache.total_access_count == len(op_list)
     assert simulator.procs[0].cache.cache_miss_count == 0
     assert simulator.counter == len(op_list)
-    assert np.array_equal(simulator.procs[0].cache.data[1], [
+    assert np.array_equal(simulator.procs[0].cache.data.rows_by_recency(1), [
         [2, 1, 0],
         [1, 1, 0]
     ])
@@ -189,7 +190,7 @@ def test_cache_fetch_from_bus_only(cache_set_array, number_of_mem_access, dest_b
     simulator.run()
     assert simulator.procs[0].cache.total_access_count == len(op_list)
     assert simulator.procs[0].cache.cache_miss_count == number_of_mem_access
-    assert np.array_equal(simulator.procs[0].cache.data[1][:, 1], dest_block_states)
+    assert np.array_equal(simulator.procs[0].cache.data.rows_by_recency(1)[:, 1], dest_block_states)
     assert simulator.counter == (len(op_list) - number_of_mem_access) * (
                 2 * simulator.procs[0].cache.block_size // 4 + 1) + number_of_mem_access * 101
 
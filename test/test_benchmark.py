@@ -0,0 +1,35 @@
+from benchmark import WORKLOADS, benchmark_cases, case_name, compare_results, create_workload, run_case
+
+
+def test_workloads_are_deterministic():
+    for name in WORKLOADS:
+        op_lists = create_workload(name, 3, 50)
+        assert op_lists == create_workload(name, 3, 50)
+        assert [len(op_list) for op_list in op_lists] == [50, 50, 50]
+        assert all(opcode in [0, 1, 2] for op_list in op_lists for opcode, _ in op_list)
+
+
+def test_run_case_measures_speed():
+    case = benchmark_cases(quick=True, ops=40)[0]
+    result = run_case(case)
+    assert result['ops'] == 40 * case['num_cores']
+    assert result['cycles'] > 0 and result['seconds'] > 0
+    assert result['ops_per_second'] == result['ops'] / result['seconds']
+    assert result['peak_rss_mb'] > 0
+    assert run_case(case)['cycles'] == result['cycles']
+
+
+def test_compare_results_flags_regressions():
+    base = {'cycles': 1000, 'ops': 100, 'seconds': 1.0, 'cycles_per_second': 1000.0, 'ops_per_second': 100.0,
+            'peak_rss_mb': 50.0}
+    name = case_name(benchmark_cases(quick=True)[0])
+    assert compare_results({name: dict(base, ops_per_second=95.0)}, {name: base}) == ([], [])
+
+    regressions, notes = compare_results({name: dict(base, ops_per_second=80.0, cycles_per_second=800.0)},
+                                         {name: base})
+    assert len(regressions) == 1 and '20.0% slower' in regressions[0] and not notes
+
+    regressions, notes = compare_results({name: dict(base, cycles=1200, peak_rss_mb=60.0), 'new': base},
+                                         {name: base})
+    assert len(regressions) == 1 and 'peak RSS' in regressions[0]
+    assert len(notes) == 2
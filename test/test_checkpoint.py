@@ -0,0 +1,62 @@
+import os
+import pickle
+
+import numpy as np
+import pytest
+
+from helpers import write_traces
+from main import Simulator, compute_statistics, open_trace
+
+
+def snapshot(sim):
+    return compute_statistics(sim), [np.asarray(proc.cache.data).tolist() for proc in sim.procs]
+
+
+@pytest.mark.parametrize("extension", ['', '.gz', '.npy'])
+@pytest.mark.parametrize("protocol, engine", [('MESI', 'cycle'), ('DRAGON', 'event'), ('MESI_DIR', 'event')])
+def test_restored_run_is_bit_exact(tmp_path, monkeypatch, extension, protocol, engine):
+    monkeypatch.setattr('opstream.ChunkedOpStream.block_size', 64)
+    monkeypatch.setattr('opstream.MmapOpStream.chunk_size', 7)
+    write_traces(tmp_path, 2, 300, extension)
+    expected = Simulator(protocol=protocol, data=str(tmp_path), num_cores=2, engine=engine, size=256)
+    expected.run()
+
+    sim = Simulator(protocol=protocol, data=str(tmp_path), num_cores=2, engine=engine, size=256)
+    while sim.counter < expected.counter // 2:
+        sim.tick()
+    checkpoint = os.path.join(str(tmp_path), 'checkpoints', 'half.pkl')
+    sim.save_checkpoint(checkpoint)
+    sim.run()
+    restored = Simulator.load_checkpoint(checkpoint)
+    restored.run()
+
+    assert snapshot(sim) == snapshot(expected)
+    assert snapshot(restored) == snapshot(expected)
+
+
+@pytest.mark.parametrize("extension", ['', '.gz', '.npy'])
+def test_op_stream_resumes_at_every_position(tmp_path, monkeypatch, extension):
+    monkeypatch.setattr('opstream.ChunkedOpStream.block_size', 64)
+    monkeypatch.setattr('opstream.MmapOpStream.chunk_size', 7)
+    write_traces(tmp_path, 1, 60, extension)
+    path = os.path.join(str(tmp_path), 'trace_0.data' + ('' if extension == '.npy' else extension))
+    stream = open_trace(path)
+    ops = list(iter(stream.read_op, None))
+    for position in range(len(ops)):
+        stream = open_trace(path)
+        for _ in range(position):
+            stream.read_op()
+        restored = pickle.loads(pickle.dumps(stream))
+        assert list(iter(restored.read_op, None)) == ops[position:]
+
+
+def test_run_saves_periodic_checkpoints(tmp_path):
+    write_traces(tmp_path, 1, 50)
+    checkpoint = os.path.join(str(tmp_path), 'run.pkl')
+    sim = Simulator(data=str(tmp_path), num_cores=1)
+    sim.run(checkpoint_every=1000, checkpoint_path=checkpoint)
+    restored = Simulator.load_checkpoint(checkpoint)
+    assert restored.counter <= sim.counter
+    assert restored.counter // 1000 == sim.counter // 1000
+    restored.run()
+    assert snapshot(restored) == snapshot(sim)
@@ -0,0 +1,47 @@
+import random
+
+import pytest
+
+from helpers import create_simulator
+from main import compute_statistics
+from opstream import CoalescingOpStream, FakeOpStream
+from sampling import run_sampled
+
+
+def compute_heavy_op_lists(seed, num_cores, length):
+    rng = random.Random(seed)
+    blocks = [rng.randrange(1 << 12) << 5 for _ in range(24)]
+    return [[(2, rng.choice([0, 1, 3, 40])) if rng.random() < 0.7 else (rng.randint(0, 1), rng.choice(blocks))
+             for _ in range(length)] for _ in range(num_cores)]
+
+
+def test_coalescing_stream():
+    ops = [(2, 5), (0, 64), (2, 1), (2, 0), (2, 7), (1, 32), (2, 3), (2, 4)]
+    stream = CoalescingOpStream(FakeOpStream(ops))
+    assert [stream.read_op() for _ in range(6)] == [(2, 5), (0, 64), (2, (1, 0, 7)), (1, 32), (2, (3, 4)), None]
+
+    stream = CoalescingOpStream(FakeOpStream([(2, 1)] * 5), max_run=2)
+    assert [stream.read_op() for _ in range(4)] == [(2, (1, 1)), (2, (1, 1)), (2, 1), None]
+
+
+def results(simulator):
+    return (simulator.counter, compute_statistics(simulator),
+            [(proc.done_job_counter, proc.total_compute_cycles) for proc in simulator.procs])
+
+
+@pytest.mark.parametrize("protocol", ['MESI', 'DRAGON', 'MESI_DIR'])
+@pytest.mark.parametrize("engine", ['cycle', 'event'])
+@pytest.mark.parametrize("limit", [0, 97])
+def test_coalesced_run_is_identical(protocol, engine, limit):
+    op_lists = compute_heavy_op_lists(5, 3, 300)
+    expected = create_simulator(op_lists, protocol, engine, limit=limit)
+    expected.run()
+    simulator = create_simulator(op_lists, protocol, engine, coalesce=True, limit=limit)
+    simulator.run()
+    assert results(simulator) == results(expected)
+
+
+def test_coalesced_sampling_is_identical():
+    op_lists = compute_heavy_op_lists(6, 2, 2000)
+    expected = run_sampled(create_simulator(op_lists, engine='event'), window=53, gap=101)
+    assert run_sampled(create_simulator(op_lists, engine='event', coalesce=True), window=53, gap=101) == expected
@@ -0,0 +1,59 @@
+import random
+
+import pytest
+
+from components.directory import Directory
+from constants.locking import *
+from constants.mesi import *
+from helpers import create_simulator
+from main import Simulator
+
+
+def run_simulator(protocol, op_lists, engine='cycle', preload=None, **kwargs):
+    kwargs.setdefault('size', 4096)
+    simulator = create_simulator(op_lists, protocol, engine, **kwargs)
+    if preload:
+        preload(simulator)
+    simulator.run()
+    return simulator
+
+
+def preload_exclusive(simulator):
+    simulator.procs[1].cache.data[1][0] = [5, EXCLUSIVE, UNLOCKED]
+
+
+@pytest.mark.parametrize("hop_latency", [0, 10])
+def test_read_served_by_other_cache_pays_three_hops(hop_latency):
+    simulator = Simulator(protocol='MESI_DIR', data=None, num_cores=1)
+    address = simulator.procs[0].cache.get_address_from_pieces(5, 1)
+    op_lists = [[(0, address)], []]
+    snooping = run_simulator('MESI', op_lists, preload=preload_exclusive)
+    directory = run_simulator('MESI_DIR', op_lists, preload=preload_exclusive, hop_latency=hop_latency)
+
+    assert isinstance(directory.bus, Directory)
+    assert directory.counter == snooping.counter + 3 * hop_latency
+    assert directory.bus.messages == 3
+    assert directory.bus.total_bus_traffic == snooping.bus.total_bus_traffic
+    assert [proc.cache.get_cache_block(address)[1] for proc in directory.procs] == [SHARED, SHARED]
+    assert directory.bus.granted == {}
+
+
+@pytest.mark.parametrize("num_cores", [2, 8])
+def test_directory_keeps_single_writer(num_cores):
+    rng = random.Random(num_cores)
+    blocks = [rng.randrange(1 << 12) << 5 for _ in range(12)]
+    op_lists = [[(rng.randint(0, 1), rng.choice(blocks)) for _ in range(200)] for _ in range(num_cores)]
+    simulator = run_simulator('MESI_DIR', op_lists, size=512)
+
+    holders = {}
+    for proc in simulator.procs:
+        cache = proc.cache
+        for slot in range(len(cache.data.words)):
+            if cache.data.state(slot) != INVALID:
+                holders.setdefault(cache.block_address(slot, cache.data.tag(slot)), []).append(cache.data.state(slot))
+    for states in holders.values():
+        assert len(states) == 1 or all(state == SHARED for state in states)
+
+    event = run_simulator('MESI_DIR', op_lists, engine='event', size=512)
+    assert event.counter == simulator.counter
+    assert event.bus.messages == simulator.bus.messages
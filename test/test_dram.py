@@ -0,0 +1,97 @@
+import pytest
+
+from components.dram import DramController
+from helpers import SimpleRequester, create_simulator, random_op_lists
+from main import compute_statistics
+
+
+def tick_until_done(dram, requester, fetch=True):
+    cycles = 0
+    while (requester.fetched_block if fetch else requester.evicted_block) is None:
+        dram.tick()
+        cycles += 1
+    return cycles
+
+
+def test_row_buffer_latencies():
+    dram = DramController(banks=2, row_size=1024, block_size=32, bytes_per_cycle=8, t_cas=10, t_rcd=20, t_rp=30)
+    r0 = SimpleRequester('P0', dram)
+    dram.fetch_block(r0, 0)
+    assert tick_until_done(dram, r0) == 1 + 20 + 10 + 4  # bank closed
+    r0.reset()
+    dram.fetch_block(r0, 64)
+    assert tick_until_done(dram, r0) == 1 + 10 + 4  # same row
+    r0.reset()
+    dram.fetch_block(r0, 2048)  # next row of bank 0
+    assert tick_until_done(dram, r0) == 1 + 30 + 20 + 10 + 4
+    r0.reset()
+    dram.evict_block(r0, 1024)  # bank 1
+    assert tick_until_done(dram, r0, fetch=False) == 1 + 20 + 10 + 4
+    assert dram.requests == 4
+    assert dram.row_buffer_hit_rate() == 0.25
+    assert dram.average_queueing_delay() == 0
+    assert dram.cycles_to_next_event() is None
+
+
+def test_first_ready_first_come_first_served():
+    dram = DramController(banks=1, row_size=1024, t_cas=10, t_rcd=20, t_rp=30)
+    r0, r1, r2 = (SimpleRequester('P{}'.format(i), dram) for i in range(3))
+    dram.fetch_block(r0, 0)
+    dram.tick()
+    dram.fetch_block(r1, 4096)  # older, other row
+    dram.fetch_block(r2, 32)  # younger, open row
+    tick_until_done(dram, r0)
+    tick_until_done(dram, r2)
+    assert r1.fetched_block is None
+    tick_until_done(dram, r1)
+    assert dram.row_hits == 1
+
+
+def test_channel_bandwidth():
+    dram = DramController(channels=1, banks=4, row_size=1024, block_size=32, bytes_per_cycle=2)
+    requesters = [SimpleRequester('P{}'.format(i), dram) for i in range(4)]
+    for i, r in enumerate(requesters):
+        dram.fetch_block(r, i * 1024)  # one per bank
+    finished = []
+    for cycle in range(1, 200):
+        dram.tick()
+        finished += [(cycle, r.name) for r in requesters if r.fetched_block and (cycle, r.name) not in finished]
+        for r in requesters:
+            r.reset()
+    cycles = [cycle for cycle, _ in finished]
+    assert len(cycles) == 4
+    assert all(later - earlier >= 16 for earlier, later in zip(cycles, cycles[1:]))
+
+
+def test_requester_notified_when_all_requests_finished():
+    dram = DramController()
+    r0 = SimpleRequester('P0', dram)
+    dram.fetch_block(r0, 0)
+    dram.fetch_block(r0, 1 << 20)
+    dram.tick()
+    while len(dram.loading.get(r0, [])) == 2:
+        dram.tick()
+        assert r0.fetched_block is None
+    tick_until_done(dram, r0)
+    assert not dram.loading
+
+    dram.evict_block(r0, 0)
+    dram.complete(r0)
+    assert r0.evicted_block is not None and not dram.storing
+    assert dram.cycles_to_next_event() is None
+
+
+@pytest.mark.parametrize("protocol", ['MESI', 'MOESI', 'DRAGON', 'MESI_DIR'])
+def test_engines_agree_with_dram(protocol):
+    op_lists = random_op_lists(4, 3, 200)
+    results = []
+    for engine in ['cycle', 'event']:
+        simulator = create_simulator(op_lists, protocol, engine,
+                                     memory_controller=DramController(channels=2, banks=4, row_size=512))
+        simulator.run()
+        results.append((simulator.counter, compute_statistics(simulator)))
+    assert results[0] == results[1]
+    stats = results[0][1][0]
+    assert stats['Memory Requests'] > 0
+    assert 0 <= stats['Row Buffer Hit Percentage'] <= 100
+    assert stats['Average Memory Queueing Delay'] >= 0
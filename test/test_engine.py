@@ -0,0 +1,41 @@
+import pytest
+
+from helpers import create_simulator, random_op_lists
+from main import Simulator
+
+
+@pytest.mark.parametrize("protocol", ['mesi', 'moesi', 'dragon'])
+@pytest.mark.parametrize("seed", [0, 1])
+def test_event_engine_matches_cycle_engine(protocol, seed):
+    op_lists = random_op_lists(seed, 4, 200)
+    expected, result = create_simulator(op_lists, protocol, 'cycle'), create_simulator(op_lists, protocol, 'event')
+    expected.run()
+    result.run()
+    assert result.counter == expected.counter
+    assert result.bus.total_bus_traffic == expected.bus.total_bus_traffic
+    assert result.bus.total_bus_invalidation_or_updates == expected.bus.total_bus_invalidation_or_updates
+    for proc, expected_proc in zip(result.procs, expected.procs):
+        assert proc.counter == expected_proc.counter
+        assert proc.total_compute_cycles == expected_proc.total_compute_cycles
+        assert proc.cache.cache_miss_count == expected_proc.cache.cache_miss_count
+        assert proc.cache.total_private_accesses == expected_proc.cache.total_private_accesses
+
+
+def test_event_engine_skips_compute_and_memory_cycles():
+    simulator = create_simulator([[(2, 500), (0, 0b100000100001)]], engine='event', size=4096)
+    ticks = 0
+    while simulator.tick():
+        ticks += 1
+    assert simulator.counter == 500 + 101
+    assert ticks < 10
+
+
+@pytest.mark.parametrize("protocol", ['MESI', 'MESI_DIR'])
+def test_event_engine_skips_cycles_with_several_cores(protocol):
+    # caches waiting for the bus sleep until its holder finishes, instead of applying again every cycle
+    simulator = Simulator(protocol=protocol, data=None, num_cores=4, engine='event',
+                          workload={'name': 'migratory', 'ops': 2000, 'seed': 0})
+    ticks = 0
+    while simulator.tick():
+        ticks += 1
+    assert simulator.counter > 4 * ticks
@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+from constants.mesi import INVALID, SHARED
+from helpers import create_simulator, random_op_lists
+
+
+def recency_rows(cache):
+    return [cache.data.rows_by_recency(set_index).tolist() for set_index in range(len(cache.data.slots))]
+
+
+@pytest.mark.parametrize("protocol", ['MESI', 'MOESI', 'DRAGON', 'MESI_DIR'])
+def test_single_core_warm_up_matches_timed_run(protocol):
+    op_lists = random_op_lists(3, 1, 300)
+    timed = create_simulator([op_lists[0][:200]], protocol, 'event')
+    timed.run()
+    warmed = create_simulator(op_lists, protocol, 'event')
+    warmed.fast_forward(200)
+
+    assert warmed.counter == 0
+    assert recency_rows(warmed.procs[0].cache) == recency_rows(timed.procs[0].cache)
+    assert warmed.procs[0].cache.total_access_count == 0
+    assert warmed.bus.total_bus_traffic == 0
+
+    warmed.run()
+    assert warmed.procs[0].cache.total_access_count == sum(1 for op in op_lists[0][200:] if op[0] < 2)
+
+
+@pytest.mark.parametrize("protocol", ['MESI', 'MOESI', 'DRAGON', 'MESI_DIR'])
+def test_multi_core_warm_up_keeps_caches_coherent(protocol):
+    op_lists = random_op_lists(4, 4, 200)
+    simulator = create_simulator(op_lists, protocol, 'event', snoop_filter=True)
+    simulator.fast_forward(150)
+
+    holders = {}
+    for proc in simulator.procs:
+        cache = proc.cache
+        assert cache.current_job is None
+        assert not np.asarray(cache.data)[:, :, 2].any()  # no block is left locked
+        for slot in range(len(cache.data.words)):
+            if cache.data.state(slot) != INVALID:
+                holders.setdefault(cache.block_address(slot, cache.data.tag(slot)), []).append(cache.data.state(slot))
+    if protocol in ['MESI', 'MESI_DIR']:
+        for states in holders.values():
+            assert len(states) == 1 or all(state == SHARED for state in states)
+    assert not simulator.memory_controller.loading and not simulator.memory_controller.storing
+
+    simulator.run()
+
+    assert [proc.cache.total_access_count for proc in simulator.procs] == [
+        sum(1 for op in op_list[150:] if op[0] < 2) for op_list in op_lists]
+
+
+def test_fast_forward_past_end_of_trace():
+    simulator = create_simulator([[(0, 0x40), (2, 5)], [(1, 0x40)] * 5], engine='event')
+    simulator.fast_forward(10)
+
+    assert simulator.procs[1].cache.get_cache_block(0x40)[1] != INVALID
+    simulator.run()
+    assert simulator.counter == 0
+
+
+@pytest.mark.parametrize("protocol", ['MESI', 'MOESI', 'DRAGON', 'MESI_DIR'])
+def test_warm_up_bypasses_bus_arbitration_and_memory_queues(protocol):
+    def fail(*args):
+        raise AssertionError("timed path taken while warming up")
+
+    simulator = create_simulator(random_op_lists(5, 4, 200), protocol, 'event')
+    simulator.bus.apply_for_bus_master = fail
+    simulator.memory_controller.fetch_block = simulator.memory_controller.evict_block = fail
+    simulator.fast_forward(200)
+    assert not any(proc.cache.is_busy() for proc in simulator.procs)
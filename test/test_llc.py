@@ -0,0 +1,104 @@
+import pytest
+
+from components.llc import SharedLLC
+from helpers import SimpleRequester
+from main import Simulator, SimulationConfig, compute_statistics, simulate
+
+
+def tick_until_done(llc, *requesters):
+    cycles = 0
+    while any(requester.fetched_block is None and requester.evicted_block is None for requester in requesters):
+        llc.tick()
+        cycles += 1
+    return cycles
+
+
+def test_hits_misses_and_write_backs():
+    llc = SharedLLC(size=128, assoc=2, block_size=32, latency=10)  # two sets of two blocks
+    r0, r1 = SimpleRequester('P0', llc), SimpleRequester('P1', llc)
+    llc.fetch_block(r0, 0)
+    assert tick_until_done(llc, r0) == 10 + 100
+    r0.reset()
+    llc.fetch_block(r0, 4)  # same block
+    assert tick_until_done(llc, r0) == 10
+    assert llc.hits == 1 and llc.misses == 1
+
+    r0.reset()
+    llc.fetch_block(r0, 128)
+    for _ in range(50):
+        llc.tick()
+    llc.fetch_block(r1, 128)  # waits for the fill of the first miss
+    assert tick_until_done(llc, r0, r1) == 60
+    assert llc.memory_fetches == 2
+
+    r0.reset()
+    llc.evict_block(r0, 64)
+    assert tick_until_done(llc, r0) == 10
+    assert llc.sets[0] == {128 // 32: False, 64 // 32: True}
+    for address in [256, 384]:  # evict the clean block 128, then the dirty block 64
+        r0.reset()
+        llc.fetch_block(r0, address)
+        assert tick_until_done(llc, r0) == 110
+    assert llc.memory_writebacks == 1
+    assert llc.memory_controller.queue_depth() == 1
+    assert llc.traffic_avoided() == (6 + 1 - 4 - 1) * 32
+
+
+@pytest.mark.parametrize("protocol", ['MESI', 'MOESI', 'DRAGON', 'MESI_DIR'])
+@pytest.mark.parametrize("inclusive", [False, True])
+def test_event_engine_and_fast_forward(protocol, inclusive):
+    results = []
+    for engine in ['cycle', 'event']:
+        llc = SharedLLC(size=4096, assoc=4, latency=15, inclusive=inclusive)
+        sim = Simulator(protocol=protocol, data=None, num_cores=3, size=512, engine=engine, memory_controller=llc,
+                        workload={'name': 'mix', 'ops': 1000, 'seed': 3})
+        sim.fast_forward(200)
+        sim.run(quiet=True)
+        results.append((sim.counter, compute_statistics(sim)))
+    assert results[0] == results[1]
+    stats = results[0][1][0]
+    assert 0 < stats['LLC Hit Percentage'] < 100
+    assert stats['Memory Traffic Avoided'] > 0
+    assert ('LLC Back Invalidations' in stats) == inclusive
+
+
+def test_inclusive_llc_holds_every_l1_block():
+    llc = SharedLLC(size=1024, assoc=2, latency=15, inclusive=True)
+    sim = Simulator(protocol='MOESI', data=None, num_cores=4, size=512, memory_controller=llc,
+                    workload={'name': 'private_streaming', 'ops': 2000, 'seed': 1})
+    sim.run(quiet=True)
+    assert llc.back_invalidations > 0
+    for proc in sim.procs:
+        cache = proc.cache
+        for slot in range(len(cache.data.words)):
+            if cache.data.state(slot) != 0:
+                block = cache.get_address_from_pieces(cache.data.tag(slot), slot // cache.assoc) >> cache.n
+                assert block in llc.sets[block % llc.num_sets]
+
+
+def test_simulation_config():
+    config = SimulationConfig(protocol='MESI', workload='migratory', workload_ops=500, num_cores=2, cache_size=512,
+                              llc_size=4096, llc_latency=5)
+    results = simulate(config)
+    assert results.stats['LLC Hit Percentage'] > 0
+    no_llc = simulate(SimulationConfig(protocol='MESI', workload='migratory', workload_ops=500, num_cores=2,
+                                       cache_size=512))
+    assert 'LLC Hit Percentage' not in no_llc.stats
+
+
+@pytest.mark.parametrize("protocol", ['MESI', 'MOESI', 'MESI_DIR'])
+def test_inclusion_holds_under_contention(protocol):
+    # two sets of two ways shared by four cores, victims often have copies that an L1 is busy with
+    llc = SharedLLC(size=128, assoc=2, latency=5, inclusive=True)
+    sim = Simulator(protocol=protocol, data=None, num_cores=4, size=256, memory_controller=llc,
+                    workload={'name': 'migratory', 'ops': 1500, 'seed': 1})
+    while sim.tick():
+        for proc in sim.procs:
+            cache = proc.cache
+            for slot in range(len(cache.data.words)):
+                # blocks on their way to an L1 are locked until the fetch finishes
+                if cache.data.state(slot) != 0 and cache.data.lock(slot) == 0:
+                    block = cache.get_address_from_pieces(cache.data.tag(slot), slot // cache.assoc) >> cache.n
+                    assert block in llc.sets[block % llc.num_sets]
+    assert llc.back_invalidations > 0
+    assert all(len(lines) <= llc.assoc for lines in llc.sets)
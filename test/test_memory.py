@@ -106,3 +106,27 @@ def test_interleaving_evict_and_fetch_memory():
     assert r0.evicted_block is not None
     assert r1.evicted_block is not None
     assert r2.evicted_block is not None
+
+
+def test_extended_requests_and_next_completion():
+    mc = MemoryController()
+    r0 = SimpleRequester('P0', mc)
+    r1 = SimpleRequester('P1', mc)
+    assert mc.cycles_to_next_event() is None
+    mc.fetch_block(r0, 0b1)
+    for _ in range(30):
+        mc.tick()
+    mc.fetch_block(r0, 0b10)
+    mc.evict_block(r1, 0b1)
+    assert mc.cycles_to_next_event() == 100
+    assert mc.next_completion_cycle() == 130
+    mc.skip_cycles(99)
+    mc.tick()
+    assert r1.evicted_block is not None
+    assert r0.fetched_block is None
+    assert mc.cycles_to_next_event() == 70
+    for _ in range(70):
+        mc.tick()
+    assert r0.fetched_block is not None
+    assert mc.cycles_to_next_event() is None
+    assert not mc.fetch_heap and not mc.evict_heap
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from helpers import create_simulator, random_op_lists
+from main import compute_statistics
+from metrics import IntervalSampler
+
+
+def read_samples(path):
+    with open(path) as file:
+        columns = file.readline().strip().split(',')
+    return columns, np.loadtxt(path, delimiter=',', skiprows=1, dtype=np.int64, ndmin=2)
+
+
+@pytest.mark.parametrize("engine", ['cycle', 'event'])
+def test_samples_add_up_to_totals(tmp_path, engine):
+    path = str(tmp_path / 'out' / 'intervals.csv')
+    simulator = create_simulator(random_op_lists(2, 3, 300), 'MOESI', engine)
+    metrics = IntervalSampler(simulator, interval=500, path=path, buffer_rows=4)
+    simulator.run(metrics=metrics, quiet=True)
+
+    columns, rows = read_samples(path)
+    samples = dict(zip(columns, rows.T))
+    assert len(rows) == metrics.samples > 4
+    assert samples['cycle'][-1] == simulator.counter
+    assert all(cycle >= 500 * (i + 1) for i, cycle in enumerate(samples['cycle'][:-1]))
+    assert samples['bus_traffic'].sum() == simulator.bus.total_bus_traffic
+    assert samples['bus_invalidations_or_updates'].sum() == simulator.bus.total_bus_invalidation_or_updates
+    assert (samples['memory_queue_depth'] >= 0).all()
+    stats_per_core = compute_statistics(simulator)[1]
+    for proc in simulator.procs:
+        name = proc.cache.name
+        assert samples[name + '_accesses'].sum() == proc.cache.total_access_count
+        assert samples[name + '_misses'].sum() == proc.cache.cache_miss_count
+        assert samples[name + '_idle_cycles'].sum() == stats_per_core[name]['Idle Cycles']
+
+
+def test_samples_are_flushed_while_running(tmp_path):
+    path = str(tmp_path / 'intervals.csv')
+    simulator = create_simulator(random_op_lists(3, 2, 300), 'MOESI', 'event')
+    metrics = IntervalSampler(simulator, interval=100, path=path, buffer_rows=3)
+    while simulator.tick() and metrics.samples < 7:
+        if simulator.counter >= metrics.next_sample:
+            metrics.sample()
+    assert len(read_samples(path)[1]) == 6  # two full buffers, the seventh sample is still in memory
+    metrics.close()
+    assert len(read_samples(path)[1]) == 8
+
+
+@pytest.mark.parametrize("engine", ['cycle', 'event'])
+def test_idle_cycles_are_within_intervals(tmp_path, engine):
+    # compute ops of 120 cycles span several intervals
+    path = str(tmp_path / 'intervals.csv')
+    simulator = create_simulator(random_op_lists(4, 2, 300), 'MOESI', engine)
+    metrics = IntervalSampler(simulator, interval=50, path=path)
+    simulator.run(metrics=metrics, quiet=True)
+
+    columns, rows = read_samples(path)
+    samples = dict(zip(columns, rows.T))
+    lengths = np.diff(samples['cycle'], prepend=0)
+    for proc in simulator.procs:
+        idle = samples[proc.cache.name + '_idle_cycles']
+        assert ((0 <= idle) & (idle <= lengths)).all()
@@ -0,0 +1,108 @@
+import os
+
+import numpy as np
+import pytest
+
+from helpers import read_all
+from main import create_opstream
+from opstream import OpStream, MmapOpStream, ChunkedOpStream, compile_trace, binary_trace_path, decode_ops, \
+    COMPRESSED_TRACE_OPENERS
+
+TRACE = "0 0x817ae8\n2 0x10\n1 0x817af0\n2 3\n0 0xffffffff\n"
+
+
+def write_trace(dir_path, name='trace_0.data', content=TRACE):
+    path = os.path.join(str(dir_path), name)
+    with open(path, 'w') as file:
+        file.write(content)
+    return path
+
+
+def test_compiled_trace_yields_same_ops(tmp_path):
+    path = write_trace(tmp_path)
+    binary_path = compile_trace(path)
+    assert binary_path == os.path.join(str(tmp_path), 'trace_0.npy')
+    assert read_all(MmapOpStream(binary_path)) == read_all(OpStream(path))
+
+
+def test_mmap_opstream_crosses_chunks(tmp_path):
+    path = write_trace(tmp_path, content=''.join('{} {}\n'.format(i % 3, hex(i)) for i in range(10)))
+    opstream = MmapOpStream(compile_trace(path))
+    opstream.chunk_size = 3
+    assert read_all(opstream) == [(i % 3, i) for i in range(10)]
+
+
+def test_create_opstream_prefers_up_to_date_binary(tmp_path):
+    path = write_trace(tmp_path)
+    assert isinstance(create_opstream(str(tmp_path), 1)[0], ChunkedOpStream)
+
+    compile_trace(path)
+    assert isinstance(create_opstream(str(tmp_path), 1)[0], MmapOpStream)
+
+    stat = os.stat(binary_trace_path(path))
+    os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+    assert isinstance(create_opstream(str(tmp_path), 1)[0], ChunkedOpStream)
+
+
+@pytest.mark.parametrize(
+    "text, expected_opcodes, expected_values",
+    [
+        (b"0 0x817ae8\n2 0x10\n", [0, 2], [0x817ae8, 0x10]),
+        (b"2 10\n1 0XaBcD\n\n  0   0xffffffffffffffff\n", [2, 1, 0], [10, 0xabcd, 0xffffffffffffffff]),
+        (b"1 0o17\n2 5\n", [1, 2], [0o17, 5]),
+        (b"\n", [], []),
+        (b"2 000\n0 0x0010\n", [2, 0], [0, 0x10]),
+        (b"0 18446744073709551615\n2 0x00000000000000000001\n", [0, 2], [(1 << 64) - 1, 1]),
+    ]
+)
+def test_decode_ops(text, expected_opcodes, expected_values):
+    opcodes, values = decode_ops(text)
+    assert opcodes.tolist() == expected_opcodes
+    assert values.tolist() == expected_values
+    assert values.dtype == np.uint64
+
+
+@pytest.mark.parametrize("line", [b"0 0x10000000000000000", b"0 18446744073709551616", b"2 12a",
+                                  b"0 010"])
+def test_decode_ops_rejects_bad_values(line):
+    with pytest.raises(ValueError, match=repr(line.decode())):
+        decode_ops(b"2 5\n" + line + b"\n1 0x20\n")
+
+
+@pytest.mark.parametrize("block_size", [4, 7, 1 << 20])
+def test_chunked_opstream_matches_opstream(tmp_path, block_size):
+    path = write_trace(tmp_path, content=TRACE + '0 0x1\n2 0x2')
+    opstream = ChunkedOpStream(path)
+    opstream.block_size = block_size
+    assert read_all(opstream) == read_all(OpStream(path))
+
+
+def write_compressed_trace(dir_path, extension, name='trace_0.data', content=TRACE):
+    path = os.path.join(str(dir_path), name + extension)
+    with COMPRESSED_TRACE_OPENERS[extension](path, 'wt') as file:
+        file.write(content)
+    return path
+
+
+@pytest.mark.parametrize("extension", ['.gz', '.bz2', '.xz'])
+def test_compressed_trace_is_streamed(tmp_path, extension):
+    path = write_compressed_trace(tmp_path, extension)
+    expected = read_all(OpStream(write_trace(tmp_path, name='plain_0.data')))
+    assert read_all(ChunkedOpStream(path)) == expected
+    assert read_all(OpStream(path)) == expected
+    assert read_all(MmapOpStream(compile_trace(path))) == expected
+
+
+def test_create_opstream_finds_compressed_trace(tmp_path):
+    expected = read_all(OpStream(write_trace(tmp_path, name='trace_0.data')))
+    write_compressed_trace(tmp_path, '.xz', name='trace_1.data')
+    opstreams = create_opstream(str(tmp_path), 2)
+    assert [read_all(opstream) for opstream in opstreams] == [expected, expected]
+
+
+def test_corrupt_compressed_trace_raises(tmp_path):
+    path = os.path.join(str(tmp_path), 'trace_0.data.gz')
+    with open(path, 'wb') as file:
+        file.write(b'not gzip at all')
+    with pytest.raises(OSError):
+        read_all(ChunkedOpStream(path))
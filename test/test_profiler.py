@@ -0,0 +1,51 @@
+import pstats
+
+import pytest
+
+from helpers import create_simulator, random_op_lists
+from main import Simulator, compute_statistics
+from profiler import Profiler, TimedOpStream
+
+
+@pytest.mark.parametrize("protocol, engine", [('MESI', 'cycle'), ('DRAGON', 'event')])
+def test_profiled_run_matches_plain_run(protocol, engine):
+    op_lists = random_op_lists(0, 2, 100)
+    expected = create_simulator(op_lists, protocol, engine)
+    expected.run()
+    simulator = create_simulator(op_lists, protocol, engine)
+    with Profiler(simulator) as profiler:
+        simulator.run()
+
+    assert compute_statistics(simulator) == compute_statistics(expected)
+    assert profiler.cycles == simulator.counter
+    assert profiler.ops == sum(len(op_list) for op_list in op_lists)
+    assert profiler.times['Processor.interim'] > 0 and profiler.times['OpStream.read_op'] > 0
+    assert sum(profiler.times.values()) <= profiler.wall_time
+    report = profiler.report()
+    assert 'Bus.interim' in report and 'ops per second' in report
+    # the profiler is detached again
+    assert simulator.profiler is None and not isinstance(simulator.procs[0].op_stream, TimedOpStream)
+
+
+def test_checkpoints_of_profiled_run(tmp_path):
+    op_lists = random_op_lists(2, 2, 300)
+    expected = create_simulator(op_lists, 'MOESI', 'event')
+    expected.run()
+    path = str(tmp_path / 'checkpoint.pkl')
+    simulator = create_simulator(op_lists, 'MOESI', 'event')
+    with Profiler(simulator, stats_path=str(tmp_path / 'run.pstats')):
+        simulator.run(checkpoint_every=1000, checkpoint_path=path)
+
+    restored = Simulator.load_checkpoint(path)
+    assert restored.profiler is None and not isinstance(restored.procs[0].op_stream, TimedOpStream)
+    restored.run()
+    assert compute_statistics(restored) == compute_statistics(expected)
+
+
+def test_profiler_writes_cprofile_stats(tmp_path):
+    simulator = create_simulator(random_op_lists(1, 2, 20), engine='event')
+    path = str(tmp_path / 'run.pstats')
+    with Profiler(simulator, stats_path=path) as profiler:
+        simulator.run()
+    assert path in profiler.report()
+    assert pstats.Stats(path).total_calls > 0
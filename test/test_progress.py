@@ -0,0 +1,58 @@
+import io
+import os
+
+import pytest
+
+from helpers import create_simulator, random_op_lists, write_traces
+from opstream import ChunkedOpStream, FakeOpStream, MmapOpStream, OpStream, compile_trace
+from progress import ProgressReporter
+
+
+def test_reports_by_op_count(capsys):
+    simulator = create_simulator(random_op_lists(0, 2, 500), engine='event', coalesce=True)
+    out = io.StringIO()
+    progress = ProgressReporter(simulator, interval=0, ops=300, poll_ticks=1, file=out)
+    assert progress.fraction() == 0
+    simulator.run(progress=progress, quiet=True)
+
+    lines = out.getvalue().splitlines()
+    assert len(lines) == progress.reports == 3  # after 300, 600 and 900 of the 1000 ops
+    assert all('ops/s' in line and 'cycles/s' in line and 'ETA' in line for line in lines)
+    assert 'P0 ' in lines[0] and '%' in lines[0]
+    assert progress.fraction() == 1.0
+    assert capsys.readouterr().out == ''
+
+
+def test_no_reports_between_intervals():
+    simulator = create_simulator(random_op_lists(1, 2, 300), engine='event', coalesce=True)
+    out = io.StringIO()
+    progress = ProgressReporter(simulator, interval=3600, file=out)
+    simulator.run(progress=progress, quiet=True)
+    assert out.getvalue() == ''
+
+
+@pytest.mark.parametrize("kind", ['text', 'chunked', 'binary'])
+def test_fraction_read(tmp_path, monkeypatch, kind):
+    write_traces(tmp_path, 1, 2000)
+    path = os.path.join(str(tmp_path), 'trace_0.data')
+    if kind == 'text':
+        stream = OpStream(path)
+    elif kind == 'chunked':
+        monkeypatch.setattr(ChunkedOpStream, 'block_size', 4096)
+        stream = ChunkedOpStream(path)
+    else:
+        stream = MmapOpStream(compile_trace(path))
+    for _ in range(1000):
+        stream.read_op()
+    assert stream.fraction_read() == pytest.approx(0.5, abs=0.05)
+    while stream.read_op() is not None:
+        pass
+    assert stream.fraction_read() == pytest.approx(1.0)
+
+
+def test_fraction_read_of_op_lists():
+    stream = FakeOpStream([(0, 0)] * 4)
+    stream.read_op()
+    assert stream.fraction_read() == 0.25
+    assert FakeOpStream(iter([(0, 0)])).fraction_read() is None
+    assert FakeOpStream(iter([(0, 0)]), length=10).fraction_read() == 0
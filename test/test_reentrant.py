@@ -0,0 +1,38 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from main import Simulator, compute_statistics
+
+# keyword arguments of the Simulators
+CONFIGURATIONS = [dict(protocol=protocol, data=None, num_cores=3, size=512, engine='event',
+                       workload={'name': workload, 'ops': 400, 'seed': 2})
+                  for protocol, workload in [('MESI', 'migratory'), ('MOESI', 'false_sharing'),
+                                             ('DRAGON', 'producer_consumer'), ('MESI_DIR', 'lock_contention'),
+                                             ('MESI', 'mix')]]
+
+
+def results(simulator):
+    return simulator.counter, compute_statistics(simulator)
+
+
+def run(configuration):
+    simulator = Simulator(**configuration)
+    simulator.run(quiet=True)
+    return results(simulator)
+
+
+def test_simulators_do_not_share_state():
+    first, second = Simulator(data=None), Simulator(data=None)
+    assert first.memory_controller is not second.memory_controller
+
+
+def test_interleaved_and_threaded_runs_match_sequential_ones():
+    expected = [run(configuration) for configuration in CONFIGURATIONS]
+
+    simulators = [Simulator(**configuration) for configuration in CONFIGURATIONS]
+    running = list(simulators)
+    while running:
+        running = [simulator for simulator in running if simulator.tick()]
+    assert [results(simulator) for simulator in simulators] == expected
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        assert list(executor.map(run, CONFIGURATIONS * 2)) == expected * 2
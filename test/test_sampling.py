@@ -0,0 +1,101 @@
+import math
+import time
+
+import pytest
+
+from helpers import create_simulator, random_op_lists
+from main import Simulator, compute_statistics
+from sampling import ratio_estimate, run_sampled, run_window
+
+
+def test_ratio_estimate():
+    assert ratio_estimate([10, 20, 30], [1, 2, 3]) == (10, 0)
+    ratio, half_width = ratio_estimate([10, 30], [1, 1])
+    assert ratio == 20 and half_width == pytest.approx(1.959964 * 10, rel=1e-6)
+    assert math.isnan(ratio_estimate([10], [1])[1])
+    assert ratio_estimate([], []) == (0.0, 0.0)
+
+
+@pytest.mark.parametrize("protocol", ['MESI', 'DRAGON'])
+def test_single_window_is_exact(protocol):
+    op_lists = random_op_lists(1, 2, 300)
+    expected = create_simulator(op_lists, protocol, 'event')
+    expected.run()
+    sampled = create_simulator(op_lists, protocol, 'event')
+    stats, stats_per_core, intervals, _ = run_sampled(sampled, window=1000, gap=0)
+
+    expected_stats, expected_per_core = compute_statistics(expected)
+    assert stats == pytest.approx(expected_stats)
+    assert intervals['Overall Execution Cycle'] == 0  # nothing was fast-forwarded
+    for name, core_stats in expected_per_core.items():
+        assert stats_per_core[name]['Idle Cycles'] == core_stats['Idle Cycles']
+        assert round(stats_per_core[name]['Cache Miss Rate'], 2) == core_stats['Cache Miss Rate']
+
+
+@pytest.mark.parametrize("protocol", ['MESI', 'MOESI', 'DRAGON', 'MESI_DIR'])
+def test_sampled_run_extrapolates_statistics(protocol):
+    op_lists = random_op_lists(2, 4, 2000)
+    expected = create_simulator(op_lists, protocol, 'event')
+    expected.run()
+    expected_stats, expected_per_core = compute_statistics(expected)
+    sampled = create_simulator(op_lists, protocol, 'event')
+    stats, stats_per_core, intervals, intervals_per_core = run_sampled(sampled, window=100, gap=400)
+
+    for key in ['Overall Execution Cycle', 'Bus Data Traffic', 'Bus Invalidation/Updates']:
+        assert stats[key] == pytest.approx(expected_stats[key], rel=0.2)
+        assert 0 < intervals[key] < stats[key]
+    for name, core_stats in expected_per_core.items():
+        # instruction counts and compute cycles are counted in the fast-forwarded gaps as well
+        assert stats_per_core[name]['Compute Cycles'] == core_stats['Compute Cycles']
+        assert stats_per_core[name]['Load/Store Instructions'] == core_stats['Load/Store Instructions']
+        assert intervals_per_core[name]['Compute Cycles'] == 0
+
+
+@pytest.mark.parametrize("protocol", ['MESI', 'DRAGON'])
+@pytest.mark.parametrize("seed", [0, 1, 3])
+def test_confidence_interval_covers_detailed_run(protocol, seed):
+    op_lists = random_op_lists(seed, 4, 2000)
+    expected = create_simulator(op_lists, protocol, 'event')
+    expected.run()
+    stats, _, intervals, _ = run_sampled(create_simulator(op_lists, protocol, 'event'), window=100, gap=400)
+    assert stats['Overall Execution Cycle'] == pytest.approx(expected.counter, rel=0.15)
+    assert abs(stats['Overall Execution Cycle'] - expected.counter) <= intervals['Overall Execution Cycle']
+
+
+def test_window_caps_the_detailed_ops_of_every_core():
+    sim = create_simulator(random_op_lists(1, 4, 2000), 'MESI', 'event')
+    measured = run_window(sim, window=100, warmup=50)
+    # core 0 wins every bus arbitration and reaches its cap first, the others stop before their next load or store
+    assert measured['ops'][0] == 150
+    assert all(ops <= 150 for ops in measured['ops'])
+    assert not any(proc.done for proc in sim.procs)
+    assert all(proc.done_job_counter + 1 == ops for proc, ops in zip(sim.procs, measured['ops']))
+
+
+def test_sampled_run_respects_job_limit():
+    op_lists = random_op_lists(2, 4, 3000)
+    expected = create_simulator(op_lists, 'MESI', 'event', limit=1234)
+    expected.run()
+    sampled = create_simulator(op_lists, 'MESI', 'event', limit=1234)
+    _, stats_per_core, _, _ = run_sampled(sampled, window=100, gap=400)
+    for name, core_stats in compute_statistics(expected)[1].items():
+        assert stats_per_core[name]['Compute Cycles'] == core_stats['Compute Cycles']
+        assert stats_per_core[name]['Load/Store Instructions'] == core_stats['Load/Store Instructions']
+    assert all(proc.done_job_limit == 1234 for proc in sampled.procs)
+
+
+@pytest.mark.parametrize("workload", ['mix', 'migratory', 'private_streaming'])
+def test_sampled_run_error_and_speedup(workload):
+    def simulator():
+        return Simulator(protocol='MESI', data=None, num_cores=4, size=512, engine='event',
+                         workload={'name': workload, 'ops': 8000, 'seed': 1})
+    expected = simulator()
+    start = time.perf_counter()
+    expected.run(quiet=True)
+    detailed_time = time.perf_counter() - start
+    sampled = simulator()
+    start = time.perf_counter()
+    stats, _, _, _ = run_sampled(sampled, window=200, gap=3000)
+    sampled_time = time.perf_counter() - start
+    assert stats['Overall Execution Cycle'] == pytest.approx(expected.counter, rel=0.25)
+    assert detailed_time > 1.5 * sampled_time
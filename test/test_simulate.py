@@ -0,0 +1,35 @@
+import subprocess
+import sys
+
+from main import Results, SimulationConfig, Simulator, compute_statistics, simulate
+from opts import parse_args
+
+
+def test_simulate_matches_simulator():
+    config = SimulationConfig(protocol='MOESI', workload='producer_consumer', workload_ops=500, num_cores=2,
+                              cache_size=1024, engine='event')
+    results = simulate(config)
+    assert isinstance(results, Results)
+
+    sim = Simulator(protocol='MOESI', data=None, workload={'name': 'producer_consumer', 'ops': 500, 'seed': 0},
+                    num_cores=2, size=1024, engine='event')
+    sim.run(quiet=True)
+    assert results.cycles == sim.counter
+    assert (results.stats, results.stats_per_core) == compute_statistics(sim)
+    assert simulate(config) == results
+
+
+def test_config_from_command_line():
+    args = parse_args(['--protocol', 'DRAGON', '--workload', 'mix', '--workload_params', 'weight_migratory=2',
+                       '--memory', 'dram', '--dram_banks', '4'])
+    config = SimulationConfig.from_args(args)
+    assert config == SimulationConfig(protocol='DRAGON', input_file='blackscholes', workload='mix',
+                                      workload_params={'weight_migratory': 2}, memory='dram', dram_banks=4)
+
+
+def test_import_has_no_side_effects():
+    code = ("import sys; sys.argv = ['notebook', '--unknown']; import main; "
+            "main.simulate(main.SimulationConfig(workload='migratory', workload_ops=100, num_cores=2)); "
+            "print(sorted(name for name in ('opts', 'pandas') if name in sys.modules))")
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+    assert output == '[]\n'
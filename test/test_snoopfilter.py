@@ -0,0 +1,49 @@
+import random
+
+import numpy as np
+import pytest
+
+from helpers import create_simulator
+from main import Simulator
+from constants.locking import *
+from constants.mesi import *
+
+
+def shared_op_lists(seed, num_cores, length):
+    rng = random.Random(seed)
+    shared = [rng.randrange(1 << 12) << 5 for _ in range(24)]
+    return [[(rng.randint(0, 1), rng.choice(shared) + rng.randrange(32)) for _ in range(length)]
+            for _ in range(num_cores)]
+
+
+@pytest.mark.parametrize("protocol", ['mesi', 'moesi', 'dragon'])
+def test_snoop_filter_matches_broadcast(protocol):
+    op_lists = shared_op_lists(0, 6, 150)
+    expected = create_simulator(op_lists, protocol, size=256)
+    result = create_simulator(op_lists, protocol, size=256, snoop_filter=True)
+    expected.run()
+    result.run()
+    assert result.counter == expected.counter
+    assert result.bus.total_bus_traffic == expected.bus.total_bus_traffic
+    assert result.bus.total_bus_invalidation_or_updates == expected.bus.total_bus_invalidation_or_updates
+    for proc, expected_proc in zip(result.procs, expected.procs):
+        assert proc.cache.cache_miss_count == expected_proc.cache.cache_miss_count
+        assert np.array_equal(proc.cache.data, expected_proc.cache.data)
+    assert result.bus.snoop_filter.filtered_snoops > 0
+
+
+def test_snoop_filter_tracks_valid_copies():
+    simulator = Simulator(data=None, num_cores=3, snoop_filter=True)
+    caches = [proc.cache for proc in simulator.procs]
+    snoop_filter = simulator.bus.snoop_filter
+    caches[1].data[1] = [[5, SHARED, UNLOCKED], [6, INVALID, UNLOCKED]]
+    caches[2].data[1][0] = [5, MODIFIED, UNLOCKED]
+    address = caches[0].get_address_from_pieces(5, 1)
+    assert simulator.bus.snoop_targets(caches[0], address) == [caches[1], caches[2]]
+
+    caches[1].set_block_state(address, INVALID)
+    assert simulator.bus.snoop_targets(caches[0], address) == [caches[2]]
+    caches[2].data[1][0] = [7, EXCLUSIVE, UNLOCKED]  # evicted by another block
+    assert simulator.bus.snoop_targets(caches[0], address) == []
+    assert snoop_filter.filtered_snoops == 1 + 2
+    assert snoop_filter.sharers == {caches[0].get_address_from_pieces(7, 1) >> caches[0].n: 0b100}
@@ -0,0 +1,60 @@
+import csv
+import os
+
+from sweep import configuration_grid, run_sweep, parser
+
+TRACE = "0 0x817ae8\n2 0x10\n1 0x817af0\n0 0x1000\n1 0x1000\n"
+
+
+def make_trace_dir(tmp_path, num_cores=2):
+    trace_dir = tmp_path / 'trace_two'
+    trace_dir.mkdir()
+    for core in range(num_cores):
+        (trace_dir / 'trace_{}.data'.format(core)).write_text(TRACE)
+    return str(trace_dir)
+
+
+def read_rows(path):
+    with open(path, newline='') as file:
+        return list(csv.DictReader(file))
+
+
+def test_configuration_grid_only_varies_bus_mem_op_for_dragon():
+    args = parser.parse_args(['--protocols', 'mesi', 'dragon', '--cache_sizes', '1024', '4096',
+                              '--bus_mem_op', '0', '1', '--traces', 'a'])
+    configurations = configuration_grid(args)
+    assert len(configurations) == 2 + 4
+    assert all(c['protocol'] == 'DRAGON' for c in configurations if c['bus_mem_op'])
+
+
+def test_sweep_writes_table_and_resumes(tmp_path):
+    trace = make_trace_dir(tmp_path)
+    output = str(tmp_path / 'out' / 'sweep.csv')
+    args = parser.parse_args(['--protocols', 'MESI', 'MOESI', '--associativities', '1', '2', '--traces', trace])
+    configurations = configuration_grid(args)
+
+    assert run_sweep(configurations[:3], output, num_cores=2, workers=2) == 3
+    assert run_sweep(configurations, output, num_cores=2, workers=2) == 1
+
+    rows = read_rows(output)
+    assert sorted((row['protocol'], row['associativity']) for row in rows) == \
+        [('MESI', '1'), ('MESI', '2'), ('MOESI', '1'), ('MOESI', '2')]
+    assert all(int(row['Overall Execution Cycle']) > 0 for row in rows)
+    per_core_rows = read_rows(os.path.join(str(tmp_path / 'out'), 'sweep_percore.csv'))
+    assert len(per_core_rows) == 2 * len(rows)
+
+
+def test_sweep_adds_directory_column_when_resumed_with_mesi_dir(tmp_path):
+    trace = make_trace_dir(tmp_path)
+    output = str(tmp_path / 'sweep.csv')
+    args = parser.parse_args(['--protocols', 'MESI', 'MESI_DIR', '--traces', trace])
+    configurations = configuration_grid(args)
+
+    assert run_sweep(configurations[:1], output, num_cores=2, workers=1) == 1
+    assert 'Directory Messages' not in read_rows(output)[0]
+    assert run_sweep(configurations, output, num_cores=2, workers=1) == 1
+
+    rows = {row['protocol']: row for row in read_rows(output)}
+    assert rows['MESI']['Directory Messages'] == ''
+    assert int(rows['MESI_DIR']['Directory Messages']) > 0
+    assert rows['MESI']['Overall Execution Cycle'] and rows['MESI_DIR']['Overall Execution Cycle']
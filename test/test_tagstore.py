@@ -0,0 +1,50 @@
+import numpy as np
+
+from components.tagstore import TagStore
+from constants.locking import *
+from constants.mesi import *
+
+
+def test_lookup_with_duplicate_and_distinct_tags():
+    store = TagStore(2, 4)
+    assert store.lookup(0, 0) == 0  # cold set: all tags are 0
+    assert store.lookup_valid(0, 0) == -1
+
+    store[1] = np.array([[7, SHARED, UNLOCKED], [3, INVALID, UNLOCKED], [7, MODIFIED, UNLOCKED],
+                         [5, EXCLUSIVE, UNLOCKED]])
+    assert store.slots[1] is None
+    assert store.lookup(1, 7) == 4
+    assert store.lookup_last_valid(1, 7) == 6
+
+    store[1][0] = [9, SHARED, UNLOCKED]
+    assert store.slots[1] == {9: 4, 3: 5, 7: 6, 5: 7}
+    assert store.lookup_valid(1, 3) == -1
+    assert store.lookup_valid(1, 7) == 6
+    assert store.find_invalid(1) == 5
+
+
+def test_fields_are_packed_independently():
+    store = TagStore(1, 2)
+    store.write(1, 0xabcdef, EXCLUSIVE, READ_LOCKED)
+    store.set_lock(1, WRITE_LOCKED)
+    store.set_state(1, MODIFIED)
+    assert [store.tag(1), store.state(1), store.lock(1)] == [0xabcdef, MODIFIED, WRITE_LOCKED]
+    store.unlock(0, 0xabcdef)
+    assert list(store[0][1]) == [0xabcdef, MODIFIED, UNLOCKED]
+
+
+def test_recency_without_moving_blocks():
+    store = TagStore(1, 3)
+    store[0] = np.array([[1, SHARED, UNLOCKED], [2, SHARED, UNLOCKED], [3, SHARED, UNLOCKED]])
+    assert store.victim(0) == 2
+    store.touch(2)
+    store.touch(0)
+    assert np.array_equal(store[0][:, 0], [1, 2, 3])
+    assert store.recency_order(0) == [0, 2, 1]
+    assert store.victim(0) == 1
+    assert [store.lookup(0, tag) for tag in [1, 2, 3]] == [0, 1, 2]
+
+    store.set_state(0, INVALID)
+    store.set_state(1, INVALID)
+    assert store.find_invalid(0) == 0
+    assert store.find_invalid(0, last=True) == 1
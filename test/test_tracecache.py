@@ -0,0 +1,43 @@
+import os
+import pickle
+
+from helpers import read_all, write_traces
+from main import Simulator, compute_statistics, open_trace
+from opstream import MmapOpStream, compile_trace
+from tracecache import TraceCache
+
+
+def write_trace_dir(tmp_path):
+    trace = tmp_path / 'trace_two'
+    trace.mkdir()
+    write_traces(trace, 2, 400)
+    return str(trace)
+
+
+def test_traces_are_decoded_once(tmp_path):
+    trace = write_trace_dir(tmp_path)
+    compile_trace(os.path.join(trace, 'trace_1.data'))
+    with TraceCache() as cache:
+        cache.add(trace, 2)
+        cache.add(trace, 2)
+        assert os.listdir(cache.directory) == ['0_trace_0.npy']  # the compiled trace of core 1 is used as it is
+        cache = pickle.loads(pickle.dumps(cache))
+        streams = cache.open_streams(trace, 2)
+        assert all(isinstance(stream, MmapOpStream) for stream in streams)
+        for core, stream in enumerate(streams):
+            assert read_all(stream) == read_all(open_trace(os.path.join(trace, 'trace_{}.data'.format(core))))
+            stream.close()
+        directory = cache.directory
+    assert not os.path.exists(directory)
+
+
+def test_simulation_from_trace_cache(tmp_path):
+    trace = write_trace_dir(tmp_path)
+    expected = Simulator(protocol='MOESI', data=trace, num_cores=2, size=512, engine='event')
+    expected.run()
+    with TraceCache(str(tmp_path)) as cache:
+        cache.add(trace, 2)
+        simulator = Simulator(protocol='MOESI', data=trace, num_cores=2, size=512, engine='event', trace_cache=cache)
+        simulator.run()
+    assert simulator.counter == expected.counter
+    assert compute_statistics(simulator) == compute_statistics(expected)
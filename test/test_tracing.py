@@ -0,0 +1,104 @@
+import pytest
+
+from constants.mesi import INVALID
+from helpers import create_simulator, random_op_lists
+from main import Simulator, compute_statistics
+from tracing import *
+
+
+@pytest.mark.parametrize("protocol", ['MESI', 'MOESI', 'DRAGON', 'MESI_DIR'])
+def test_traced_run_records_every_event_type(protocol):
+    op_lists = random_op_lists(0, 2, 150)
+    expected = create_simulator(op_lists, protocol, 'event')
+    expected.run()
+    simulator = create_simulator(op_lists, protocol, 'event')
+    tracer = Tracer(capacity=None).attach(simulator)
+    simulator.run()
+
+    assert compute_statistics(simulator) == compute_statistics(expected)
+    events = list(tracer.buffer)
+    assert {event.type for event in events} == set(range(len(EVENT_NAMES)))
+    assert [event.cycle for event in events] == sorted(event.cycle for event in events)
+    assert sum(1 for event in events if event.type == JOB_SCHEDULED) == sum(len(ops) for ops in op_lists)
+
+    # replaying the state transitions gives the final states of the caches
+    states = {}
+    for event in events:
+        if event.type == STATE_TRANSITION:
+            assert states.get((event.component, event.address), INVALID) == event.value >> 4
+            states[(event.component, event.address)] = event.value & 0xf
+    for proc in simulator.procs:
+        cache = proc.cache
+        for slot in range(len(cache.data.words)):
+            address = cache.get_address_from_pieces(cache.data.tag(slot), slot // cache.assoc)
+            assert states.get((cache.name, address), INVALID) == cache.data.state(slot)
+    assert all(format_event(event) for event in events)
+
+
+def test_filters_and_ring_buffer():
+    op_lists = random_op_lists(1, 2, 150)
+    address = op_lists[0][1][1] if op_lists[0][1][0] < 2 else op_lists[0][0][1]
+    simulator = create_simulator(op_lists, 'MESI', 'event')
+    everything = Tracer(capacity=None).attach(simulator)
+    simulator.run()
+
+    simulator = create_simulator(op_lists, 'MESI', 'event')
+    filtered = Tracer(capacity=None, components=['P1'], addresses=[address], events=[STATE_TRANSITION, BUS_GRANT])
+    filtered.attach(simulator)
+    simulator.run()
+    assert list(filtered.buffer) == [event for event in everything.buffer if event.component == 'P1' and
+                                     event.address >> 5 == address >> 5 and
+                                     event.type in [STATE_TRANSITION, BUS_GRANT]]
+
+    simulator = create_simulator(op_lists, 'MESI', 'event')
+    last = Tracer(capacity=10).attach(simulator)
+    simulator.run()
+    assert list(last.buffer) == list(everything.buffer)[-10:]
+
+
+def test_binary_trace_file(tmp_path):
+    op_lists = random_op_lists(2, 2, 100)
+    simulator = create_simulator(op_lists, 'DRAGON', 'event')
+    in_memory = Tracer(capacity=None).attach(simulator)
+    simulator.run()
+
+    path = str(tmp_path / 'events.bin')
+    simulator = create_simulator(op_lists, 'DRAGON', 'event')
+    tracer = Tracer(path=path).attach(simulator)
+    simulator.run()
+    tracer.close()
+    assert read_trace_file(path) == list(in_memory.buffer)
+
+
+def test_compute_jobs_pass_the_address_filter():
+    op_lists = random_op_lists(3, 2, 150)
+    address = next(value for opcode, value in op_lists[0] if opcode < 2)
+    simulator = create_simulator(op_lists, 'MESI', 'event')
+    tracer = Tracer(capacity=None, addresses=[address], events=[JOB_SCHEDULED]).attach(simulator)
+    simulator.run()
+    events = list(tracer.buffer)
+    # compute jobs record their cycle count in place of an address
+    assert sum(1 for event in events if event.value > 1) == sum(1 for ops in op_lists for opcode, _ in ops
+                                                               if opcode == 2)
+    assert all(event.address >> 5 == address >> 5 for event in events if event.value <= 1)
+
+
+def test_checkpoint_of_traced_run(tmp_path):
+    op_lists = random_op_lists(4, 2, 300)
+    path = str(tmp_path / 'events.bin')
+    simulator = create_simulator(op_lists, 'MOESI', 'event')
+    tracer = Tracer(path=path).attach(simulator)
+    simulator.run()
+    tracer.close()
+    expected = read_trace_file(path)
+
+    checkpoint = str(tmp_path / 'checkpoint.pkl')
+    simulator = create_simulator(op_lists, 'MOESI', 'event')
+    tracer = Tracer(path=path).attach(simulator)
+    simulator.run(checkpoint_every=2000, checkpoint_path=checkpoint)
+    tracer.close()
+    # the resumed run cuts off the events recorded after the checkpoint before appending its own
+    restored = Simulator.load_checkpoint(checkpoint)
+    restored.run()
+    restored.bus.tracer.close()
+    assert read_trace_file(path) == expected
@@ -0,0 +1,69 @@
+import itertools
+
+import pytest
+
+from constants.jobtype import LOAD, STORE, OTHER
+from helpers import create_simulator
+from main import Simulator, compute_statistics
+from workloads.generators import *
+
+
+@pytest.mark.parametrize("name", sorted(PATTERNS))
+def test_generated_ops_are_seeded(name):
+    ops = list(generate(name, 1, 4, 2000))
+    assert len(ops) == 2000
+    assert ops == list(generate(name, 1, 4, 2000))
+    assert ops != list(generate(name, 1, 4, 2000, seed=1))
+    assert all(opcode in (LOAD, STORE, OTHER) for opcode, _ in ops)
+    assert all(1 <= value <= 10 for opcode, value in ops if opcode == OTHER)
+    assert any(opcode == OTHER for opcode, _ in ops) and any(opcode != OTHER for opcode, _ in ops)
+
+
+def test_endless_workload():
+    ops = generate('mix', 0, 2, None)
+    assert len(list(itertools.islice(ops, 100000))) == 100000
+    assert next(ops)
+
+
+def memory_ops(name, core, num_cores, ops=1000, **params):
+    return list(generate(name, core, num_cores, ops, compute=0, **params))
+
+
+def test_pattern_properties():
+    streaming = memory_ops('private_streaming', 2, 4)
+    assert [address for _, address in streaming] == [2 * PRIVATE_REGION + 4 * i for i in range(1000)]
+
+    producer, consumer = memory_ops('producer_consumer', 0, 2), memory_ops('producer_consumer', 1, 2)
+    assert all(opcode == STORE for opcode, _ in producer) and all(opcode == LOAD for opcode, _ in consumer)
+    assert [address for _, address in producer] == [address for _, address in consumer]
+
+    blocks = [{address // BLOCK_SIZE for _, address in memory_ops('false_sharing', core, 4, blocks=2)}
+              for core in range(4)]
+    assert all(core_blocks == blocks[0] for core_blocks in blocks) and len(blocks[0]) == 2
+    words = [{address % BLOCK_SIZE for _, address in memory_ops('false_sharing', core, 4)} for core in range(4)]
+    assert words == [{0}, {4}, {8}, {12}]
+
+    migratory = memory_ops('migratory', 0, 4)
+    assert all(load == (LOAD, store[1]) and store[0] == STORE for load, store in zip(migratory[::2], migratory[1::2]))
+
+    read_mostly = memory_ops('read_mostly_shared', 0, 4, write_fraction=0)
+    assert all(opcode == LOAD and address >= SHARED_BASE for opcode, address in read_mostly)
+
+
+def test_mix_weights():
+    only_migratory = memory_ops('mix', 0, 4, weight_migratory=1, migratory_blocks=2)
+    assert {address for _, address in only_migratory} == {SHARED_BASE, SHARED_BASE + BLOCK_SIZE}
+    mixed = memory_ops('mix', 0, 4, weight_migratory=1, weight_private_streaming=1)
+    assert any(address < SHARED_BASE for _, address in mixed) and any(address >= SHARED_BASE for _, address in mixed)
+
+
+@pytest.mark.parametrize("protocol", ['MESI', 'DRAGON', 'MESI_DIR'])
+def test_simulator_workload(protocol):
+    workload = {'name': 'lock_contention', 'ops': 300, 'seed': 3, 'locks': 1}
+    simulator = Simulator(protocol=protocol, data=None, num_cores=2, size=512, engine='event', workload=workload)
+    simulator.run()
+
+    expected = create_simulator([list(ops) for ops in create_workload(num_cores=2, **workload)], protocol, 'event')
+    expected.run()
+    assert simulator.counter == expected.counter
+    assert compute_statistics(simulator) == compute_statistics(expected)
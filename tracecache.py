@@ -0,0 +1,67 @@
+import os
+import shutil
+import tempfile
+
+from main import find_trace_file, open_trace
+from opstream import MmapOpStream, binary_trace_path, compile_trace
+
+
+class TraceCache:
+    """
+    Traces decoded once for all simulators of a sweep. Every trace is held as a compiled binary trace, a packed numpy
+    array of (opcode, value) records: the compiled trace next to it if that is up to date, else one decoded into a
+    temporary directory. Simulators read them through MmapOpStream, so the worker processes share the read-only
+    pages of each trace instead of every worker parsing and holding its own copy.
+
+    The cache is picklable and small, it only maps trace paths to binary paths, and can be passed to the workers.
+    """
+    def __init__(self, directory=None):
+        """
+        :param directory: where to put the traces decoded by the cache, a temporary directory removed by close() if
+        not given
+        """
+        self.owns_directory = directory is None
+        self.directory = directory or tempfile.mkdtemp(prefix='tracecache')
+        self.binary_paths = {}  # text trace path -> binary trace path
+
+    def add(self, data_name, num_cores):
+        """
+        decode the traces of the first <num_cores> cores in the trace directory <data_name>, unless already cached
+        """
+        for core in range(num_cores):
+            path = find_trace_file(data_name, core)
+            if path is None or path in self.binary_paths:
+                continue
+            binary_path = binary_trace_path(path)
+            if not os.path.exists(binary_path) or os.path.getmtime(binary_path) < os.path.getmtime(path):
+                binary_path = os.path.join(self.directory, '{}_{}'.format(len(self.binary_paths),
+                                                                          os.path.basename(binary_path)))
+                compile_trace(path, binary_path)
+            self.binary_paths[path] = binary_path
+
+    def open_streams(self, data_name, num_cores):
+        """
+        the cached counterpart of main.create_opstream, traces that were not added are opened as usual
+        :return: list of op streams, one per core with a trace
+        """
+        result = []
+        for core in range(num_cores):
+            path = find_trace_file(data_name, core)
+            if path is None:
+                continue
+            if path in self.binary_paths:
+                result.append(MmapOpStream(self.binary_paths[path]))
+            else:
+                result.append(open_trace(path))
+        return result
+
+    def close(self):
+        if self.owns_directory:
+            shutil.rmtree(self.directory, ignore_errors=True)
+        self.binary_paths = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
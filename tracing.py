@@ -0,0 +1,147 @@
+import argparse
+import collections
+import struct
+
+# event types
+JOB_SCHEDULED = 0  # address: memory address, or cycles of a compute job. value: job type
+BUS_GRANT = 1  # address: requested block. value: 0
+SNOOP_RESPONSE = 2  # address: snooped block. value: payload words, -1 if the snooped cache is blocking
+STATE_TRANSITION = 3  # address: block. value: old state << 4 | new state
+MEMORY_FETCH = 4  # address: block. value: cycles until the fetch completes, recorded when DRAM starts serving it
+MEMORY_EVICT = 5  # address: block. value: cycles until the eviction completes, as for MEMORY_FETCH
+EVENT_NAMES = ['job scheduled', 'bus grant', 'snoop response', 'state transition', 'memory fetch', 'memory evict']
+
+Event = collections.namedtuple('Event', ['cycle', 'type', 'component', 'address', 'value'])
+
+TRACE_MAGIC = b'CCTRACE1'
+RECORD = struct.Struct('<QBHQq')  # cycle, event type, component index, address, value
+
+
+class Tracer:
+    """
+    Recorder of typed simulation events. Components emit events only while a tracer is attached to them, behind an
+    `if self.tracer is not None` check, so tracing costs next to nothing when it is off.
+
+    Events name the cache they concern (for processors the cache of the core, e.g. 'P0'). They are kept in a ring
+    buffer of the last <capacity> events, or appended to a compact binary file when a path is given; see
+    read_trace_file.
+    """
+    def __init__(self, capacity=65536, path=None, components=None, addresses=None, events=None, block_size=32):
+        """
+        :param capacity: number of events kept in memory, older ones are dropped. Unused when writing to <path>
+        :param path: binary file to write the events to instead of the ring buffer
+        :param components: names of the caches to record events of, None records all
+        :param addresses: record only events on the blocks containing these addresses, None records all. Compute
+        jobs have no address, their JOB_SCHEDULED events are recorded either way
+        :param events: event types to record, None records all
+        :param block_size: block size of the caches, used to match <addresses>
+        """
+        self.buffer = collections.deque(maxlen=capacity)
+        self.path = path
+        self.file = None
+        self.components = set(components) if components is not None else None
+        self.block_bits = block_size.bit_length() - 1
+        self.blocks = {address >> self.block_bits for address in addresses} if addresses is not None else None
+        self.events = set(events) if events is not None else None
+        self.component_indices = {}
+        self.sim = None
+
+    def attach(self, sim):
+        """
+        start recording the events of all components of <sim>
+        """
+        self.sim = sim
+        names = [proc.cache.name for proc in sim.procs]
+        self.component_indices = {name: i for i, name in enumerate(names)}
+        if self.path is not None:
+            self.file = open(self.path, 'wb')
+            self.file.write(TRACE_MAGIC + struct.pack('<H', len(names)))
+            for name in names:
+                encoded = name.encode()
+                self.file.write(struct.pack('<B', len(encoded)) + encoded)
+        for proc in sim.procs:
+            proc.tracer = self
+            proc.cache.tracer = self
+            proc.cache.data.state_listener = proc.cache.trace_state_change
+        sim.bus.tracer = self
+        sim.memory_controller.tracer = self
+        return self
+
+    def record(self, event, component, address, value=0):
+        """
+        :param event: event type, e.g. BUS_GRANT
+        :param component: name of the cache the event concerns
+        """
+        if self.components is not None and component not in self.components:
+            return
+        # the address of a scheduled compute job is its cycle count
+        if self.blocks is not None and address >> self.block_bits not in self.blocks and \
+                not (event == JOB_SCHEDULED and value > 1):
+            return
+        if self.events is not None and event not in self.events:
+            return
+        if self.file is not None:
+            self.file.write(RECORD.pack(self.sim.counter, event, self.component_indices[component], address, value))
+        else:
+            self.buffer.append(Event(self.sim.counter, event, component, address, value))
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    # checkpoints store the length of the event file instead of the open file. A restored tracer cuts the file back
+    # to that length and appends to it, so the file holds the events of the resumed run exactly once
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        if self.file is not None:
+            self.file.flush()
+            state['file'] = self.file.tell()
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if self.file is not None:
+            self.file = open(self.path, 'r+b')
+            self.file.truncate(state['file'])
+            self.file.seek(state['file'])
+
+
+def read_trace_file(path):
+    """
+    :return: list of the Events in a binary trace written by a Tracer
+    """
+    with open(path, 'rb') as file:
+        if file.read(len(TRACE_MAGIC)) != TRACE_MAGIC:
+            raise ValueError("{} is not an event trace".format(path))
+        names = []
+        for _ in range(struct.unpack('<H', file.read(2))[0]):
+            length = file.read(1)[0]
+            names.append(file.read(length).decode())
+        data = file.read()
+    return [Event(cycle, event, names[component], address, value)
+            for cycle, event, component, address, value in RECORD.iter_unpack(data)]
+
+
+def format_event(event):
+    """
+    :return: one human readable line describing the event
+    """
+    if event.type == STATE_TRANSITION:
+        detail = '{} -> {}'.format(event.value >> 4, event.value & 0xf)
+    elif event.type == JOB_SCHEDULED:
+        detail = ['LOAD', 'STORE', 'COMPUTE'][event.value]
+        if event.value > 1:
+            return '{:>10} {:<4} {}: {} cycles'.format(event.cycle, event.component, EVENT_NAMES[event.type],
+                                                       event.address)
+    else:
+        detail = str(event.value)
+    return '{:>10} {:<4} {} {}: {}'.format(event.cycle, event.component, EVENT_NAMES[event.type], hex(event.address),
+                                           detail)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Print an event trace written with main.py --trace_events')
+    parser.add_argument('path')
+    for event in read_trace_file(parser.parse_args().path):
+        print(format_event(event))
@@ -0,0 +1,136 @@
+"""
+Seeded synthetic workloads. Every pattern is an endless generator of the memory ops (opcode, address) of one core;
+generate() interleaves them with compute ops and stops after the requested number of ops, so a workload of any
+length is produced lazily in constant memory and can be fed to a processor through opstream.FakeOpStream.
+"""
+import itertools
+import random
+
+from constants.jobtype import LOAD, STORE, OTHER
+
+BLOCK_SIZE = 32
+PRIVATE_REGION = 1 << 24  # bytes of address space of every core's private data
+SHARED_BASE = 1 << 31  # start of the data shared between cores, above the private regions of up to 128 cores
+
+
+def private_streaming(rng, core, num_cores, stride=4, length=1 << 20, write_fraction=0.3):
+    """
+    every core walks sequentially through its own array, wrapping around after <length> bytes
+    """
+    base = core * PRIVATE_REGION
+    for offset in itertools.cycle(range(0, length, stride)):
+        yield (STORE if rng.random() < write_fraction else LOAD), base + offset
+
+
+def read_mostly_shared(rng, core, num_cores, blocks=64, write_fraction=0.02):
+    """
+    all cores read a common pool of blocks, now and then one of them is written
+    """
+    while True:
+        address = SHARED_BASE + rng.randrange(blocks) * BLOCK_SIZE + rng.randrange(0, BLOCK_SIZE, 4)
+        yield (STORE if rng.random() < write_fraction else LOAD), address
+
+
+def producer_consumer(rng, core, num_cores, blocks=16):
+    """
+    cores are paired up, the even core of a pair writes a ring buffer of <blocks> blocks that the odd core reads in
+    the same order. A core without partner produces for itself.
+    """
+    base = SHARED_BASE + core // 2 * blocks * BLOCK_SIZE
+    opcode = LOAD if core % 2 else STORE
+    for block in itertools.cycle(range(blocks)):
+        for word in range(0, BLOCK_SIZE, 4):
+            yield opcode, base + block * BLOCK_SIZE + word
+
+
+def migratory(rng, core, num_cores, blocks=32):
+    """
+    every core reads and then writes a randomly chosen shared block, so blocks move from cache to cache
+    """
+    while True:
+        address = SHARED_BASE + rng.randrange(blocks) * BLOCK_SIZE
+        yield LOAD, address
+        yield STORE, address
+
+
+def false_sharing(rng, core, num_cores, blocks=4, write_fraction=0.5):
+    """
+    every core only touches its own word, but the words of all cores lie in the same few blocks
+    """
+    word = core * 4 % BLOCK_SIZE
+    while True:
+        address = SHARED_BASE + rng.randrange(blocks) * BLOCK_SIZE + word
+        yield (STORE if rng.random() < write_fraction else LOAD), address
+
+
+def lock_contention(rng, core, num_cores, locks=2, spins=4, critical_section=8):
+    """
+    cores spin on a few lock words (loads, then the store taking the lock), run a short critical section on shared
+    data guarded by the lock and release it
+    """
+    private_base = core * PRIVATE_REGION
+    while True:
+        lock = rng.randrange(locks)
+        lock_address = SHARED_BASE + lock * BLOCK_SIZE * 8  # every lock and its data get a region of 8 blocks
+        for _ in range(rng.randint(1, spins)):
+            yield LOAD, lock_address
+        yield STORE, lock_address
+        for _ in range(critical_section):
+            if rng.random() < 0.5:
+                yield rng.randint(LOAD, STORE), lock_address + BLOCK_SIZE * rng.randint(1, 7)
+            else:
+                yield rng.randint(LOAD, STORE), private_base + rng.randrange(256) * 4
+        yield STORE, lock_address
+
+
+def mix(rng, core, num_cores, **params):
+    """
+    interleave other patterns, the next op comes from a pattern drawn by weight
+    :param params: weights as weight_<pattern>=<weight>, by default all other patterns are weighted equally, and
+    parameters of the mixed patterns prefixed with the pattern name, e.g. migratory_blocks=8
+    """
+    weights = {key[len('weight_'):]: value for key, value in params.items() if key.startswith('weight_')}
+    weights = weights or {name: 1 for name in PATTERNS if name != 'mix'}
+    names = sorted(weights)
+    generators = []
+    for name in names:
+        prefix = name + '_'
+        pattern_params = {key[len(prefix):]: value for key, value in params.items() if key.startswith(prefix)}
+        generators.append(PATTERNS[name](random.Random(rng.random()), core, num_cores, **pattern_params))
+    cumulative = list(itertools.accumulate(weights[name] for name in names))
+    while True:
+        yield next(rng.choices(generators, cum_weights=cumulative)[0])
+
+
+PATTERNS = {'private_streaming': private_streaming, 'read_mostly_shared': read_mostly_shared,
+            'producer_consumer': producer_consumer, 'migratory': migratory, 'false_sharing': false_sharing,
+            'lock_contention': lock_contention, 'mix': mix}
+
+
+def generate(name, core, num_cores, ops, seed=0, compute=0.3, compute_cycles=10, **params):
+    """
+    :param name: pattern, a key of PATTERNS
+    :param core: index of the core the ops are for
+    :param ops: number of ops including compute ops, None for an endless stream
+    :param seed: workloads with the same arguments are identical
+    :param compute: probability that an op is a compute op
+    :param compute_cycles: compute ops take 1 to <compute_cycles> cycles
+    :param params: parameters of the pattern
+    :return: iterator of (opcode, value) tuples
+    """
+    rng = random.Random('{}:{}:{}'.format(name, seed, core))
+    memory_ops = PATTERNS[name](rng, core, num_cores, **params)
+    compute_rng = random.Random('{}:{}:{}:compute'.format(name, seed, core))
+    count = itertools.count() if ops is None else range(ops)
+    for _ in count:
+        if compute and compute_rng.random() < compute:
+            yield OTHER, compute_rng.randint(1, compute_cycles)
+        else:
+            yield next(memory_ops)
+
+
+def create_workload(name, num_cores, ops, seed=0, **params):
+    """
+    :return: list of op iterators, one per core
+    """
+    return [generate(name, core, num_cores, ops, seed, **params) for core in range(num_cores)]